@@ -35,7 +35,9 @@ import sys
 import os
 import re
 import colorsys
+import copy
 from math import log
+from ast import literal_eval
 
 from Onboard             import Exceptions
 from Onboard.utils       import hexstring_to_float, brighten, toprettyxml, \
@@ -252,13 +254,43 @@ class Theme:
         else:
             path = Theme.user_path()
 
+        index = AppearanceIndex.get_instance()
         filenames = Theme.find_themes(path)
         for filename in filenames:
-            theme = Theme.load(filename, is_system)
-            if theme:
-                themes.append(theme)
+            metadata = index.get_metadata(filename, Theme._load_metadata)
+            if metadata:
+                themes.append(Theme.from_metadata(filename, metadata,
+                                                  is_system))
+        index.save()
         return themes
 
+    @staticmethod
+    def _load_metadata(filename):
+        theme = Theme.load(filename)
+        if theme:
+            return theme.get_metadata()
+        return None
+
+    def get_metadata(self):
+        """ Name and attributes for the theme index. """
+        metadata = {"name" : self.name}
+        for name, _type, _default in self.attributes:
+            metadata[name] = getattr(self, name)
+        return metadata
+
+    @staticmethod
+    def from_metadata(filename, metadata, is_system=False):
+        """ Create a theme from get_metadata() without parsing the file. """
+        theme = Theme()
+        theme.name = metadata["name"]
+        for name, _type, _default in Theme.attributes:
+            if name in metadata:
+                setattr(theme, name, copy.deepcopy(metadata[name]))
+        theme._filename = filename
+        theme.is_system = is_system
+        theme.system_exists = is_system
+        return theme
+
     @staticmethod
     def find_themes(path):
         """
@@ -446,10 +478,84 @@ class ColorScheme(object):
 
     COLOR_SCHEME_FORMAT = COLOR_SCHEME_WINDOW_COLORS
 
+    # Bit position of each key state in lookup table keys
+    _STATE_BITS = {"prelight"    : 0,
+                   "pressed"     : 1,
+                   "active"      : 2,
+                   "locked"      : 3,
+                   "scanned"     : 4,
+                   "sensitive"   : 5,
+                   "insensitive" : 6}
+
     def __init__(self):
         self._filename = ""
         self._is_system = False
         self._root = None       # tree root
+        self._key_groups = {}   # key id -> first KeyGroup with that id
+        self._element_colors = {}  # (KeyGroup, element, state mask)
+                                   #     -> (rgb, opacity)
+
+    def _compile(self):
+        """
+        Index key groups by key id for constant time lookups.
+        Must be called whenever the tree changes.
+        """
+        key_groups = {}
+
+        # pre-order, same precedence as Root.find_key_id
+        def index(item):
+            if item.is_key_group():
+                for key_id in item.key_ids:
+                    if key_id not in key_groups:
+                        key_groups[key_id] = item
+            for child in item.items:
+                index(child)
+        index(self._root)
+
+        self._key_groups = key_groups
+        self._element_colors = {}
+
+    @staticmethod
+    def _get_state_mask(state):
+        """
+        Encode presence and value of each state attribute in a bit mask.
+        Returns None for unknown attributes.
+
+        Doctests:
+        >>> ColorScheme._get_state_mask({})
+        0
+        >>> bin(ColorScheme._get_state_mask({"prelight" : False,
+        ...                                  "pressed" : True}))
+        '0b1101'
+        >>> ColorScheme._get_state_mask({"unknown" : True}) is None
+        True
+        """
+        bits = ColorScheme._STATE_BITS
+        mask = 0
+        for attr, value in state.items():
+            bit = bits.get(attr)
+            if bit is None:
+                return None
+            mask |= 1 << (bit * 2)
+            if value:
+                mask |= 2 << (bit * 2)
+        return mask
+
+    def _find_element_color(self, key_group, element, state):
+        """ Table driven KeyGroup.find_element_color. """
+        mask = self._get_state_mask(state)
+        if mask is None:
+            return key_group.find_element_color(element, state)
+
+        table_key = (key_group, element, mask)
+        try:
+            return self._element_colors[table_key]
+        except KeyError:
+            pass
+
+        result = key_group.find_element_color(element, state)
+        self._element_colors[table_key] = result
+        return result
 
     @property
     def basename(self):
@@ -462,8 +568,9 @@ class ColorScheme(object):
         return self._filename
 
     def is_key_in_scheme(self, key):
+        key_groups = self._key_groups
         for id in [key.theme_id, key.id]:
-            if self._root.find_key_id(id):
+            if id in key_groups:
                 return True
         return False
 
@@ -505,10 +612,12 @@ class ColorScheme(object):
                 ids.append("layer")
 
         # look for a matching key_group and color in the color scheme
+        key_groups = self._key_groups
         for id in ids:
-            key_group = self._root.find_key_id(id)
+            key_group = key_groups.get(id)
             if key_group:
-                rgb, opacity = key_group.find_element_color(element, state)
+                rgb, opacity = self._find_element_color(key_group,
+                                                        element, state)
                 break
 
         # Get root colors as fallback for the case when key id
@@ -516,7 +625,7 @@ class ColorScheme(object):
         root_key_group = self._root.get_default_key_group()
         if root_key_group:
             root_rgb, root_opacity = \
-                    root_key_group.find_element_color(element, state)
+                    self._find_element_color(root_key_group, element, state)
 
         # Special case for layer buttons:
         # don't take fill color from the root group,
@@ -779,6 +888,7 @@ class ColorScheme(object):
         """
         Merge system and user color schemes.
         User color schemes take precedence and hide system color schemes.
+        Returns ColorSchemeInfo instances, load() them for the colors.
         """
         system_color_schemes = ColorScheme.load_color_schemes(True)
         user_color_schemes = ColorScheme.load_color_schemes(False)
@@ -790,7 +900,7 @@ class ColorScheme(object):
     @staticmethod
     def load_color_schemes(is_system=False):
         """
-        Load all color schemes from either the user or the system directory.
+        Find all color schemes in either the user or the system directory.
         """
         color_schemes = []
 
@@ -799,13 +909,25 @@ class ColorScheme(object):
         else:
             path = ColorScheme.user_path()
 
+        index = AppearanceIndex.get_instance()
         filenames = ColorScheme.find_color_schemes(path)
         for filename in filenames:
-            color_scheme = ColorScheme.load(filename, is_system)
-            if color_scheme:
-                color_schemes.append(color_scheme)
+            metadata = index.get_metadata(filename,
+                                          ColorScheme._load_metadata)
+            if metadata:
+                color_schemes.append(ColorSchemeInfo(filename,
+                                                     metadata["name"],
+                                                     is_system))
+        index.save()
         return color_schemes
 
+    @staticmethod
+    def _load_metadata(filename):
+        color_scheme = ColorScheme.load(filename)
+        if color_scheme:
+            return {"name" : color_scheme.name}
+        return None
+
     @staticmethod
     def find_color_schemes(path):
         """
@@ -861,6 +983,7 @@ class ColorScheme(object):
                 color_scheme._filename = filename
                 color_scheme.is_system = is_system
                 color_scheme._root = root
+                color_scheme._compile()
                 #print(root.dumps())
         except xml.parsers.expat.ExpatError as ex:
             _logger.error(_format("Error loading color scheme '{filename}'. "
@@ -1138,6 +1261,122 @@ class ColorScheme(object):
         return items
 
 
+class ColorSchemeInfo(object):
+    """
+    Name and location of a color scheme, for listing color schemes
+    without parsing them.
+    """
+
+    def __init__(self, filename, name, is_system=False):
+        self._filename = filename
+        self.name = name
+        self.is_system = is_system
+
+    @property
+    def basename(self):
+        """ Returns the file base name of the color scheme. """
+        return os.path.splitext(os.path.basename(self._filename))[0]
+
+    @property
+    def filename(self):
+        """ Returns the filename of the color scheme. """
+        return self._filename
+
+    def load(self):
+        """ Parse the color scheme file, returns a ColorScheme or None. """
+        return ColorScheme.load(self._filename, self.is_system)
+
+
+class AppearanceIndex:
+    """
+    Metadata of theme and color scheme files, e.g. their names,
+    cached on disk and kept up to date by file modification time and size.
+    """
+
+    VERSION = 1
+
+    _instance = None
+
+    @staticmethod
+    def get_instance():
+        if AppearanceIndex._instance is None:
+            AppearanceIndex._instance = AppearanceIndex(
+                XDGDirs.get_cache_home(
+                    os.path.join("onboard", "appearance-index")))
+        return AppearanceIndex._instance
+
+    def __init__(self, filename):
+        self._filename = filename
+        self._entries = None     # {filename: ((mtime, size), metadata)}
+        self._modified = False
+
+    def get_metadata(self, filename, load_metadata):
+        """
+        Metadata of <filename>, load_metadata(filename) parses the file
+        if it isn't indexed yet or has changed since.
+        Returns None if the file couldn't be parsed.
+        """
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        stamp = (st.st_mtime, st.st_size)
+
+        entries = self._get_entries()
+        entry = entries.get(filename)
+        if entry and entry[0] == stamp:
+            return entry[1]
+
+        metadata = load_metadata(filename)
+        if metadata is not None:
+            entries[filename] = (stamp, metadata)
+            self._modified = True
+        return metadata
+
+    def _get_entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self):
+        if not os.path.exists(self._filename):
+            return {}
+
+        try:
+            with open_utf8(self._filename) as f:
+                data = literal_eval(f.read())
+        except (IOError, OSError, ValueError, SyntaxError) as ex:
+            _logger.warning("discarding appearance index '{}': {}"
+                            .format(self._filename, unicode_str(ex)))
+            return {}
+
+        if not isinstance(data, dict) or \
+           data.get("version") != self.VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def save(self):
+        """ Write the index if it changed, forgetting removed files. """
+        if not self._modified:
+            return
+        self._modified = False
+
+        entries = dict((fn, entry) for fn, entry in self._entries.items()
+                       if os.path.exists(fn))
+        self._entries = entries
+        data = {"version" : self.VERSION, "entries" : entries}
+
+        try:
+            XDGDirs.assure_user_dir_exists(os.path.dirname(self._filename))
+            tmp_filename = self._filename + ".tmp"
+            with open_utf8(tmp_filename, "w") as f:
+                f.write(repr(data))
+            os.replace(tmp_filename, self._filename)
+        except (IOError, OSError) as ex:
+            _logger.warning("failed to save appearance index '{}': {}"
+                            .format(self._filename, unicode_str(ex)))
+
+
 class ColorSchemeItem(TreeItem):
     """ Base class of color scheme items """
 
@@ -23,6 +23,7 @@ from __future__ import division, print_function, unicode_literals
 
 import time
 import logging
+import collections
 _logger = logging.getLogger(__name__)
 
 from Onboard.Version   import require_gi_versions
@@ -32,18 +33,156 @@ try:
 except ImportError as e:
     _logger.warning("Atspi typelib missing, auto-show unavailable")
 
-from Onboard.utils     import Rect, EventSource, Process, unicode_str
-from Onboard.Timer     import Timer
+from Onboard.utils       import Rect, EventSource, Process, unicode_str
+from Onboard.Timer       import Timer
+from Onboard.TextChanges import TextMirror
 
 # Config Singleton
 from Onboard.Config import Config
 config = Config()
 
 
+class MirroredTextRange:
+    """ Stand-in for Atspi.TextRange, returned from mirrored text. """
+    def __init__(self, content, start_offset, end_offset):
+        self.content = content
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+
+class AtspiTimeout:
+    """
+    Context manager, temporarily lowers the timeout of AT-SPI's
+    D-Bus calls, so that busy applications can't block us for long.
+    libatspi can't be asked for its timeouts, so the ones in effect
+    are tracked here and restored on exit, which also allows nesting.
+
+    Doctests:
+    >>> AtspiTimeout.get_current_timeouts()
+    (800, 15000)
+    >>> with AtspiTimeout(0.5):
+    ...     with AtspiTimeout(0.1):
+    ...         AtspiTimeout.get_current_timeouts()
+    ...     AtspiTimeout.get_current_timeouts()
+    (100, 100)
+    (500, 500)
+    >>> AtspiTimeout.get_current_timeouts()
+    (800, 15000)
+    """
+    # libatspi's defaults in ms
+    _current_timeouts = (800, 15000)   # (timeout, startup_time)
+
+    def __init__(self, timeout):
+        self._timeout = int(timeout * 1000)
+        self._previous_timeouts = None
+
+    def __enter__(self):
+        self._previous_timeouts = self._current_timeouts
+        self._set_timeouts((self._timeout, self._timeout))
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._set_timeouts(self._previous_timeouts)
+
+    @staticmethod
+    def get_current_timeouts():
+        return AtspiTimeout._current_timeouts
+
+    @staticmethod
+    def _set_timeouts(timeouts):
+        AtspiTimeout._current_timeouts = timeouts
+        try:
+            Atspi.set_timeout(*timeouts)
+        except (NameError, AttributeError):  # no Atspi or too old
+            pass
+
+
+class AccessibleCache:
+    """
+    Properties of recently seen accessibles that don't change over
+    their lifetime, keyed by process id and D-Bus object path.
+    Spares the D-Bus round trips when focus returns to an accessible.
+
+    Doctests:
+    >>> c = AccessibleCache(max_entries=2)
+    >>> c.update((1, "/a"), {"role": 61})
+    >>> c.update((1, "/b"), {"role": 79})
+    >>> c.get((1, "/a"))
+    {'role': 61}
+    >>> c.update((2, "/a"), {"role": 1})  # drops least recently used
+    >>> c.get((1, "/b")) is None
+    True
+    >>> c.update((1, "/a"), {"interfaces": ["Text"]})
+    >>> sorted(c.get((1, "/a")).items())
+    [('interfaces', ['Text']), ('role', 61)]
+    >>> c.remove_pid(1)
+    >>> c.get((1, "/a")) is None
+    True
+    """
+    def __init__(self, max_entries=256):
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def update(self, key, properties):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {}
+            self._entries[key] = entry
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        entry.update(properties)
+
+    def remove_pid(self, pid):
+        for key in [k for k in self._entries if k[0] == pid]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
 class CachedAccessible:
+
+    # Range of text around the caret kept in the text mirror.
+    _text_mirror_before = 1000
+    _text_mirror_after = 500
+
+    # Properties read ahead on focus change and the getters to read them.
+    _prefetch_getters = (("role", "get_role"),
+                         ("state-set", "get_state_set"),
+                         ("interfaces", "get_interfaces"),
+                         ("attributes", "get_attributes"),
+                         ("app-name", "get_app_name"),
+                         )
+    # Subset of the properties that is shared through _shared_cache.
+    _shared_properties = ("role", "interfaces", "attributes", "app-name")
+
+    # Time limit in seconds for each of the prefetching D-Bus calls.
+    _prefetch_timeout = 0.25
+
+    _shared_cache = AccessibleCache()
+
+    # Error messages of D-Bus calls that timed out
+    TIMEOUT_ERRORS = ("Did not receive a reply",
+                      "Error.NoReply",
+                      "Error.Timeout",
+                      "Timeout was reached",
+                      "appears to be hung")
+
     def __init__(self, accessible):
         self._accessible = accessible
         self._state = {}       # cache of various accessible properties
+        self._text_mirror = None  # local copy of the text, if enabled
+        self._text_mirror_sync_failed = False  # no resync until next event
+        self._unresponsive = False  # did the application time out?
+        self._num_timeouts = 0
 
     # Use "==" for object identity tests instead of "is".
     def __eq__(self, other):
@@ -251,10 +390,96 @@ class CachedAccessible:
 
         return self._get_value_noex("is_byobu", func)
 
+    def prefetch(self):
+        """
+        Read the properties needed for focus handling up front, with
+        a short timeout. Properties known from earlier encounters with
+        this accessible come from the shared cache instead.
+        If the application doesn't respond in time, it is considered
+        busy and further property reads return defaults right away.
+        """
+        key = None
+        with AtspiTimeout(self._prefetch_timeout):
+            pid = self._read_prefetch_value("pid", self.get_pid)
+            if not self._unresponsive:
+                key = self._get_cache_key(pid)
+
+            if key is not None:
+                entry = self._shared_cache.get(key)
+                if entry:
+                    for name, value in entry.items():
+                        self._state.setdefault(name, value)
+
+            for name, getter in self._prefetch_getters:
+                if self._unresponsive:
+                    break
+                self._read_prefetch_value(name, getattr(self, getter))
+
+        if key is not None and \
+           not self._unresponsive:
+            properties = {name : self._state[name]
+                          for name in self._shared_properties
+                          if self._state.get(name) is not None}
+            self._shared_cache.update(key, properties)
+
+        if self._unresponsive:
+            pid = self._state.get("pid")
+            _logger.info("CachedAccessible.prefetch(): "
+                         "application not responding, pid={}"
+                         .format(pid))
+
+            # The process may be gone, don't trust its entries anymore.
+            if pid is not None:
+                self._shared_cache.remove_pid(pid)
+
+    def _read_prefetch_value(self, name, getter):
+        num_timeouts = self._num_timeouts
+        value = getter()
+        if self._num_timeouts != num_timeouts:
+            self._unresponsive = True
+        return value
+
+    @staticmethod
+    def _is_timeout_error(ex):
+        """
+        Did the D-Bus call fail because the application didn't reply
+        in time? Other errors, e.g. for properties a sandboxed
+        application can't provide, don't say anything about its
+        responsiveness.
+
+        Doctests:
+        >>> CachedAccessible._is_timeout_error(Exception(
+        ...     "atspi_error: Did not receive a reply. Possible causes..."))
+        True
+        >>> CachedAccessible._is_timeout_error(Exception(
+        ...     "org.freedesktop.DBus.Error.NoReply: Message recipient "
+        ...     "disconnected from message bus without replying"))
+        True
+        >>> CachedAccessible._is_timeout_error(Exception(
+        ...     "atspi_error: The process appears to be hung."))
+        True
+        >>> CachedAccessible._is_timeout_error(Exception(
+        ...     "org.freedesktop.DBus.Error.UnknownMethod: "
+        ...     "No such method 'GetProcessId'"))
+        False
+        """
+        message = unicode_str(ex)
+        return any(s in message for s in CachedAccessible.TIMEOUT_ERRORS)
+
+    def _get_cache_key(self, pid):
+        """ Key into _shared_cache, None if the path isn't available. """
+        path = getattr(self._accessible, "path", None)  # Atspi.Object field
+        if pid is None or pid == -1 or \
+           not path:
+            return None
+        return (pid, path)
+
     def _get_value(self, name, func, default=None):
         """ Return cached return value of func(). """
         value = self._state.get(name)
         if value is None:
+            if self._unresponsive:
+                return default
             try:
                 value = func()
             except Exception as ex:  # private exception gi._glib.GError
@@ -262,6 +487,8 @@ class CachedAccessible:
                              "invalid accessible, failed to read state: "
                              .format(name) + unicode_str(ex))
                 value = default
+                if self._is_timeout_error(ex):
+                    self._num_timeouts += 1
 
             self._state[name] = value
 
@@ -285,9 +512,110 @@ class CachedAccessible:
         except KeyError:
             pass
 
+    # ### Text mirror ###
+
+    def enable_text_mirror(self, enable):
+        """
+        Keep a local copy of the text around the caret, so that
+        the text getters below can avoid most D-Bus round trips.
+        """
+        self._text_mirror = TextMirror() if enable else None
+        self._text_mirror_sync_failed = False
+
+    def apply_text_change(self, pos, length, insert, text):
+        """
+        Patch the text mirror with the change reported by a
+        text-changed event. <text> is the inserted or deleted text,
+        None if unknown.
+        """
+        self._text_mirror_sync_failed = False
+
+        mirror = self._text_mirror
+        if mirror:
+            if insert:
+                mirror.insert(pos, length, text)
+            else:
+                mirror.delete(pos, length, text)
+
+            if not mirror.is_valid():
+                _logger.atspi("text mirror out of sync after "
+                              "text change, pos={}, length={}, insert={}"
+                              .format(pos, length, insert))
+
+    def apply_caret_move(self, caret):
+        """
+        Move the caret of the text mirror with a caret-moved event.
+        The mirror is synced again only if the caret left the mirrored text.
+        """
+        self._text_mirror_sync_failed = False
+
+        mirror = self._text_mirror
+        if mirror and mirror.is_valid():
+            if not mirror.set_caret(caret):
+                _logger.atspi("caret moved out of the text mirror "
+                              "to {}".format(caret))
+
+    def apply_selection_change(self):
+        """ Selection changed, read it again on the next request. """
+        mirror = self._text_mirror
+        if mirror:
+            mirror.invalidate_selection()
+
+    def _get_text_mirror(self):
+        """
+        Return the synced text mirror, None if unavailable.
+        After a failed sync, don't try again before the next
+        text or caret event, the getters read directly until then.
+        """
+        mirror = self._text_mirror
+        if mirror and \
+           not mirror.is_valid() and \
+           not self._text_mirror_sync_failed:
+            self._sync_text_mirror(mirror)
+        if mirror and mirror.is_valid():
+            return mirror
+        return None
+
+    def _sync_text_mirror(self, mirror):
+        """ Read the text around the caret into the mirror """
+        accessible = self._accessible
+        try:
+            count = accessible.get_character_count()
+            caret = accessible.get_caret_offset()
+            begin = max(caret - self._text_mirror_before, 0)
+            end = min(caret + self._text_mirror_after, count)
+            text = Atspi.Text.get_text(accessible, begin, end)
+        except Exception as ex:  # Private exception gi._glib.GError
+            _logger.info("CachedAccessible._sync_text_mirror(): " +
+                         unicode_str(ex))
+            mirror.invalidate()
+            self._text_mirror_sync_failed = True
+            return
+
+        text = unicode_str(text)
+        if len(text) == end - begin:
+            mirror.set_contents(text, begin, count, caret,
+                                selection_valid=False)
+        else:
+            # Offsets and text don't agree, don't attempt to mirror.
+            mirror.invalidate()
+            self._text_mirror_sync_failed = True
+
     # ### uncached, but still exception safe functions ###
 
     def get_selection(self, selection_num=0):
+        mirror = self._get_text_mirror() if selection_num == 0 else None
+        if mirror and mirror.is_selection_valid():
+            return mirror.get_selection()
+
+        selection = self._read_selection(selection_num)
+
+        if mirror:
+            mirror.set_selection(selection)
+
+        return selection
+
+    def _read_selection(self, selection_num=0):
         selection = None
         try:
             sel = self._accessible.get_selection(selection_num)
@@ -331,7 +659,11 @@ class CachedAccessible:
 
     # ### uncached, raising exceptions ###
 
-    def get_caret_offset(self):
+    def get_caret_offset(self, use_mirror=True):
+        mirror = self._get_text_mirror() if use_mirror else None
+        if mirror:
+            return mirror.get_caret()
+
         try:
             offset = self._accessible.get_caret_offset()
         except Exception as ex:  # Private exception gi._glib.GErro
@@ -341,6 +673,10 @@ class CachedAccessible:
         return offset
 
     def get_character_count(self):
+        mirror = self._get_text_mirror()
+        if mirror:
+            return mirror.get_character_count()
+
         try:
             count = self._accessible.get_character_count()
         except Exception as ex:  # Private exception gi._glib.GErro
@@ -350,6 +686,13 @@ class CachedAccessible:
         return count
 
     def get_text_at_offset(self, offset, boundary_type):
+        if boundary_type == Atspi.TextBoundaryType.LINE_START:
+            mirror = self._get_text_mirror()
+            if mirror:
+                line = mirror.get_line_at(offset)
+                if line is not None:
+                    return MirroredTextRange(*line)
+
         try:
             text = self._accessible.get_text_at_offset(offset, boundary_type)
         except Exception as ex:  # Private exception gi._glib.GErro
@@ -369,7 +712,16 @@ class CachedAccessible:
         return text
 
     def get_text(self, begin, end):
-        """ Text of the given accessible, no caching """
+        """
+        Text of the given accessible, no caching
+        apart from the text mirror.
+        """
+        mirror = self._get_text_mirror()
+        if mirror:
+            text = mirror.get_text(begin, end)
+            if text is not None:
+                return text
+
         try:
             text = Atspi.Text.get_text(self._accessible, begin, end)
         # private exception gi._glib.GError: timeout from dbind
@@ -501,6 +853,133 @@ class AsyncEvent:
             + ")"
 
 
+class TextEventCoalescer:
+    """
+    Collects text-changed and text-caret-moved events of a short
+    time window and merges adjacent changes of the same accessible.
+    Bursts of events, e.g. from pasting, auto-completion or scrolling
+    terminals, then reach the text context as a few larger changes.
+
+    Doctests:
+    >>> c = TextEventCoalescer()
+    >>> def ins(pos, text, acc="a"):
+    ...     c.add_text_changed(AsyncEvent(accessible=acc,
+    ...             type="object:text-changed:insert",
+    ...             pos=pos, length=len(text), text=text))
+    >>> def dele(pos, text, acc="a"):
+    ...     c.add_text_changed(AsyncEvent(accessible=acc,
+    ...             type="object:text-changed:delete",
+    ...             pos=pos, length=len(text), text=text))
+    >>> def caret(pos, acc="a"):
+    ...     c.add_caret_moved(AsyncEvent(accessible=acc, caret=pos))
+    >>> def dump():
+    ...     for name, e in c.pop_events():
+    ...         if name == "async-text-caret-moved":
+    ...             print(name, e.caret)
+    ...         else:
+    ...             print(name, e.type.split(":")[-1],
+    ...                   e.pos, e.length, repr(e.text))
+
+    # typing, caret moves in between are folded into the last one
+    >>> ins(5, "a"); caret(6); ins(6, "b"); caret(7); ins(7, "c"); caret(8)
+    >>> dump()
+    async-text-changed insert 5 3 'abc'
+    async-text-caret-moved 8
+
+    # backspace and delete
+    >>> dele(9, "c"); dele(8, "b"); dele(7, "a"); dele(7, "d")
+    >>> dump()
+    async-text-changed delete 7 4 'abcd'
+
+    # unrelated positions and other accessibles aren't merged
+    >>> ins(5, "a"); ins(10, "b"); ins(11, "c", "x"); dele(1, "a")
+    >>> dump()
+    async-text-changed insert 5 1 'a'
+    async-text-changed insert 10 1 'b'
+    async-text-changed insert 11 1 'c'
+    async-text-changed delete 1 1 'a'
+
+    # unknown text can still be merged by length
+    >>> ins(0, "a"); c.add_text_changed(AsyncEvent(accessible="a",
+    ...     type="object:text-changed:insert", pos=1, length=2, text=None))
+    >>> dump()
+    async-text-changed insert 0 3 None
+    """
+    def __init__(self):
+        self._events = []
+        self._num_received = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def get_num_received(self):
+        return self._num_received
+
+    def add_text_changed(self, event):
+        self._num_received += 1
+        events = self._events
+
+        # Skip over a caret move of the same accessible, only the
+        # last caret position of the batch is of interest.
+        i = len(events) - 1
+        if i >= 0 and \
+           events[i][0] == "async-text-caret-moved" and \
+           events[i][1].accessible == event.accessible:
+            i -= 1
+
+        if i >= 0 and \
+           events[i][0] == "async-text-changed":
+            if self._merge_text_changed(events[i][1], event):
+                return
+
+        events.append(("async-text-changed", event))
+
+    def add_caret_moved(self, event):
+        self._num_received += 1
+        events = self._events
+        if events and \
+           events[-1][0] == "async-text-caret-moved" and \
+           events[-1][1].accessible == event.accessible:
+            events[-1] = ("async-text-caret-moved", event)
+        else:
+            events.append(("async-text-caret-moved", event))
+
+    def pop_events(self):
+        events = self._events
+        self._events = []
+        self._num_received = 0
+        return events
+
+    @staticmethod
+    def _merge_text_changed(e0, e1):
+        """ Merge text change e1 into e0 if they are adjacent. """
+        if e0.accessible != e1.accessible or \
+           e0.type != e1.type:
+            return False
+
+        if e0.type.endswith(("delete", "delete:system")):
+            if e1.pos == e0.pos:        # forward delete
+                pos = e0.pos
+                texts = (e0.text, e1.text)
+            elif e1.pos + e1.length == e0.pos:  # backspace
+                pos = e1.pos
+                texts = (e1.text, e0.text)
+            else:
+                return False
+        else:
+            if e1.pos == e0.pos + e0.length:    # append
+                pos = e0.pos
+                texts = (e0.text, e1.text)
+            else:
+                return False
+
+        e0.pos = pos
+        e0.length = e0.length + e1.length
+        e0.text = None if None in texts else texts[0] + texts[1]
+        e0._kwargs.update(pos=e0.pos, length=e0.length, text=e0.text)
+        return True
+
+
 class AtspiStateTracker(EventSource):
     """
     Keeps track of the currently active accessible by listening
@@ -512,7 +991,8 @@ class AtspiStateTracker(EventSource):
     _key_stroke_event_names = ("key-pressed",)
     _async_event_names      = ("async-focus-changed",
                                "async-text-changed",
-                               "async-text-caret-moved")
+                               "async-text-caret-moved",
+                               "async-text-selection-changed")
     _event_names = (_async_event_names +
                     _focus_event_names +
                     _text_event_names +
@@ -533,6 +1013,9 @@ class AtspiStateTracker(EventSource):
 
     _poll_unity_timer = Timer()
 
+    # Time window in seconds for collecting text events into a batch.
+    _text_event_batch_window = 0.02
+
     def __new__(cls, *args, **kwargs):
         """
         Singleton magic.
@@ -556,7 +1039,12 @@ class AtspiStateTracker(EventSource):
 
         self._frozen = False
 
+        self._text_events = TextEventCoalescer()
+        self._text_events_timer = Timer()
+
     def cleanup(self):
+        self._text_events_timer.stop()
+        self._text_events.pop_events()
         EventSource.cleanup(self)
         self._register_atspi_listeners(False)
 
@@ -633,12 +1121,17 @@ class AtspiStateTracker(EventSource):
                 self.atspi_connect("_listener_text_caret_moved",
                                    "object:text-caret-moved",
                                    self._on_atspi_text_caret_moved)
+                self.atspi_connect("_listener_text_selection_changed",
+                                   "object:text-selection-changed",
+                                   self._on_atspi_text_selection_changed)
 
             else:
                 self.atspi_disconnect("_listener_text_changed",
                                       "object:text-changed")
                 self.atspi_disconnect("_listener_text_caret_moved",
                                       "object:text-caret-moved")
+                self.atspi_disconnect("_listener_text_selection_changed",
+                                      "object:text-selection-changed")
 
         self._text_listeners_registered = register
 
@@ -708,6 +1201,8 @@ class AtspiStateTracker(EventSource):
         a dialog or popoup menu.
         """
         self._register_atspi_listeners(False)
+        self._text_events_timer.stop()
+        self._text_events.pop_events()
         self._frozen = True
 
     def thaw(self):
@@ -721,6 +1216,29 @@ class AtspiStateTracker(EventSource):
         if not self._frozen:
             EventSource.emit_async(self, event_name, *args, **kwargs)
 
+    def _queue_text_event(self):
+        """ Start the batch window with the first event. """
+        if not self._text_events_timer.is_running():
+            self._text_events_timer.start(self._text_event_batch_window,
+                                          self._flush_text_events)
+
+    def _flush_text_events(self):
+        """
+        Pass on the coalesced text events. They are emitted together,
+        so the text context is updated only once per batch.
+        """
+        self._text_events_timer.stop()
+
+        num_received = self._text_events.get_num_received()
+        events = self._text_events.pop_events()
+        if events:
+            _logger.atspi("_flush_text_events: {} events coalesced into {}"
+                          .format(num_received, len(events)))
+        for event_name, ae in events:
+            self.emit_async(event_name, ae)
+
+        return False
+
     def _get_cached_accessible(self, accessible):
         return CachedAccessible(accessible) \
             if accessible else None
@@ -738,6 +1256,10 @@ class AtspiStateTracker(EventSource):
                    bool(event.detail1))  # received focus?
         ae = AsyncEvent(accessible=self._get_cached_accessible(event.source),
                         focused=focused)
+
+        # keep text events ahead of the focus change
+        self._flush_text_events()
+
         self.emit_async("async-focus-changed", ae)
 
     def _on_atspi_text_changed(self, event, user_data):
@@ -746,17 +1268,44 @@ class AtspiStateTracker(EventSource):
         ae = AsyncEvent(accessible=self._get_cached_accessible(event.source),
                         type=event.type,
                         pos=event.detail1,
-                        length=event.detail2)
-        self.emit_async("async-text-changed", ae)
+                        length=event.detail2,
+                        text=self._get_event_text(event))
+        if not self._frozen:
+            self._text_events.add_text_changed(ae)
+            self._queue_text_event()
         return False
 
+    @staticmethod
+    def _get_event_text(event):
+        """
+        Inserted or deleted text of a text-changed event,
+        None if unavailable.
+        """
+        try:
+            value = event.any_data
+            if hasattr(value, "get_value"):  # GValue, older PyGObject
+                value = value.get_value()
+        except Exception:
+            return None
+        return value if isinstance(value, str) else None
+
     def _on_atspi_text_caret_moved(self, event, user_data):
         # print("_on_atspi_text_caret_moved", event.detail1, event.detail2,
         #       event.source, event.type, event.source.get_name(),
         #       event.source.get_role())
         ae = AsyncEvent(accessible=self._get_cached_accessible(event.source),
                         caret=event.detail1)
-        self.emit_async("async-text-caret-moved", ae)
+        if not self._frozen:
+            self._text_events.add_caret_moved(ae)
+            self._queue_text_event()
+        return False
+
+    def _on_atspi_text_selection_changed(self, event, user_data):
+        ae = AsyncEvent(accessible=self._get_cached_accessible(event.source))
+        if not self._frozen:
+            # keep pending text events ahead of the selection change
+            self._flush_text_events()
+            self.emit_async("async-text-selection-changed", ae)
         return False
 
     def _on_atspi_keystroke(self, event, user_data):
@@ -781,6 +1330,9 @@ class AtspiStateTracker(EventSource):
         if self._frozen:
             return
 
+        if accessible:
+            accessible.prefetch()
+
         self._log_accessible(accessible, focused)
 
         if not accessible:
@@ -942,6 +1494,10 @@ class AtspiStateTracker(EventSource):
         if event.accessible == self._active_accessible:
             self.emit("text-caret-moved", event)
 
+    def _on_async_text_selection_changed(self, event):
+        if event.accessible == self._active_accessible:
+            self._active_accessible.apply_selection_change()
+
     def _log_accessible(self, accessible, focused):
         if _logger.isEnabledFor(_logger.LEVEL_ATSPI):
             msg = "AT-SPI focus event: focused={}, ".format(focused)
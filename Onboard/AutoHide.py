@@ -22,7 +22,6 @@ Hide the keyboard on incoming physical keyboard events.
 """
 
 from Onboard.GlobalKeyListener  import GlobalKeyListener
-from Onboard.UDevTracker        import UDevTracker
 
 import logging
 _logger = logging.getLogger("AutoHide")
@@ -67,6 +66,7 @@ class AutoHide:
 
     def _on_devices_updated(self):
         if config.is_tablet_mode_detection_enabled():
+            from Onboard.UDevTracker import UDevTracker
             udev_tracker = UDevTracker()
             self._udev_keyboard_devices = udev_tracker.get_keyboard_devices()
         else:
@@ -24,7 +24,6 @@ import collections
 
 from Onboard.AtspiStateTracker import AtspiStateTracker
 from Onboard.HardwareSensorTracker import HardwareSensorTracker
-from Onboard.UDevTracker       import UDevTracker
 from Onboard.utils             import Rect
 from Onboard.Timer             import TimerOnce
 from Onboard.definitions       import RepositionMethodEnum
@@ -126,6 +125,7 @@ class AutoShow(object):
         """
         if enable:
             if not self._udev_tracker:
+                from Onboard.UDevTracker import UDevTracker
                 self._udev_tracker = UDevTracker()
                 self._udev_tracker.connect(
                     "keyboard-detection-changed",
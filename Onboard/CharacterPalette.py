@@ -19,6 +19,8 @@
 
 from __future__ import division, print_function, unicode_literals
 
+from bisect import bisect_left, bisect_right
+
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -28,7 +30,8 @@ from Onboard.KeyCommon         import ImageSlot, ImageStyle
 from Onboard                   import KeyCommon
 from Onboard.UnicodeData       import (UnicodeData,
                                        emoji_filename_from_sequence)
-from Onboard.utils             import Rect
+from Onboard.ImageAtlas        import ImageAtlas
+from Onboard.utils             import Rect, XDGDirs
 
 from Onboard.Config import Config
 config = Config()
@@ -42,7 +45,37 @@ SEARCH_EMOJI_ID = "search-emoji"
 
 
 class CharacterPaletteKey(FlatKey):
-    pass
+
+    # Shared atlas of pre-rasterized emoji
+    _emoji_atlas = None
+
+    @staticmethod
+    def get_emoji_atlas():
+        atlas = CharacterPaletteKey._emoji_atlas
+        if atlas is None:
+            atlas = ImageAtlas(XDGDirs.get_cache_home("onboard/emoji-atlas"),
+                               config.get_image_filename)
+            CharacterPaletteKey._emoji_atlas = atlas
+        return atlas
+
+    @staticmethod
+    def save_emoji_atlas():
+        atlas = CharacterPaletteKey._emoji_atlas
+        if atlas:
+            atlas.flush()
+
+    def get_image(self, width, height):
+        """
+        Emoji are blitted from the atlas instead of being
+        loaded from SVG files for each new key.
+        """
+        if self.image_style == ImageStyle.MULTI_COLOR and \
+           self.image_filenames:
+            name = self.image_filenames.get(ImageSlot.NORMAL)
+            return self.get_emoji_atlas().get_image(
+                name, width, height, config.window_scaling_factor)
+
+        return super(CharacterPaletteKey, self).get_image(width, height)
 
 
 class PaletteHeaderKey(FlatKey):
@@ -91,11 +124,13 @@ class CharacterGridPanel(ScrolledLayoutPanel):
 
         self._key_labels = []
         self._key_rects = []
-        self._key_slots = []
-        self._key_pool = {}
+        self._bound_keys = {}   # key index -> key currently showing it
+        self._key_pool = []     # unbound keys, ready to be recycled
         self._separator_rects = []
         self._category_rects = []
-        self._category_key_rects = []
+        self._subcategory_xs = []      # left edges, ordered
+        self._subcategory_rights = []  # right edges, ordered
+        self._subcategory_ranges = []  # (first key index, end key index)
 
     def get_fill_color(self):
         return (0, 0, 0, 1)
@@ -118,12 +153,21 @@ class CharacterGridPanel(ScrolledLayoutPanel):
 
         subcategories = self.symbol_data.get_subcategories()
 
+        subcategory_xs = []
+        subcategory_rights = []
+        subcategory_ranges = []
+
         for i, (level, label, data) in enumerate(subcategories):
             sequences = self.symbol_data.get_subcategory_sequences(data)
 
             rects, bounds = flow_rect.flow_layout(
                 key_rect, len(sequences), *key_spacing, True, True)
 
+            subcategory_xs.append(bounds.left())
+            subcategory_rights.append(bounds.right())
+            subcategory_ranges.append((len(key_labels),
+                                       len(key_labels) + len(sequences)))
+
             key_labels.extend(sequences)
             key_rects.extend(rects)
             bounding_box = bounding_box.union(bounds) \
@@ -133,7 +177,6 @@ class CharacterGridPanel(ScrolledLayoutPanel):
             if level == 0:  # start of category?
                 if i > 0:
                     self._category_rects.append(category_rect)
-                    self._category_key_rects.append(key_rects)
                 category_rect = bounds
             category_rect = category_rect.union(bounds)
 
@@ -149,10 +192,15 @@ class CharacterGridPanel(ScrolledLayoutPanel):
             flow_rect.x += subcategory_spacing
 
         self._category_rects.append(category_rect)
-        self._category_key_rects.append(key_rects)
+
+        self._subcategory_xs = subcategory_xs
+        self._subcategory_rights = subcategory_rights
+        self._subcategory_ranges = subcategory_ranges
+
+        self._recycle_keys(list(self._bound_keys.values()))
+        self._bound_keys = {}
 
         self._key_labels = key_labels
-        self._key_slots = [None] * len(key_rects)
         self._key_rects = key_rects
         self._separator_rects = separator_rects
 
@@ -184,24 +232,29 @@ class CharacterGridPanel(ScrolledLayoutPanel):
         character_panel.set_active_category_index(category_index)
 
     def on_damage(self, damage_rect):
-        key_slots = self._key_slots
-        items = []
+        bound_keys = self._bound_keys
+        visible_keys = {}
+        new_indices = []
+
+        for i in self._get_key_indices_in(damage_rect):
+            key = bound_keys.pop(i, None)
+            if key is None:
+                new_indices.append(i)
+            else:
+                visible_keys[i] = key
 
-        for ic, category_rect in enumerate(self._category_rects):
-            if damage_rect.intersects(category_rect):
+        # Keys that scrolled out of view are rebound to those scrolling in.
+        self._recycle_keys(bound_keys.values())
 
-                category_key_rects = self._category_key_rects[ic]
-                for i, rect in enumerate(category_key_rects):
-                    if damage_rect.intersects(rect):
-                        key = key_slots[i]
-                        if key is None:
-                            key = self._get_key(i)
-                            key_slots[i] = key
-                        items.append(key)
-                    else:
-                        key_slots[i] = None
+        context = self.scrolled_context
+        for i in new_indices:
+            key = self._get_key(i)
+            key.do_fit_inside_canvas(
+                context.log_to_canvas_rect(self._key_rects[i]))
+            visible_keys[i] = key
 
-        self.set_items(items)
+        self._bound_keys = visible_keys
+        self.set_items([visible_keys[i] for i in sorted(visible_keys)])
 
         layout = self.keyboard.layout
         if layout:
@@ -211,23 +264,52 @@ class CharacterGridPanel(ScrolledLayoutPanel):
 
             self.keyboard.redraw([self])
 
+    def _get_key_indices_in(self, rect):
+        """ Indices of all keys intersecting rect, in ascending order. """
+        key_rects = self._key_rects
+        ranges = self._subcategory_ranges
+
+        # Subcategories are laid out left to right, skip those out of view.
+        begin = bisect_left(self._subcategory_rights, rect.left())
+        end = bisect_right(self._subcategory_xs, rect.right())
+
+        indices = []
+        for first, last in ranges[begin:end]:
+            for i in range(first, last):
+                if rect.intersects(key_rects[i]):
+                    indices.append(i)
+        return indices
+
+    def _recycle_keys(self, keys):
+        for key in keys:
+            if self._can_recycle_key(key):
+                self._key_pool.append(key)
+
+    def _can_recycle_key(self, key):
+        """
+        Keys the keyboard still holds on to, e.g. pressed, dwelled on
+        or otherwise active, must keep their character.
+        """
+        return not (key.pressed or
+                    key.active or
+                    key.locked or
+                    key.prelight or
+                    key.is_dwelling() or
+                    key is self.keyboard.get_pressed_key())
+
     def _get_key(self, index):
         id = "_palette_character" + str(index)
         label = self._key_labels[index]
+        rect = self._key_rects[index]
 
-        try:
-            key = self._key_pool[label]
-        except KeyError:
-            key = self._create_key(id, label, self._key_rects[index],
+        if self._key_pool:
+            key = self._key_pool.pop()
+            self._bind_key(key, id, label, rect,
+                           self.key_group, self.has_emoji)
+        else:
+            key = self._create_key(id, label, rect,
                                    self.key_group, self.color_scheme,
                                    self.has_emoji)
-
-            # only cache emoji keys, as these are the most expensive ones
-            if 0:  # self.has_emoji:
-                self._key_pool[label] = key
-
-        key.set_id(id)
-
         return key
 
     @staticmethod
@@ -236,14 +318,41 @@ class CharacterGridPanel(ScrolledLayoutPanel):
         key = CharacterPaletteKey()
 
         key.type = KeyCommon.CHAR_TYPE
-        key.code = label
         key.action = KeyCommon.DELAYED_STROKE_ACTION
+        key.color_scheme = color_scheme
+        key.can_draw_cached = False
+
+        CharacterGridPanel._bind_key(key, id, label, key_border_rect,
+                                     key_group, has_emoji)
+        return key
+
+    @staticmethod
+    def _bind_key(key, id, label, key_border_rect, key_group, has_emoji):
+        """ (Re-)assign a character and position to key. """
+        key.set_id(id)
+        key.code = label
         key.set_border_rect(key_border_rect)
         if len(label) <= 2:
             key.group = key_group
         else:
             key.group = id
-        key.color_scheme = color_scheme
+
+        # forget all state of the previously bound character
+        key.active = False
+        key.locked = False
+        key.prelight = False
+        key.scanned = False
+        key.activated = False
+        key.stop_dwelling()
+        key.font_fit_state = None
+        key.labels = None
+        key.label = ""
+        key.secondary_label = ""
+        key.image_filenames = None
+        key.image_style = CharacterPaletteKey.image_style
+        key.label_margin = CharacterPaletteKey.label_margin
+        key.invalidate_image()
+        key.invalidate_label_extents()
 
         if has_emoji:
             fn = emoji_filename_from_sequence(label)
@@ -255,10 +364,6 @@ class CharacterGridPanel(ScrolledLayoutPanel):
         if not key.image_filenames:
             key.labels = {0: label}
 
-        key.can_draw_cached = False
-
-        return key
-
     def draw_tree(self, context):
         super(CharacterGridPanel, self).draw_tree(context)
 
@@ -420,6 +525,7 @@ class EmojiPalettePanel(CharacterPalettePanel):
             self.keyboard.show_symbol_search(self.content_type)
         else:
             self.keyboard.hide_symbol_search()
+            CharacterPaletteKey.save_emoji_atlas()
 
     def is_favorites_index(self, index, num_keys):
         return False  # index == num_keys - 1
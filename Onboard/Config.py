@@ -47,7 +47,8 @@ from Onboard.definitions    import DesktopEnvironmentEnum, \
                                    LearningBehavior, \
                                    RepositionMethodEnum, \
                                    Handle, DockingEdge, DockingMonitor
-from Onboard.ConfigUtils    import ConfigObject
+from Onboard.ConfigUtils    import ConfigObject, ConfigSnapshot, \
+                                   ResourcePathCache
 from Onboard.ClickSimulator import CSMousetweaks0, CSMousetweaks1
 from Onboard.Exceptions     import SchemaError
 
@@ -173,6 +174,9 @@ class Config(ConfigObject):
     # minimum time keys are drawn in pressed state
     UNPRESS_DELAY = 0.15
 
+    # time to hold back and coalesce gsettings writes
+    WRITE_BEHIND_DELAY = 0.5
+
     # Margin to leave around wordlist labels; smaller margins leave
     # more room for prediction choices
     WORDLIST_LABEL_MARGIN = (2, 2)
@@ -281,6 +285,15 @@ class Config(ConfigObject):
                   action="store_true", dest="log_learn", default=False,
                   help="log all learned text; off by default")
 
+        group.add_option("", "--record-input", type="str",
+                  dest="record_input", metavar="FILE",
+                  help="Record input sequences and measure latencies. "
+                       "Replay with 'python3 -m Onboard.InputRecorder FILE'.")
+        group.add_option("", "--profile-startup", action="store_true",
+                  dest="profile_startup",
+                  help="Print import and initialization timings "
+                       "once the first frame was drawn.")
+
         parser.add_option_group(group)
 
 
@@ -378,7 +391,7 @@ class Config(ConfigObject):
         # init paths
         self.install_dir = self._get_install_dir()
         self.user_dir = self._get_user_dir()
-        self._image_search_paths = []
+        self._image_path_cache = None
 
         # migrate old user dir ".sok" or ".onboard" to XDG data home
         if not os.path.exists(self.user_dir):
@@ -450,7 +463,10 @@ class Config(ConfigObject):
         self.load_system_defaults(paths)
 
         # initialize all property values
-        used_system_defaults = self.init_properties(self.options)
+        snapshot = ConfigSnapshot(
+            XDGDirs.get_cache_home(os.path.join("onboard", "config-snapshot")),
+            paths)
+        used_system_defaults = self.init_properties(self.options, snapshot)
 
         self._update_xembed_background_rgba()
 
@@ -492,9 +508,16 @@ class Config(ConfigObject):
         # If there is an unbalanced self.delay() somewhere I haven't found it.
         self.apply()
 
+        # From here on coalesce bursts of writes, e.g. from spin buttons
+        # or window positioning, into fewer dconf writes.
+        self.set_write_behind_delay(self.WRITE_BEHIND_DELAY)
+
         _logger.debug("Leaving init")
 
     def cleanup(self):
+        # Write everything pending, later writes on exit go out immediately.
+        self.set_write_behind_delay(0)
+
         # This used to stop dangling main windows from responding
         # when restarting. Restarts don't happen anymore, keep
         # this for now anyway.
@@ -1004,17 +1027,26 @@ class Config(ConfigObject):
         Returns an absolute path for a label image.
         This function isn't linked to any gsettings key.
         """
-        if not self._image_search_paths:
-            self._image_search_paths = \
+        path_cache = self._image_path_cache
+        if path_cache is None:
+            path_cache = ResourcePathCache(
                 self._get_layout_resource_search_paths("images") + \
-                self._get_emojione_image_dirs()
+                self._get_emojione_image_dirs())
+            self._image_path_cache = path_cache
 
-        return self._get_resource_filename(image_filename, "image",
-                                           self._image_search_paths)
+        filename = path_cache.find(image_filename)
+        if not filename:
+            _logger.error(_format("failed to find image '{filename}' "
+                                  "in paths {paths}",
+                                  filename=image_filename,
+                                  paths=path_cache.get_paths()))
+        return filename
 
     def _invalidate_layout_resource_search_paths(self):
         """ Force re-generation of search paths at next opportunity. """
-        self._image_search_paths = []
+        if self._image_path_cache:
+            self._image_path_cache.close()
+            self._image_path_cache = None
 
     def _get_layout_resource_search_paths(self, subdir):
         """
@@ -29,6 +29,7 @@ _logger = logging.getLogger("ConfigUtils")
 import os
 import sys
 from ast import literal_eval
+from collections import OrderedDict
 try:
     import configparser
 except ImportError:
@@ -41,7 +42,8 @@ from gi.repository import GLib, Gio
 
 from Onboard.Exceptions import SchemaError
 from Onboard.utils import pack_name_value_list, unpack_name_value_list, \
-                          unicode_str
+                          unicode_str, XDGDirs
+from Onboard.Timer import Timer, idle_call
 import Onboard.osk as osk
 
 _CAN_SET_HOOK       = "_can_set_"        # return true if value is valid
@@ -49,7 +51,7 @@ _GSETTINGS_GET_HOOK = "_gsettings_get_"  # retrieve from gsettings
 _GSETTINGS_SET_HOOK = "_gsettings_set_"  # store into gsettings
 _UNPACK_HOOK        = "_unpack_"         # convert gsettings value -> property
 _PACK_HOOK          = "_pack_"           # convert property -> gsettings value
-_POST_NOTIFY_HOOK   = "_post_notify_"    # runs after all listeners notified
+_POST_NOTIFY_HOOK   = "_post_notify_"    # runs before listeners notified
 _NOTIFY_CALLBACKS   = "_{}_notify_callbacks"  # name of list of callbacka
 
 
@@ -62,6 +64,18 @@ class ConfigObject(object):
     Python properties and notification functions are created
     automagically for all keys added in _init_keys().
     """
+
+    # Write-behind state, only used by the root object.
+    _write_behind_delay = 0.0
+    _pending_writes = None      # {(ConfigObject, prop): (ConfigObject,
+                                #                         GSKey, value)}
+    _write_timer = None
+    _flushing_writes = False
+
+    # Change notifications waiting for dispatch, only used by the root.
+    _pending_notifications = None   # {(ConfigObject, prop): [callbacks]}
+    _notifications_scheduled = False
+
     def __init__(self, parent=None, schema=""):
         self.parent = parent        # parent ConfigObject
         self.children = []          # child config objects; not necessarily
@@ -87,6 +101,11 @@ class ConfigObject(object):
             gskey.settings = self.settings
             self._setup_property(gskey)
 
+        # One handler for all keys, much cheaper than one per key.
+        self._gskeys_by_key = dict((gskey.key, gskey)
+                                   for gskey in self.gskeys.values())
+        self.settings.connect("changed", self._on_settings_changed)
+
         # check hook function names
         self.check_hooks()
 
@@ -186,6 +205,18 @@ class ConfigObject(object):
         # gsettings callback
         def _notify_changed_cb(self, settings, key, _gskey=gskey, _prop=prop):
             """ call back function for change notification """
+            # Skip notifications about our own just flushed writes.
+            # The property has the latest value already.
+            root = self.get_root()
+            if root._flushing_writes:
+                return
+
+            # Held back writes haven't reached gsettings yet, so this
+            # change came from elsewhere, e.g. dconf-editor. It wins,
+            # don't overwrite it with our older value on the next flush.
+            if root._pending_writes:
+                root._pending_writes.pop((self, _prop), None)
+
             # get-gsettings hook, for reading values from gsettings
             # in non-standard ways, i.e. convert data types.
             value = self.get_unpacked(_gskey)
@@ -197,33 +228,17 @@ class ConfigObject(object):
                 if _gskey.value != value:
                     _gskey.value = value
 
-                    if False:
-                        # asynchronous callbacks
-                        def notify(callbacks, value):
-                            for callback in callbacks:
-                                callback(value)
-
-                        GLib.idle_add(notify,
-                            getattr(self,
-                                _NOTIFY_CALLBACKS.format(prop)), value)
-                    else:
-                        for callback in getattr(self,
-                                                _NOTIFY_CALLBACKS.format(prop)
-                                                ):
-                            callback(value)
-
-            # Post-notification hook for anything that properties
-            # need to do after all listeners have been notified.
+                    # Notify listeners asynchronously, once for bursts of
+                    # changes, e.g. when applying a theme.
+                    self._schedule_notification(_prop)
+
+            # Post-notification hook to update anything derived from the
+            # property, before listeners get to see the new value.
             if hasattr(self, _POST_NOTIFY_HOOK + _prop):
                 getattr(self, _POST_NOTIFY_HOOK + _prop)()
 
         setattr(type(self), '_' + prop + '_changed_cb', _notify_changed_cb)
 
-        # connect callback function to gsettings
-        if gskey.settings:
-            gskey.settings.connect("changed::" + gskey.key,
-                                   getattr(self, '_' + prop + '_changed_cb'))
-
         # getter function
         def get_value(self, _gskey=gskey, _prop=prop):
             """ property getter """
@@ -238,7 +253,11 @@ class ConfigObject(object):
 
                 if save:
                     if value != _gskey.value or _gskey.modified:
-                        self.set_unpacked(_gskey, value)
+                        if _gskey.writable and \
+                           self.get_root()._write_behind_delay:
+                            self._queue_write(_gskey, value)
+                        else:
+                            self.set_unpacked(_gskey, value)
                         _gskey.modified = False
 
                 _gskey.value = value
@@ -252,11 +271,66 @@ class ConfigObject(object):
                 property(getattr(type(self), 'get_' + prop),
                          getattr(type(self), 'set_' + prop)))
 
-    def init_properties(self, options):
-        """ initialize the values of all properties """
+    def _schedule_notification(self, prop):
+        """ Queue notifying the listeners of <prop> in the next idle time. """
+        root = self.get_root()
+        if root._pending_notifications is None:
+            root._pending_notifications = OrderedDict()
+        pending = root._pending_notifications
+
+        # Remember who listened at the time of the change,
+        # later additions aren't interested in it.
+        callbacks = getattr(self, _NOTIFY_CALLBACKS.format(prop))
+        key = (self, prop)
+        queued = pending.get(key)
+        if queued is None:
+            pending[key] = list(callbacks)
+        else:
+            queued.extend(cb for cb in callbacks if cb not in queued)
+
+        if not root._notifications_scheduled:
+            root._notifications_scheduled = True
+            idle_call(root.dispatch_notifications)
+
+    def dispatch_notifications(self):
+        """
+        Notify listeners of all properties changed since the last dispatch.
+        Each callback runs only once, with the property's final value,
+        in the order the properties first changed.
+        """
+        root = self.get_root()
+        root._notifications_scheduled = False
+        pending = root._pending_notifications
+        root._pending_notifications = None
+
+        if pending:
+            called = []
+            for (co, prop), callbacks in pending.items():
+                value = co.gskeys[prop].value
+                registered = getattr(co, _NOTIFY_CALLBACKS.format(prop))
+                for callback in callbacks:
+                    if callback in registered and \
+                       callback not in called:
+                        called.append(callback)
+                        callback(value)
+
+        return False
+
+    def _on_settings_changed(self, settings, key):
+        """ gsettings key changed, dispatch to the property's callback """
+        gskey = self._gskeys_by_key.get(key)
+        if gskey:
+            getattr(self, '_' + gskey.prop + '_changed_cb')(settings, key)
+
+    def init_properties(self, options, snapshot=None):
+        """
+        Initialize the values of all properties.
+        <snapshot> is an optional ConfigSnapshot of the gsettings values.
+        """
 
         # start from hard coded defaults, then try gsettings
-        self.init_from_gsettings()
+        values = snapshot.load() if snapshot else None
+        self.init_from_gsettings(values)
 
         # let system defaults override gsettings
         use_system_defaults = (self.use_system_defaults or
@@ -264,6 +338,8 @@ class ConfigObject(object):
         if use_system_defaults:
             self.init_from_system_defaults()
             self.use_system_defaults = False    # write to gsettings
+        elif snapshot and values is None:
+            snapshot.save(self.get_gsettings_values())
 
         # let command line options override everything
         for gskey in list(self.gskeys.values()):
@@ -294,14 +370,49 @@ class ConfigObject(object):
             return True
         return False
 
-    def init_from_gsettings(self):
-        """ init propertiy values from gsettings """
+    def init_from_gsettings(self, values=None):
+        """
+        Init property values from gsettings, or from <values>
+        of get_gsettings_values() for the keys found there.
+        """
+        object_values = values.get(self.schema, {}) if values else {}
 
         for prop, gskey in list(self.gskeys.items()):
-            gskey.value = self.get_unpacked(gskey)
+            if prop in object_values:
+                gskey.value = object_values[prop]
+
+                # GSettings sends "changed" only for keys that were read
+                # while a handler was connected. Read the raw value, without
+                # unpacking, so external changes still reach the property.
+                self.settings.get_value(gskey.key)
+            else:
+                gskey.value = self.get_unpacked(gskey)
+
+        for child in self.children:
+            child.init_from_gsettings(values)
+
+    def get_gsettings_values(self, values=None):
+        """
+        Property values of the whole tree by schema,
+        limited to values that survive a repr/literal_eval round trip.
+        """
+        if values is None:
+            values = {}
+
+        object_values = {}
+        for prop, gskey in self.gskeys.items():
+            value = gskey.value
+            try:
+                if literal_eval(repr(value)) == value:
+                    object_values[prop] = value
+            except (ValueError, SyntaxError):
+                pass
+        values[self.schema] = object_values
 
         for child in self.children:
-            child.init_from_gsettings()
+            child.get_gsettings_values(values)
+
+        return values
 
     def init_from_system_defaults(self):
         """ fill property values with system defaults """
@@ -405,6 +516,74 @@ class ConfigObject(object):
         else:
             gskey.gsettings_set(value)
 
+    def set_write_behind_delay(self, delay):
+        """
+        Hold back gsettings writes of the whole config tree for up to
+        <delay> seconds, writing only the last value of each key.
+        A delay of 0 flushes pending writes and writes immediately again.
+        """
+        root = self.get_root()
+        if not delay:
+            root.flush_writes()
+        root._write_behind_delay = delay
+
+    def flush_writes(self):
+        """ Write all held back values to gsettings now. """
+        root = self.get_root()
+        if root._write_timer:
+            root._write_timer.stop()
+
+        writes = root._pending_writes
+        if not writes:
+            return
+        root._pending_writes = {}
+
+        # group by config object, one delay()/apply() per gsettings object
+        by_object = {}
+        for co, gskey, value in writes.values():
+            by_object.setdefault(co, []).append((gskey, value))
+
+        root._flushing_writes = True
+        try:
+            for co, items in by_object.items():
+                co.delay()
+                for gskey, value in items:
+                    co.set_unpacked(gskey, value)
+                co.apply()
+        finally:
+            root._flushing_writes = False
+
+    def _queue_write(self, gskey, value):
+        """
+        Queue <value> for writing to gsettings. Listeners are notified
+        right away, as gsettings' change notification would have done.
+        """
+        root = self.get_root()
+        if root._pending_writes is None:
+            root._pending_writes = {}
+        root._pending_writes[(self, gskey.prop)] = (self, gskey, value)
+
+        if root._write_timer is None:
+            root._write_timer = Timer()
+        if not root._write_timer.is_running():
+            root._write_timer.start(root._write_behind_delay,
+                                    root._on_write_timer)
+
+        prop = gskey.prop
+        changed = gskey.value != value
+        gskey.value = value
+
+        if hasattr(self, _POST_NOTIFY_HOOK + prop):
+            getattr(self, _POST_NOTIFY_HOOK + prop)()
+
+        if changed:
+            for callback in getattr(self, _NOTIFY_CALLBACKS.format(prop)):
+                callback(value)
+
+    def _on_write_timer(self):
+        self.flush_writes()
+        return False
+
     def delay(self):
         self.settings.delay()
 
@@ -674,6 +853,198 @@ class ConfigObject(object):
         return value
 
 
+class ConfigSnapshot:
+    """
+    Property values of a ConfigObject tree cached on disk, saves
+    reading and converting every gsettings key one by one at startup.
+    The snapshot is only valid while the dconf databases, schemas
+    and system defaults files are unchanged.
+    """
+
+    VERSION = 1
+
+    def __init__(self, filename, system_defaults_paths=()):
+        self._filename = filename
+        self._system_defaults_paths = system_defaults_paths
+        self._stamp = None
+
+    @staticmethod
+    def _get_mtime(filename):
+        try:
+            return os.path.getmtime(filename)
+        except OSError:
+            return None
+
+    def _get_stamp(self):
+        """
+        Modification times of everything the gsettings values depend on,
+        None if the values can't be validated, e.g. without dconf database.
+        """
+        dconf_db = XDGDirs.get_config_home(os.path.join("dconf", "user"))
+        dconf_db_mtime = self._get_mtime(dconf_db)
+        if dconf_db_mtime is None:
+            return None
+
+        schema_files = XDGDirs.get_all_data_dirs(
+            os.path.join("glib-2.0", "schemas", "gschemas.compiled"))
+        schema_dir = os.environ.get("GSETTINGS_SCHEMA_DIR")
+        if schema_dir:
+            schema_files.append(os.path.join(schema_dir, "gschemas.compiled"))
+
+        system_db_dir = "/etc/dconf/db"
+        try:
+            system_dbs = [os.path.join(system_db_dir, fn)
+                          for fn in sorted(os.listdir(system_db_dir))]
+        except OSError:
+            system_dbs = []
+
+        files = schema_files + system_dbs + list(self._system_defaults_paths)
+        return (self.VERSION,
+                os.environ.get("GSETTINGS_BACKEND"),
+                os.environ.get("DCONF_PROFILE"),
+                dconf_db_mtime,
+                tuple((fn, self._get_mtime(fn)) for fn in files))
+
+    def load(self):
+        """
+        Values of ConfigObject.get_gsettings_values() if the snapshot
+        is still valid, else None.
+        """
+        self._stamp = self._get_stamp()
+        if self._stamp is None or \
+           not os.path.exists(self._filename):
+            return None
+
+        try:
+            with open(self._filename) as f:
+                data = literal_eval(f.read())
+        except (IOError, OSError, ValueError, SyntaxError) as ex:
+            _logger.warning("discarding config snapshot '{}': {}"
+                            .format(self._filename, unicode_str(ex)))
+            return None
+
+        if not isinstance(data, dict) or \
+           data.get("stamp") != self._stamp:
+            _logger.debug("config snapshot outdated")
+            return None
+
+        _logger.debug("restoring properties from config snapshot")
+        return data.get("values")
+
+    def save(self, values):
+        """ Store values valid at the time of the last load(). """
+        if self._stamp is None:
+            return
+
+        data = {"stamp" : self._stamp, "values" : values}
+        try:
+            dirname = os.path.dirname(self._filename)
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            tmp_filename = self._filename + ".tmp"
+            with open(tmp_filename, "w") as f:
+                f.write(repr(data))
+            os.replace(tmp_filename, self._filename)
+
+        except (IOError, OSError) as ex:
+            _logger.warning("failed to save config snapshot '{}': {}"
+                            .format(self._filename, unicode_str(ex)))
+
+
+class ResourcePathCache:
+    """
+    Resolved paths of resource files, e.g. label images, in a fixed list
+    of search directories. Each directory is listed only once, so repeated
+    lookups don't touch the file system. Everything is forgotten when one
+    of the directories changes on disk.
+    """
+
+    def __init__(self, paths):
+        self._paths = [path for path in paths if path]
+        self._listings = None   # [(directory, set of entry names)]
+        self._resolved = {}     # filename -> absolute path or ""
+        self._monitors = []
+
+    def get_paths(self):
+        return self._paths
+
+    def find(self, filename):
+        """
+        Absolute path of <filename> in the first directory containing it,
+        <filename> itself if it is a valid absolute path already.
+        Returns "" if the file can't be found.
+        """
+        result = self._resolved.get(filename)
+        if result is None:
+            result = self._resolve(filename)
+            self._resolved[filename] = result
+        return result
+
+    def clear(self):
+        """ Forget directory listings and resolved paths. """
+        self._listings = None
+        self._resolved = {}
+
+    def close(self):
+        """ Stop watching the search directories. """
+        for monitor in self._monitors:
+            monitor.cancel()
+        self._monitors = []
+        self.clear()
+
+    def _resolve(self, filename):
+        if not filename:
+            return ""
+
+        if os.path.isabs(filename):
+            return filename if os.path.isfile(filename) else ""
+
+        if self._listings is None:
+            self._listings = self._list_directories()
+
+        # Filenames may contain subdirectories, look up their first part.
+        name = filename.split(os.sep, 1)[0]
+        for folder, entries in self._listings:
+            if name in entries:
+                fn = os.path.join(folder, filename)
+                if os.path.isfile(fn):
+                    _logger.debug(_format("resource '{filename}' found in "
+                                          "'{folder}'",
+                                          filename=filename, folder=folder))
+                    return fn
+        return ""
+
+    def _list_directories(self):
+        listings = []
+        watch = not self._monitors
+        for folder in self._paths:
+            try:
+                entries = set(os.listdir(folder))
+            except OSError:
+                continue
+            listings.append((folder, entries))
+
+            if watch:
+                self._watch_directory(folder)
+        return listings
+
+    def _watch_directory(self, folder):
+        try:
+            monitor = Gio.File.new_for_path(folder) \
+                              .monitor_directory(Gio.FileMonitorFlags.NONE,
+                                                 None)
+        except GLib.Error as ex:
+            _logger.warning("failed to watch directory '{}': {}"
+                            .format(folder, unicode_str(ex)))
+            return
+        monitor.connect("changed", self._on_directory_changed)
+        self._monitors.append(monitor)
+
+    def _on_directory_changed(self, monitor, file, other_file, event_type):
+        self.clear()
+
+
 class GSKey:
     """
     Class for a key-value tuple for ConfigObject.
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Multi-touch gesture recognition
+
+Toolkit independent, fed with plain touch begin/update/end samples,
+so that it can be tested and benchmarked without a display.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+from math import sqrt
+
+### Logging ###
+import logging
+_logger = logging.getLogger("GestureRecognizer")
+###############
+
+
+class GestureType:
+    """ enum of recognized gestures """
+    (
+        TAP,
+        DRAG_BEGIN,
+        DRAG_END,
+        SWIPE,
+        PINCH_BEGIN,
+        PINCH_UPDATE,
+        PINCH_END,
+    ) = range(7)
+
+    names = ("TAP", "DRAG_BEGIN", "DRAG_END", "SWIPE",
+             "PINCH_BEGIN", "PINCH_UPDATE", "PINCH_END")
+
+
+class GestureEvent:
+    """ Output of the GestureRecognizer """
+
+    def __init__(self, gesture_type, num_touches, time,
+                 direction = (0.0, 0.0), scale = 1.0):
+        self.type = gesture_type
+        self.num_touches = num_touches
+        self.time = time
+        self.direction = direction  # (dx, dy) unit vector of swipes
+        self.scale = scale          # distance ratio of pinch gestures
+
+    def __repr__(self):
+        s = "{}({}, {}".format(type(self).__name__,
+                               GestureType.names[self.type],
+                               self.num_touches)
+        if self.type == GestureType.SWIPE:
+            s += ", direction=({:.1f}, {:.1f})".format(*self.direction)
+        if self.type in (GestureType.PINCH_UPDATE, GestureType.PINCH_END):
+            s += ", scale={:.2f}".format(self.scale)
+        return s + ")"
+
+
+class GestureRecognizer:
+    """
+    Incremental state machine detecting multi-finger taps, drags,
+    swipes and two-finger pinches.
+
+    A gesture spans from the first touch begin to the last touch end.
+    It is detected once a second touch begins within detection_span
+    milliseconds of the first one. Each begin, update and end sample
+    is processed in constant time.
+
+    Doctests:
+    >>> g = GestureRecognizer()
+
+    # single touches are never gestures
+    >>> g.process([("begin", 1, 0, 0, 0), ("update", 1, 100, 0, 50),
+    ...            ("end", 1, 100, 0, 100)])
+    []
+
+    # three finger tap
+    >>> g.process([("begin", 1, 0, 0, 0), ("begin", 2, 50, 0, 20),
+    ...            ("begin", 3, 100, 0, 40), ("end", 1, 0, 0, 150),
+    ...            ("end", 2, 50, 0, 160), ("end", 3, 100, 0, 170)])
+    [GestureEvent(TAP, 3)]
+
+    # too slow for a tap
+    >>> g.process([("begin", 1, 0, 0, 0), ("begin", 2, 50, 0, 20),
+    ...            ("end", 1, 0, 0, 500), ("end", 2, 50, 0, 510)])
+    []
+
+    # second touch too late, no gesture
+    >>> g.process([("begin", 1, 0, 0, 0), ("begin", 2, 50, 0, 200),
+    ...            ("end", 1, 0, 0, 250), ("end", 2, 50, 0, 260)])
+    []
+
+    # slow two finger drag
+    >>> g.process([("begin", 1, 0, 0, 0), ("begin", 2, 50, 0, 20),
+    ...            ("update", 1, 0, 30, 300), ("update", 2, 50, 30, 310),
+    ...            ("update", 1, 0, 60, 600), ("update", 2, 50, 60, 610),
+    ...            ("end", 1, 0, 60, 1000), ("end", 2, 50, 60, 1010)])
+    [GestureEvent(DRAG_BEGIN, 2), GestureEvent(DRAG_END, 0)]
+
+    # fast two finger swipe to the left
+    >>> g.process([("begin", 1, 200, 0, 0), ("begin", 2, 250, 0, 20)] +
+    ...           [("update", 1 + i % 2, 185 - i // 2 * 15 + i % 2 * 50, 0,
+    ...             40 + i * 5) for i in range(8)] +
+    ...           [("end", 1, 140, 0, 80), ("end", 2, 190, 0, 85)])
+    ...                                        # doctest: +NORMALIZE_WHITESPACE
+    [GestureEvent(DRAG_BEGIN, 2), GestureEvent(DRAG_END, 0),
+     GestureEvent(SWIPE, 2, direction=(-1.0, 0.0))]
+
+    # pinch, fingers moving apart
+    >>> g.process([("begin", 1, 100, 0, 0), ("begin", 2, 200, 0, 20),
+    ...            ("update", 1, 90, 0, 300), ("update", 2, 210, 0, 310),
+    ...            ("update", 1, 80, 0, 320), ("update", 2, 220, 0, 330),
+    ...            ("end", 1, 80, 0, 600), ("end", 2, 220, 0, 610)])
+    ...                                        # doctest: +NORMALIZE_WHITESPACE
+    [GestureEvent(PINCH_BEGIN, 2), GestureEvent(PINCH_UPDATE, 2, scale=1.40),
+     GestureEvent(PINCH_END, 2, scale=1.40)]
+
+    # cancelled detection, e.g. the first touch already pressed a key
+    >>> g.begin(1, (0, 0), 0)
+    []
+    >>> g.cancel_detection()
+    >>> g.begin(2, (50, 0), 20); g.is_detected()
+    []
+    False
+    """
+
+    DETECTION_SPAN = 100          # [ms] until a multi-touch gesture is detected
+    TAP_MAX_DURATION = 300        # [ms]
+    DRAG_THRESHOLD = 40           # [px] movement until a drag or
+                                  #      pinch is detected
+    SWIPE_MIN_VELOCITY = 1000.0   # [px/s] at the end of a drag
+    SWIPE_MAX_PAUSE = 50          # [ms] between last motion and release
+    VELOCITY_SMOOTHING = 0.5      # weight of the newest velocity sample
+
+    # gesture states
+    (
+        NONE,
+        DRAG,
+        PINCH,
+    ) = range(3)
+
+    def __init__(self, detection_span = None):
+        if detection_span is not None:
+            self.DETECTION_SPAN = detection_span
+        self.reset()
+
+    def reset(self):
+        self._touches = {}        # id: [begin_x, begin_y, x, y]
+        self._num_taps = 0        # touches begun during the gesture
+        self._max_touches = 0
+        self._begin_time = 0
+        self._detected = False
+        self._cancelled = False
+        self._state = self.NONE
+
+        # running sums for the centroid of the active touches
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._sum_begin_x = 0.0
+        self._sum_begin_y = 0.0
+
+        # centroid motion, for swipes
+        self._centroid = None
+        self._centroid_time = 0
+        self._velocity = (0.0, 0.0)
+        self._motion_time = 0
+
+        self._pinch_begin_distance = 0.0
+        self._scale = 1.0
+
+    def is_detected(self):
+        """ Has the current touch sequence become a multi-touch gesture? """
+        return self._detected
+
+    def in_detection_span(self, time):
+        """ Could a gesture still be detected at event time <time>? """
+        return time - self._begin_time < self.DETECTION_SPAN
+
+    def cancel_detection(self):
+        """
+        Prevent gesture detection for the remaining touch sequence,
+        e.g. because the first touch was delivered as a key press.
+        """
+        self._cancelled = True
+
+    def get_num_touches(self):
+        return len(self._touches)
+
+    def begin(self, id, point, time):
+        """ Touch begin, returns a list of GestureEvents """
+        if not self._touches:
+            self.reset()
+            self._begin_time = time
+        elif self.in_detection_span(time) and \
+             not self._cancelled:
+            self._detected = True
+
+        x, y = point
+        self._touches[id] = [x, y, x, y]
+        self._sum_x += x
+        self._sum_y += y
+        self._sum_begin_x += x
+        self._sum_begin_y += y
+        self._num_taps += 1
+        self._max_touches = max(self._max_touches, len(self._touches))
+
+        # centroid jumps with the number of touches, restart tracking
+        self._reset_centroid(time)
+        if self._state == self.PINCH:
+            self._pinch_begin_distance = self._get_pinch_distance() / \
+                                         self._scale
+
+        return []
+
+    def update(self, id, point, time):
+        """ Touch motion, returns a list of GestureEvents """
+        touch = self._touches.get(id)
+        if touch is None:
+            return []
+
+        x, y = point
+        self._sum_x += x - touch[2]
+        self._sum_y += y - touch[3]
+        touch[2] = x
+        touch[3] = y
+        self._update_centroid(time)
+
+        events = []
+        if not self._detected:
+            return events
+
+        if self._state == self.NONE:
+            num_touches = len(self._touches)
+            threshold = self.DRAG_THRESHOLD
+
+            # displacement of the centroid
+            dx = (self._sum_x - self._sum_begin_x) / num_touches
+            dy = (self._sum_y - self._sum_begin_y) / num_touches
+            displacement = sqrt(dx * dx + dy * dy)
+
+            # change of distance between two touches
+            change = 0.0
+            if num_touches == 2:
+                change = abs(self._get_pinch_distance() -
+                             self._get_pinch_distance(True))
+
+            if change >= threshold and \
+               change > displacement:
+                self._state = self.PINCH
+                self._pinch_begin_distance = self._get_pinch_distance(True)
+                events.append(GestureEvent(GestureType.PINCH_BEGIN,
+                                           num_touches, time))
+                self._update_pinch(time, events)
+
+            elif displacement >= threshold:
+                self._state = self.DRAG
+                events.append(GestureEvent(GestureType.DRAG_BEGIN,
+                                           num_touches, time))
+
+        elif self._state == self.PINCH:
+            self._update_pinch(time, events)
+
+        return events
+
+    def end(self, id, time, point = None):
+        """ Touch end, returns a list of GestureEvents """
+        events = []
+        touch = self._touches.get(id)
+        if touch is None:
+            return events
+
+        if point is not None and \
+           (point[0] != touch[2] or point[1] != touch[3]):
+            events += self.update(id, point, time)
+
+        del self._touches[id]
+
+        self._sum_x -= touch[2]
+        self._sum_y -= touch[3]
+        self._sum_begin_x -= touch[0]
+        self._sum_begin_y -= touch[1]
+
+        # last touch of the gesture?
+        if not self._touches:
+            if self._detected:
+                state = self._state
+                if state == self.NONE:
+                    elapsed = time - self._begin_time
+                    if elapsed <= self.TAP_MAX_DURATION:
+                        events.append(GestureEvent(GestureType.TAP,
+                                                   self._num_taps, time))
+
+                elif state == self.DRAG:
+                    events.append(GestureEvent(GestureType.DRAG_END,
+                                               0, time))
+                    vx, vy = self._velocity
+                    v = sqrt(vx * vx + vy * vy)
+                    if v >= self.SWIPE_MIN_VELOCITY and \
+                       time - self._motion_time <= self.SWIPE_MAX_PAUSE:
+                        events.append(GestureEvent(GestureType.SWIPE,
+                                                   self._max_touches, time,
+                                                   direction=(vx / v, vy / v)))
+
+                elif state == self.PINCH:
+                    events.append(GestureEvent(GestureType.PINCH_END,
+                                               self._max_touches, time,
+                                               scale=self._scale))
+
+            self._num_taps = 0
+
+        else:
+            self._reset_centroid(time)
+
+        return events
+
+    def process(self, stream):
+        """
+        Feed a recorded stream of (kind, id, x, y, time) tuples,
+        kind being "begin", "update" or "end".
+        Returns the list of all resulting GestureEvents.
+        """
+        events = []
+        for kind, id, x, y, time in stream:
+            if kind == "begin":
+                events += self.begin(id, (x, y), time)
+            elif kind == "update":
+                events += self.update(id, (x, y), time)
+            elif kind == "end":
+                events += self.end(id, time, (x, y))
+            else:
+                raise ValueError("unknown touch event kind '{}'"
+                                 .format(kind))
+        return events
+
+    def _reset_centroid(self, time):
+        n = len(self._touches)
+        if n:
+            self._centroid = (self._sum_x / n, self._sum_y / n)
+        else:
+            self._centroid = None
+        self._centroid_time = time
+
+    def _update_centroid(self, time):
+        n = len(self._touches)
+        c = (self._sum_x / n, self._sum_y / n)
+        c0 = self._centroid
+        dt = time - self._centroid_time
+        if c0 is not None and dt > 0:
+            k = self.VELOCITY_SMOOTHING
+            vx = (c[0] - c0[0]) * 1000.0 / dt
+            vy = (c[1] - c0[1]) * 1000.0 / dt
+            v0 = self._velocity
+            self._velocity = (k * vx + (1.0 - k) * v0[0],
+                              k * vy + (1.0 - k) * v0[1])
+        self._centroid = c
+        self._centroid_time = time
+        self._motion_time = time
+
+    def _get_pinch_distance(self, from_begin = False):
+        """ Distance between the first two touches. """
+        if len(self._touches) < 2:
+            return 0.0
+        it = iter(self._touches.values())
+        t0 = next(it)
+        t1 = next(it)
+        i = 0 if from_begin else 2
+        dx = t1[i] - t0[i]
+        dy = t1[i + 1] - t0[i + 1]
+        return sqrt(dx * dx + dy * dy)
+
+    def _update_pinch(self, time, events):
+        d0 = self._pinch_begin_distance
+        if d0 > 0 and len(self._touches) >= 2:
+            self._scale = self._get_pinch_distance() / d0
+            events.append(GestureEvent(GestureType.PINCH_UPDATE,
+                                       len(self._touches), time,
+                                       scale=self._scale))
+
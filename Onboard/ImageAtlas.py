@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Pre-rasterized images packed into shared surfaces, cached on disk.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import os
+import json
+import shutil
+import threading
+from math import floor
+from collections import OrderedDict
+
+import cairo
+from Onboard.Version import require_gi_versions
+require_gi_versions()
+from gi.repository import Gdk, GdkPixbuf
+
+from Onboard.KeyCommon import ImageStyle
+from Onboard.Timer     import Timer
+from Onboard.utils     import unicode_str
+
+### Logging ###
+import logging
+_logger = logging.getLogger("ImageAtlas")
+###############
+
+
+class AtlasImage:
+    """
+    Image in a cell of an atlas page. Drop-in replacement
+    for PixBufScaled, supports multi-color and single color images.
+    """
+    __slots__ = ("_page", "_x", "_y", "_real_width", "_real_height", "_scale")
+
+    def __init__(self, page, x, y, real_width, real_height, scale):
+        self._page = page
+        self._x = x
+        self._y = y
+        self._real_width = real_width
+        self._real_height = real_height
+        self._scale = scale
+
+    def get_width(self):
+        return self._real_width / self._scale
+
+    def get_height(self):
+        return self._real_height / self._scale
+
+    def draw(self, context, rect, rgba, image_style):
+        context.save()
+
+        context.translate(rect.x, rect.y)
+        scale = self._scale
+        if scale != 1.0:
+            context.scale(1.0 / scale, 1.0 / scale)
+
+        context.rectangle(0, 0, self._real_width, self._real_height)
+        context.clip()
+
+        if image_style == ImageStyle.MULTI_COLOR or rgba is None:
+            context.set_source_surface(self._page, -self._x, -self._y)
+            context.paint()
+        else:
+            context.set_source_rgba(*rgba)
+            context.mask_surface(self._page, -self._x, -self._y)
+
+        context.restore()
+
+
+class AtlasBucket:
+    """
+    All images rasterized to the same pixel size.
+    Images are packed into pages of CELLS_PER_ROW x CELLS_PER_ROW cells.
+    Pages are kept small and loaded from the disk cache only once an
+    image on them is needed, so that memory use follows the images on
+    screen rather than the size of the cache.
+    """
+
+    CELLS_PER_ROW = 8
+    VERSION = 2
+
+    def __init__(self, width, height, scale, cache_dir):
+        self._width = width    # cell size in device pixels
+        self._height = height
+        self._scale = scale
+        self._cache_dir = cache_dir
+        self._pages = []        # surfaces, None for pages not loaded yet
+        self._num_cells = 0     # allocated cells
+        self._cells = {}        # name -> (cell index, width, height, mtime)
+        self._stale_cells = set()  # names of cells on lost pages
+        self._images = {}       # name -> AtlasImage or None
+        self._dirty_pages = set()
+
+        if cache_dir:
+            self._load()
+
+    def is_dirty(self):
+        return bool(self._dirty_pages)
+
+    def get_cached_image(self, name):
+        """ Image loaded before, None if it failed, False if unknown. """
+        return self._images.get(name, False)
+
+    def load_image(self, name, resolve_filename):
+        """
+        Return the rasterized image of <name>, rasterize and add it
+        to the atlas if it isn't in the disk cache yet.
+        """
+        image = None
+        filename = resolve_filename(name)
+        if filename:
+            try:
+                mtime = os.path.getmtime(filename)
+            except OSError:
+                mtime = None
+
+            # Trust the disk cache only for unchanged image files.
+            cell = self._cells.get(name)
+            if cell is not None:
+                # load its page, cells of unreadable pages become stale
+                self._get_page(self._get_cell_position(cell[0])[0])
+            if cell is None or cell[3] != mtime or \
+               name in self._stale_cells:
+                cell = self._rasterize(name, filename, mtime)
+
+            if cell:
+                image = self._create_image(*cell[:3])
+
+        self._images[name] = image
+        return image
+
+    def _create_image(self, index, width, height):
+        page, x, y = self._get_cell_position(index)
+        return AtlasImage(self._get_page(page), x, y,
+                          width, height, self._scale)
+
+    def _get_cell_position(self, index):
+        n = self.CELLS_PER_ROW
+        page, i = divmod(index, n * n)
+        row, column = divmod(i, n)
+        return page, column * self._width, row * self._height
+
+    def _allocate_cell(self):
+        n = self.CELLS_PER_ROW
+        index = self._num_cells
+        self._num_cells += 1
+        page = index // (n * n)
+        if page >= len(self._pages):
+            self._pages.append(self._create_page())
+        return index
+
+    def _create_page(self):
+        n = self.CELLS_PER_ROW
+        return cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                  n * self._width, n * self._height)
+
+    def _get_page(self, page):
+        """ Surface of <page>, loaded from the disk cache on first use. """
+        surface = self._pages[page]
+        if surface is None:
+            surface = self._load_page(page)
+            self._pages[page] = surface
+        return surface
+
+    def _load_page(self, page):
+        filename = self._get_page_filename(page)
+        try:
+            surface = cairo.ImageSurface.create_from_png(filename)
+            if surface.get_format() != cairo.FORMAT_ARGB32 or \
+               surface.get_width() != self.CELLS_PER_ROW * self._width or \
+               surface.get_height() != self.CELLS_PER_ROW * self._height:
+                raise ValueError("unexpected page format")
+            return surface
+
+        except (IOError, OSError, ValueError, MemoryError,
+                cairo.Error) as ex:
+            _logger.warning("discarding image atlas page '{}': {}"
+                            .format(filename, unicode_str(ex)))
+
+        # rasterize the images of the lost page again when needed
+        n = self.CELLS_PER_ROW
+        for name, cell in self._cells.items():
+            if cell[0] // (n * n) == page:
+                self._stale_cells.add(name)
+        return self._create_page()
+
+    def _rasterize(self, name, filename, mtime):
+        _logger.debug("rasterizing image '{}' at {}x{}"
+                      .format(filename, self._width, self._height))
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
+                filename, self._width, self._height)
+        except Exception as ex: # private exception gi._glib.GError when
+                                # librsvg2-common wasn't installed
+            _logger.error("failed to load image '{}': {}"
+                          .format(filename, unicode_str(ex)))
+            return None
+
+        # reuse the cell of an outdated image
+        cell = self._cells.get(name)
+        index = cell[0] if cell else self._allocate_cell()
+
+        page, x, y = self._get_cell_position(index)
+        surface = self._get_page(page)
+        width = pixbuf.get_width()
+        height = pixbuf.get_height()
+
+        cr = cairo.Context(surface)
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.rectangle(x, y, self._width, self._height)
+        cr.set_source_rgba(0, 0, 0, 0)
+        cr.fill()
+        Gdk.cairo_set_source_pixbuf(cr, pixbuf, x, y)
+        cr.rectangle(x, y, width, height)
+        cr.fill()
+        surface.flush()
+
+        cell = (index, width, height, mtime)
+        self._cells[name] = cell
+        self._stale_cells.discard(name)
+        self._dirty_pages.add(page)
+        return cell
+
+    def _get_page_filename(self, page):
+        return os.path.join(self._cache_dir, "page{}.png".format(page))
+
+    def _get_index_filename(self):
+        return os.path.join(self._cache_dir, "index.json")
+
+    def _load(self):
+        """ Load the cell index from the disk cache, pages come later. """
+        filename = self._get_index_filename()
+        if not os.path.exists(filename):
+            return
+
+        try:
+            with open(filename) as f:
+                index = json.load(f)
+
+            if index.get("version") != self.VERSION or \
+               index.get("cell_size") != [self._width, self._height]:
+                return
+
+            n = self.CELLS_PER_ROW
+            num_pages = index.get("num_pages", 0)
+            num_cells = index.get("num_cells", 0)
+            cells = {name : tuple(cell)
+                     for name, cell in index.get("cells", {}).items()}
+            if num_cells > num_pages * n * n or \
+               any(not 0 <= cell[0] < num_cells for cell in cells.values()):
+                raise ValueError("inconsistent cell index")
+
+        except (IOError, OSError, ValueError, TypeError, IndexError) as ex:
+            _logger.warning("discarding image atlas cache '{}': {}"
+                            .format(self._cache_dir, unicode_str(ex)))
+            return
+
+        self._pages = [None] * num_pages
+        self._num_cells = num_cells
+        self._cells = cells
+
+    def get_cache_dir(self):
+        return self._cache_dir
+
+    def get_save_job(self):
+        """
+        Copy modified pages and the cell index for the disk cache.
+        Returns a function writing the copies, safe to run in a worker
+        thread while drawing goes on, None if there is nothing to save.
+        """
+        if not self._cache_dir or not self._dirty_pages:
+            return None
+
+        pages = [(self._get_page_filename(page),
+                  self._copy_surface(self._pages[page]))
+                 for page in sorted(self._dirty_pages)]
+        index = {"version"   : self.VERSION,
+                 "cell_size" : [self._width, self._height],
+                 "num_pages" : len(self._pages),
+                 "num_cells" : self._num_cells,
+                 "cells"     : {name : self._get_saved_cell(name, cell)
+                                for name, cell in self._cells.items()}}
+        self._dirty_pages = set()
+
+        return lambda: self._write(self._cache_dir, pages,
+                                   self._get_index_filename(), index)
+
+    def _get_saved_cell(self, name, cell):
+        """ Keep the cells of lost pages, but without a valid mtime. """
+        if name in self._stale_cells:
+            return cell[:3] + (None,)
+        return cell
+
+    @staticmethod
+    def _copy_surface(surface):
+        copy = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                  surface.get_width(), surface.get_height())
+        cr = cairo.Context(copy)
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.set_source_surface(surface, 0, 0)
+        cr.paint()
+        copy.flush()
+        return copy
+
+    @staticmethod
+    def _write(cache_dir, pages, index_filename, index):
+        """
+        Write pages and then the cell index, each to a temporary file
+        first, so that interrupted writes leave no truncated files.
+        """
+        try:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+
+            for filename, surface in pages:
+                tmp_filename = filename + ".tmp"
+                surface.write_to_png(tmp_filename)
+                os.replace(tmp_filename, filename)
+
+            tmp_filename = index_filename + ".tmp"
+            with open(tmp_filename, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_filename, index_filename)
+
+        except (IOError, OSError, cairo.Error) as ex:
+            _logger.warning("failed to save image atlas cache '{}': {}"
+                            .format(cache_dir, unicode_str(ex)))
+
+
+class ImageAtlas:
+    """
+    Rasterized images in size buckets, each bucket packing its images
+    into a few large surfaces. Drawing then becomes a blit from one of
+    these surfaces instead of loading and scaling an image file.
+    Buckets are cached on disk per cell size and scaling factor.
+    Only the most recently used buckets are kept, in memory and on disk,
+    so resizing doesn't accumulate pages of every size passed through.
+    The disk cache is written by a worker thread, PNG encoding would
+    stall drawing otherwise.
+    """
+
+    BUCKET_STEP = 4    # bucket granularity in device pixels
+    SAVE_DELAY = 5.0   # seconds after the last rasterization
+    MAX_BUCKETS = 2    # in memory, e.g. before and after a resize
+    MAX_CACHED_BUCKETS = 4  # on disk
+
+    def __init__(self, cache_dir, resolve_filename):
+        """
+        <resolve_filename> returns the absolute path for an image name.
+        """
+        self._cache_dir = cache_dir
+        self._resolve_filename = resolve_filename
+        self._buckets = OrderedDict()   # least recently used first
+        self._save_timer = Timer()
+        self._save_jobs = []            # writes of evicted buckets
+        self._writer = None             # thread writing the disk cache
+
+    def flush(self):
+        """ Start saving pending changes to the disk cache right away. """
+        self._save_timer.finish()
+
+    @staticmethod
+    def get_bucket_size(width, height, scale):
+        """
+        Image size in device pixels, rounded down to the bucket
+        granularity, so images never exceed the requested size.
+
+        Doctests:
+        >>> ImageAtlas.get_bucket_size(30.2, 29, 1.0)
+        (28, 28)
+        >>> ImageAtlas.get_bucket_size(30.2, 29, 2.0)
+        (60, 56)
+        >>> ImageAtlas.get_bucket_size(3, 3, 1.0)
+        (0, 0)
+        """
+        step = ImageAtlas.BUCKET_STEP
+        return (int(floor(width * scale / step)) * step,
+                int(floor(height * scale / step)) * step)
+
+    def get_image(self, name, width, height, scale):
+        """
+        Image <name> fit into <width> x <height> canvas pixels.
+        Returns None if the image couldn't be loaded.
+        """
+        scale = scale or 1.0
+        w, h = self.get_bucket_size(width, height, scale)
+        if w < 1 or h < 1:
+            return None
+
+        key = (w, h, scale)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._add_bucket(key)
+        else:
+            self._buckets.move_to_end(key)
+
+        image = bucket.get_cached_image(name)
+        if image is False:
+            image = bucket.load_image(name, self._resolve_filename)
+
+            # save once rasterization has settled down
+            if bucket.is_dirty():
+                self._save_timer.start(self.SAVE_DELAY, self._on_save_timer)
+
+        return image
+
+    def _add_bucket(self, key):
+        """ Create a bucket, dropping the least recently used ones. """
+        while len(self._buckets) >= self.MAX_BUCKETS:
+            _key, old_bucket = self._buckets.popitem(last=False)
+            job = old_bucket.get_save_job()
+            if job:
+                self._save_jobs.append(job)
+                self._save_timer.start(self.SAVE_DELAY, self._on_save_timer)
+
+        w, h, scale = key
+        cache_dir = os.path.join(self._cache_dir,
+                                 "{}x{}@{}".format(w, h, scale)) \
+                    if self._cache_dir else None
+        bucket = AtlasBucket(w, h, scale, cache_dir)
+        self._buckets[key] = bucket
+        return bucket
+
+    def _on_save_timer(self):
+        jobs = self._save_jobs
+        self._save_jobs = []
+        for bucket in self._buckets.values():
+            job = bucket.get_save_job()
+            if job:
+                jobs.append(job)
+
+        in_use = set(bucket.get_cache_dir()
+                     for bucket in self._buckets.values())
+
+        # Writes run one after the other, in the order they were queued.
+        previous = self._writer
+        def write():
+            if previous:
+                previous.join()
+            for job in jobs:
+                job()
+            self._prune(in_use)
+
+        self._writer = threading.Thread(name="ImageAtlasWriter",
+                                        target=write)
+        self._writer.start()
+        return False
+
+    def _prune(self, in_use):
+        """
+        Remove all but the MAX_CACHED_BUCKETS most recently
+        saved buckets from the disk cache. Buckets in use are kept.
+        """
+        if not self._cache_dir or \
+           not os.path.isdir(self._cache_dir):
+            return
+
+        try:
+            dirs = [os.path.join(self._cache_dir, fn)
+                    for fn in os.listdir(self._cache_dir)]
+            dirs = [d for d in dirs if os.path.isdir(d)]
+            dirs.sort(key=self._get_mtime, reverse=True)
+            for d in dirs[self.MAX_CACHED_BUCKETS:]:
+                if d not in in_use:
+                    shutil.rmtree(d)
+        except (IOError, OSError) as ex:
+            _logger.warning("failed to prune image atlas cache '{}': {}"
+                            .format(self._cache_dir, unicode_str(ex)))
+
+    @staticmethod
+    def _get_mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
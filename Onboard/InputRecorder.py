@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Recording and replay of input sequences for latency measurements.
+
+Record with "onboard --record-input=FILE", then replay offscreen:
+python3 -m Onboard.InputRecorder FILE [--realtime] [ONBOARD OPTIONS]
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import sys
+import json
+import time
+
+### Logging ###
+import logging
+_logger = logging.getLogger("InputRecorder")
+###############
+
+
+class LatencyStats:
+    """
+    Latency samples in seconds by stage.
+
+    Doctests:
+    >>> s = LatencyStats()
+    >>> for i in range(1, 101):
+    ...     s.add("draw", i / 1000.0)
+    >>> s.add("key-press", 0.002)
+    >>> s.get_stages()
+    ['draw', 'key-press']
+    >>> s.get_percentile("draw", 50)
+    0.05
+    >>> s.get_percentile("draw", 99)
+    0.099
+    >>> s.get_percentile("draw", 100)
+    0.1
+    >>> s.get_percentile("unknown", 50) is None
+    True
+    >>> print(s.format_report())       # doctest: +NORMALIZE_WHITESPACE
+    stage          count   p50 ms   p90 ms   p99 ms   max ms
+    draw             100    50.00    90.00    99.00   100.00
+    key-press          1     2.00     2.00     2.00     2.00
+    """
+
+    def __init__(self):
+        self._samples = {}
+
+    def add(self, stage, latency):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = []
+            self._samples[stage] = samples
+        samples.append(latency)
+
+    def merge(self, stats):
+        for stage, samples in stats._samples.items():
+            for latency in samples:
+                self.add(stage, latency)
+
+    def get_stages(self):
+        return sorted(self._samples)
+
+    def get_count(self, stage):
+        return len(self._samples.get(stage, ()))
+
+    def get_percentile(self, stage, percent):
+        """ Nearest-rank percentile, None without samples. """
+        samples = self._samples.get(stage)
+        if not samples:
+            return None
+        samples.sort()
+        rank = max(int(len(samples) * percent / 100.0 + 0.5), 1)
+        return samples[min(rank, len(samples)) - 1]
+
+    def format_report(self):
+        lines = ["{:<12} {:>7} {:>8} {:>8} {:>8} {:>8}"
+                 .format("stage", "count",
+                         "p50 ms", "p90 ms", "p99 ms", "max ms")]
+        for stage in self.get_stages():
+            lines.append("{:<12} {:>7} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}"
+                         .format(stage, self.get_count(stage),
+                                 *[self.get_percentile(stage, p) * 1000.0
+                                   for p in (50, 90, 99, 100)]))
+        return "\n".join(lines)
+
+
+class LatencyProbe:
+    """
+    Measures the time from receiving an input event to the stages
+    marked along its way, e.g. key press and redraw.
+    Does nothing unless enabled.
+
+    Doctests:
+    >>> LatencyProbe.enable()
+    >>> LatencyProbe.begin_input(time.time())
+    >>> LatencyProbe.mark_drawn()     # unrelated redraw
+    >>> LatencyProbe.damage()
+    >>> LatencyProbe.mark_drawn()
+    >>> LatencyProbe.mark_drawn()     # input complete, nothing to mark
+    >>> LatencyProbe.get_stats().get_count("draw")
+    1
+    >>> LatencyProbe.enable(False)
+    """
+    _stats = None
+    _input_time = None
+    _damaged = False
+
+    @classmethod
+    def enable(cls, enable = True):
+        cls._stats = LatencyStats() if enable else None
+        cls._input_time = None
+        cls._damaged = False
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._stats is not None
+
+    @classmethod
+    def get_stats(cls):
+        return cls._stats
+
+    @classmethod
+    def begin_input(cls, receive_time):
+        """ An input event received at <receive_time> is being handled. """
+        if cls._stats is not None:
+            cls._input_time = receive_time
+            cls._damaged = False
+
+    @classmethod
+    def mark(cls, stage, end_of_input = False):
+        """ The current input event has reached <stage>. """
+        if cls._stats is not None and \
+           cls._input_time is not None:
+            cls._stats.add(stage, time.time() - cls._input_time)
+            if end_of_input:
+                cls._input_time = None
+                cls._damaged = False
+
+    @classmethod
+    def damage(cls):
+        """ The current input event caused parts of the view to be redrawn. """
+        if cls._input_time is not None:
+            cls._damaged = True
+
+    @classmethod
+    def mark_drawn(cls):
+        """
+        A frame was drawn. Completes the current input event if it
+        caused the redraw, else the frame is none of its business.
+        """
+        if cls._damaged:
+            cls.mark("draw", True)
+
+
+class InputRecorder:
+    """
+    Writes delivered input sequences to a file, one JSON object per line.
+    """
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        return cls._instance
+
+    @classmethod
+    def start(cls, filename):
+        """ Begin recording to <filename>, replaces any earlier recorder. """
+        cls.stop()
+        try:
+            cls._instance = InputRecorder(filename)
+        except (IOError, OSError) as ex:
+            _logger.error("failed to record input to '{}': {}"
+                          .format(filename, ex))
+            return
+        LatencyProbe.enable()
+        _logger.info("recording input to '{}'".format(filename))
+
+    @classmethod
+    def stop(cls):
+        """ Finish recording and log the collected latencies. """
+        recorder = cls._instance
+        if recorder:
+            cls._instance = None
+            recorder.close()
+
+            stats = LatencyProbe.get_stats()
+            if stats:
+                _logger.info("input latencies:\n" + stats.format_report())
+            LatencyProbe.enable(False)
+
+    def __init__(self, filename):
+        self._file = open(filename, "w")
+        self._write({"version" : 1})
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def record(self, kind, sequence, view_name, deliver_latency = None):
+        """
+        Record input sequence begin, update or end,
+        kind being "begin", "update" or "end".
+        """
+        device = sequence.source_device
+        if device is not None:
+            name = getattr(device, "name", None)
+            if name is None:
+                name = device.get_name()
+        else:
+            name = None
+
+        record = {"kind"       : kind,
+                  "view"       : view_name,
+                  "id"         : sequence.id,
+                  "point"      : sequence.point,
+                  "root_point" : sequence.root_point,
+                  "button"     : sequence.button,
+                  "state"      : int(sequence.state)
+                                 if sequence.state is not None else None,
+                  "time"       : sequence.time,
+                  "primary"    : sequence.primary,
+                  "device"     : name,
+                  }
+        if deliver_latency is not None:
+            record["deliver"] = deliver_latency
+        self._write(record)
+
+    def _write(self, record):
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+
+class StubView:
+    """
+    Stand-in for a keyboard view, receives replayed input sequences.
+    Only counts them, for testing the replay itself.
+    """
+    def __init__(self):
+        self.num_begins = 0
+        self.num_updates = 0
+        self.num_ends = 0
+
+    def on_input_sequence_begin(self, sequence):
+        self.num_begins += 1
+
+    def on_input_sequence_update(self, sequence):
+        self.num_updates += 1
+
+    def on_input_sequence_end(self, sequence):
+        self.num_ends += 1
+
+
+class ReplayApplication:
+    """
+    Stand-in for OnboardGtk. Runs the actual keyboard and KeyboardWidget
+    in an offscreen window, so replayed input takes the same paths as
+    live input, including drawing. Nothing is shown on screen and
+    no key-strokes reach the desktop.
+    """
+    status_icon = None
+    service_keyboard = None
+
+    def __init__(self, size = (800, 300)):
+        from Onboard.Config import Config
+        from Onboard.Keyboard import Keyboard
+        from Onboard.KeyboardWidget import KeyboardWidget
+        from Onboard.KbdWindow import KbdOffscreenWindow
+        from Onboard.LayoutLoaderSVG import LayoutLoaderSVG
+        from Onboard.Appearance import ColorScheme
+        from Onboard.AtspiStateTracker import AtspiStateTracker
+
+        config = Config()
+        config.init()
+
+        # don't insert text into the focused accessible
+        AtspiStateTracker().freeze()
+
+        self.keyboard = Keyboard(self)
+        self.keyboard_widget = KeyboardWidget(self.keyboard)
+        self._window = KbdOffscreenWindow(self.keyboard_widget)
+        self._window.application = self
+        self._window.set_default_size(*size)
+
+        color_scheme_filename = config.theme_settings.color_scheme_filename
+        color_scheme = ColorScheme.load(color_scheme_filename) \
+                       if color_scheme_filename else None
+        layout = LayoutLoaderSVG().load(None, config.layout_filename,
+                                        color_scheme)
+        self.keyboard.set_layout(layout, color_scheme, None)
+        self.keyboard.text_changer_key_stroke.disable_key_synth()
+
+        self._window.show_all()
+        self.process_events()
+
+    def cleanup(self):
+        self.keyboard_widget.cleanup()
+        self.keyboard.cleanup()
+        self._window.destroy()
+
+    def process_events(self):
+        """ Run pending main loop work, e.g. timers and drawing. """
+        from gi.repository import GLib
+        context = GLib.MainContext.default()
+        while context.pending():
+            context.iteration(False)
+
+    def do_quit_onboard(self):
+        pass
+
+    def on_focusable_gui_opening(self):
+        pass
+
+    def on_focusable_gui_closed(self):
+        pass
+
+
+class InputReplay:
+    """
+    Feeds recorded input sequences into a view, a StubView by default.
+    Reports the recorded delivery latencies and the time the view
+    spent handling each kind of sequence event.
+
+    Doctests:
+    >>> records = [
+    ...     {"kind": "begin", "id": 0, "point": [10, 10], "time": 100,
+    ...      "button": 1, "state": 0, "primary": True, "deliver": 0.001},
+    ...     {"kind": "update", "id": 0, "point": [12, 10], "time": 110,
+    ...      "button": 1, "state": 256, "primary": True, "deliver": 0.008},
+    ...     {"kind": "end", "id": 0, "point": [12, 10], "time": 120,
+    ...      "button": 1, "state": 256, "primary": True, "deliver": 0.001},
+    ...     {"kind": "begin", "id": 0, "view": "LayoutPopup"}]
+    >>> view = StubView()
+    >>> replay = InputReplay(records, view, view_name="KeyboardWidget")
+    >>> stats = replay.run()
+    >>> view.num_begins, view.num_updates, view.num_ends
+    (1, 1, 1)
+    >>> stats.get_stages()
+    ['deliver', 'handle-begin', 'handle-end', 'handle-update']
+    >>> stats.get_percentile("deliver", 100)
+    0.008
+    """
+
+    def __init__(self, records, view = None, view_name = None):
+        """
+        <records> is a file name or a sequence of record dicts.
+        Only records of views named <view_name> are replayed,
+        all of them if None.
+        """
+        if isinstance(records, str):
+            records = self.load(records)
+        self._records = records
+        self._view = view if view is not None else StubView()
+        self._view_name = view_name
+
+    @staticmethod
+    def load(filename):
+        records = []
+        with open(filename) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if "kind" in record:
+                        records.append(record)
+        return records
+
+    def run(self, realtime = False, process_events = None):
+        """
+        Replay all records, as fast as possible or, with <realtime>,
+        spaced by their original event times.
+        <process_events> runs after each record, e.g. to let the view
+        draw and timers fire.
+        Returns a LatencyStats instance.
+        """
+        from Onboard.TouchInput import InputSequence
+
+        stats = LatencyStats()
+        handlers = {"begin"  : self._view.on_input_sequence_begin,
+                    "update" : self._view.on_input_sequence_update,
+                    "end"    : self._view.on_input_sequence_end}
+        sequences = {}
+        last_event_time = None
+
+        LatencyProbe.enable()
+        try:
+            for record in self._records:
+                if self._view_name is not None and \
+                   record.get("view", self._view_name) != self._view_name:
+                    continue
+
+                kind = record["kind"]
+                id = record["id"]
+
+                # Keep sequence objects alive across begin/update/end,
+                # views store state in them.
+                sequence = sequences.get(id)
+                if sequence is None or kind == "begin":
+                    sequence = InputSequence()
+                    sequences[id] = sequence
+                self._init_sequence(sequence, record)
+
+                event_time = sequence.time
+                if realtime and \
+                   event_time is not None and \
+                   last_event_time is not None:
+                    delay = (event_time - last_event_time) / 1000.0
+                    deadline = time.time() + delay
+                    while time.time() < deadline:
+                        if process_events:
+                            process_events()
+                        time.sleep(min(0.001, max(deadline - time.time(),
+                                                  0.0)))
+                last_event_time = event_time
+
+                if "deliver" in record:
+                    stats.add("deliver", record["deliver"])
+
+                begin = time.time()
+                LatencyProbe.begin_input(begin)
+                handlers[kind](sequence)
+                stats.add("handle-" + kind, time.time() - begin)
+
+                if kind == "end":
+                    del sequences[id]
+
+                if process_events:
+                    process_events()
+
+            # add stages marked inside of the view, e.g. key-press
+            stats.merge(LatencyProbe.get_stats())
+        finally:
+            LatencyProbe.enable(False)
+
+        return stats
+
+    @staticmethod
+    def _init_sequence(sequence, record):
+        sequence.id = record["id"]
+        point = record.get("point") or (0, 0)
+        sequence.point = tuple(point)
+        sequence.root_point = tuple(record.get("root_point") or point)
+        sequence.button = record.get("button")
+        sequence.state = record.get("state")
+        sequence.time = record.get("time")
+        sequence.update_time = time.time()
+        sequence.primary = record.get("primary", False)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("usage: {} RECORDING [--realtime] [ONBOARD OPTIONS]"
+              .format(argv[0]))
+        return 1
+
+    realtime = "--realtime" in argv[2:]
+
+    # Remaining arguments are for Onboard's configuration, e.g. --layout.
+    sys.argv = [argv[0]] + [arg for arg in argv[2:] if arg != "--realtime"]
+
+    app = ReplayApplication()
+    try:
+        replay = InputReplay(argv[1], app.keyboard_widget,
+                             view_name="KeyboardWidget")
+        stats = replay.run(realtime, app.process_events)
+    finally:
+        app.cleanup()
+
+    print(stats.format_report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
+
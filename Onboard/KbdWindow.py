@@ -1531,6 +1531,24 @@ class KbdPlugWindow(KbdWindowBase, WindowRectTracker, Gtk.Plug):
         pass
 
 
+class KbdOffscreenWindow(KbdWindowBase, WindowRectTracker,
+                         Gtk.OffscreenWindow):
+    """
+    Hosts the keyboard widget without showing it on screen,
+    e.g. for replaying recorded input.
+    """
+    def __init__(self, keyboard_widget):
+        Gtk.OffscreenWindow.__init__(self)
+        WindowRectTracker.__init__(self)
+        KbdWindowBase.__init__(self, keyboard_widget, None)
+
+    def _on_configure_event(self, widget, event):
+        KbdWindowBase._on_configure_event(self, widget, event)
+
+    def toggle_visible(self):
+        pass
+
+
 class WMQuirksDefault:
     """ Miscellaneous window managers, no special quirks """
     wms = ()
@@ -224,6 +224,9 @@ class KeyCommon(DrawingItem):
     # Size to draw the label text in Pango units
     font_size = 1
 
+    # State the font size was last fitted for, see LayoutView.update_labels
+    font_fit_state = None
+
     # Labels which are displayed by this key
     labels = None  # {modifier_mask : label, ...}
 
@@ -24,7 +24,7 @@
 
 from __future__ import division, print_function, unicode_literals
 
-from math import pi, sin, cos, sqrt
+from math import pi, sin, cos, sqrt, floor, ceil
 
 import cairo
 from Onboard.Version import require_gi_versions
@@ -53,12 +53,15 @@ PangoUnscale = 1.0 / Pango.SCALE
 
 class Key(KeyCommon):
     _pango_layouts = None
-    _label_extents = None  # resolution independent size {mod_mask: (w, h)}
+    _label_extents = None  # resolution independent size {label: (w, h)}
+    _shared_label_extents = {}  # shared by all keys {(label, font): (w, h)}
     _popup_indicator = ""  # font dependent popup indicator (ellipsis)
 
     _shadow_steps  = 0
     _shadow_alpha  = 0
     _shadow_presets = ((1, 0.015), (4, 0.005)) # quality presets (steps, alpha)
+    _shadow_masks   = {}   # shared shadow masks {shape signature: mask}
+    _shadow_subpixel_steps = 8   # quantization of fractional key positions
 
     def __init__(self):
         KeyCommon.__init__(self)
@@ -91,6 +94,10 @@ class Key(KeyCommon):
         Key.prepare_pango_layout(layout, text, font_size)
         return layout
 
+    @staticmethod
+    def reset_shared_label_extents():
+        Key._shared_label_extents = {}
+
     @staticmethod
     def prepare_pango_layout(layout, text, font_size):
         if text is None:
@@ -108,6 +115,18 @@ class Key(KeyCommon):
         _class._shadow_steps, _class._shadow_alpha = \
                                     _class._shadow_presets[quality]
 
+    @staticmethod
+    def reset_shadow_masks():
+        """
+        Drop all shared shadow masks, e.g. after resizing,
+        change of theme settings.
+        """
+        Key._shadow_masks = {}
+
+    @staticmethod
+    def get_num_shadow_masks():
+        return len(Key._shadow_masks)
+
 
 class RectKey(Key, RectKeyCommon, DwellProgress):
 
@@ -157,12 +176,12 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
             super(RectKey, self).set_border_rect(rect)
             self.invalidate_caches()
 
-    def draw_cached(self, cr):
-        key = (self.label, self.font_size >> 8)
+    def draw_cached(self, cr, lod=LOD.FULL):
+        key = (self.label, self.font_size >> 8, lod)
         entry = self._key_surfaces.get(key)
         if entry is None:
             if self.font_size:
-                entry = self._create_key_surface(cr)
+                entry = self._create_key_surface(cr, lod)
                 self._key_surfaces[key] = entry
 
         if entry:
@@ -170,7 +189,7 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
             cr.set_source_surface(surface, rect.x, rect.y)
             cr.paint()
 
-    def _create_key_surface(self, base_context):
+    def _create_key_surface(self, base_context, lod=LOD.FULL):
         rect = self.get_canvas_rect()
         clip_rect = rect.inflate(*self.get_extra_render_size()).int()
 
@@ -182,7 +201,7 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
 
         cr.save()
         cr.translate(-clip_rect.x, -clip_rect.y)
-        self.draw(cr)
+        self.draw(cr, lod)
         cr.restore()
 
         Gdk.flush()  # else artefacts in labels and images on Nexus 7, Raring
@@ -191,7 +210,7 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
 
     def draw_item(self, context):
         if context.draw_cached and self.can_draw_cached:
-            self.draw_cached(context.cr)
+            self.draw_cached(context.cr, context.lod)
         else:
             self.draw(context.cr, context.lod)
 
@@ -665,19 +684,78 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
             context.set_source_rgba(0.0, 0.0, 0.0, 1.0)
             context.mask_surface(surface, rect.x, rect.y)
 
-    def create_shadow_surface(self, base_context, shadow_steps, shadow_alpha):
+    def create_shadow_surface(self, base_context, shadow_steps, shadow_alpha,
+                              use_cache = True):
+        """
+        Get the shadow mask and its placement in canvas coordinates.
+
+        Keys of identical shape share a single mask, so the slow blurring
+        has to be done only once per distinct shape of the layout.
+        """
+        rect = self.get_canvas_rect()
+        if rect.is_empty():
+            return None
+
+        origin = (floor(rect.x), floor(rect.y))
+        signature = self.get_shadow_signature(rect, shadow_steps, shadow_alpha)
+
+        mask = Key._shadow_masks.get(signature) if use_cache else None
+        if mask is None:
+            mask = self._create_shadow_mask(base_context, rect, signature[1],
+                                            shadow_steps, shadow_alpha)
+            if use_cache:
+                Key._shadow_masks[signature] = mask
+
+        surface, mask_rect = mask
+        return surface, mask_rect.offset(*origin)
+
+    def get_shadow_signature(self, rect, shadow_steps, shadow_alpha):
+        """
+        Key for the shared shadow mask cache. Everything that influences
+        the rendered mask, apart from the integer canvas position, has to
+        be part of it.
+        """
+        steps = self._shadow_subpixel_steps
+        local_pos = (round((rect.x - floor(rect.x)) * steps) / steps,
+                     round((rect.y - floor(rect.y)) * steps) / steps)
+
+        if self.geometry:
+            shape = []
+            for op, coords in self.get_canvas_path().segments:
+                shape.append(op)
+                for i in range(0, len(coords), 2):
+                    shape.append(round(coords[i] - rect.x, 2))
+                    shape.append(round(coords[i + 1] - rect.y, 2))
+            shape.append(self.get_chamfer_size())
+            shape = tuple(shape)
+        else:
+            shape = None
+
+        theme_settings = config.theme_settings
+        extent = min(self.get_layout_root().context \
+                         .scale_log_to_canvas((1.0, 1.0)))
+        return (shadow_steps, local_pos,
+                round(rect.w, 2), round(rect.h, 2), shape,
+                shadow_alpha, extent, self.get_light_direction(),
+                theme_settings.key_shadow_strength,
+                theme_settings.key_shadow_size,
+                theme_settings.roundrect_radius,
+                config.window.transparent_background)
+
+    def _create_shadow_mask(self, base_context, rect, local_pos,
+                            shadow_steps, shadow_alpha):
         """
         Draw shadow and shaded halo.
         Somewhat slow, make sure to cache the result.
         Glitchy, if the clip-rect covers only a single button (Precise),
         therefore, draw only with unrestricted clipping rect.
+
+        The mask is rendered relative to the integer part of the key's
+        canvas position, with the fractional part quantized to
+        local_pos. Its rectangle is returned in these local coordinates.
         """
-        rect = self.get_canvas_rect()
         root = self.get_layout_root()
 
-        if rect.is_empty():
-            return None
-
         extent = min(root.context.scale_log_to_canvas((1.0, 1.0)))
         alpha = pi / 2 + self.get_light_direction()
 
@@ -693,12 +771,15 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
         halo_opacity   = shadow_opacity * 0.11
         halo_radius    = max(extent * 8.0, 1.0)
 
-        clip_rect = rect.offset(shadow_offset[0]+1, shadow_offset[1]+1)
+        local_rect = Rect(local_pos[0], local_pos[1], rect.w, rect.h)
+        r = local_rect.offset(shadow_offset[0]+1, shadow_offset[1]+1)
         if has_halo:
-            clip_rect = clip_rect.inflate(halo_radius * 1.5)
+            r = r.inflate(halo_radius * 1.5)
         else:
-            clip_rect = clip_rect.inflate(shadow_radius * 1.3)
-        clip_rect = clip_rect.int()
+            r = r.inflate(shadow_radius * 1.3)
+        x0, y0 = floor(r.x), floor(r.y)
+        clip_rect = Rect(x0, y0, int(ceil(r.right())) - x0,
+                                 int(ceil(r.bottom())) - y0)
 
         # create caching surface
         target = base_context.get_target()
@@ -713,6 +794,9 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
         context.rectangle(*clip_rect)
         context.clip()
 
+        # from here on draw in canvas coordinates
+        context.translate(local_rect.x - rect.x, local_rect.y - rect.y)
+
         context.push_group_with_content(cairo.CONTENT_ALPHA)
         self._build_canvas_path(context, rect)
         context.set_source_rgba(0.0, 0.0, 0.0, 1.0)
@@ -800,24 +884,33 @@ class RectKey(Key, RectKeyCommon, DwellProgress):
         """
         Update resolution independent extents of the label layout.
         """
-        extents = self._label_extents.get(mod_mask)
+        label = self.get_label()
+        extents = self._label_extents.get(label)
         if not extents:
-            extents = self.calc_label_base_extents(self.get_label())
-            self._label_extents[mod_mask] = extents
+            extents = self.calc_label_base_extents(label)
+            self._label_extents[label] = extents
 
         return extents
 
     def calc_label_base_extents(self, label):
-        """ Calculate font-size independent extents. """
-        cr = Gdk.pango_context_get()
-        layout = Pango.Layout(cr)
-        BASE_FONTDESCRIPTION_SIZE = 10000000
-        self.prepare_pango_layout(layout, label, BASE_FONTDESCRIPTION_SIZE)
-        w, h = layout.get_size()   # In Pango units
-        w = w or 1.0
-        h = h or 1.0
-        return w / (Pango.SCALE * BASE_FONTDESCRIPTION_SIZE), \
-               h / (Pango.SCALE * BASE_FONTDESCRIPTION_SIZE)
+        """
+        Calculate font-size independent extents.
+        Results are shared between all keys with the same label and font.
+        """
+        cache_key = (label, config.theme_settings.key_label_font)
+        extents = Key._shared_label_extents.get(cache_key)
+        if extents is None:
+            cr = Gdk.pango_context_get()
+            layout = Pango.Layout(cr)
+            BASE_FONTDESCRIPTION_SIZE = 10000000
+            self.prepare_pango_layout(layout, label, BASE_FONTDESCRIPTION_SIZE)
+            w, h = layout.get_size()   # In Pango units
+            w = w or 1.0
+            h = h or 1.0
+            extents = (w / (Pango.SCALE * BASE_FONTDESCRIPTION_SIZE),
+                       h / (Pango.SCALE * BASE_FONTDESCRIPTION_SIZE))
+            Key._shared_label_extents[cache_key] = extents
+        return extents
 
     def invalidate_label_extents(self):
         """
@@ -935,10 +1028,11 @@ class FixedFontMixin:
         """
         Update resolution independent extents of the label layout.
         """
-        extents = self._label_extents.get(mod_mask)
+        label = "Mg"
+        extents = self._label_extents.get(label)
         if not extents:
-            extents = self.calc_label_base_extents("Mg")
-            self._label_extents[mod_mask] = extents
+            extents = self.calc_label_base_extents(label)
+            self._label_extents[label] = extents
 
         return extents
 
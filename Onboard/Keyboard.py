@@ -23,6 +23,7 @@
 
 from __future__ import division, print_function, unicode_literals
 
+import sys
 import time
 import weakref
 import gc
@@ -46,7 +47,6 @@ from Onboard.KeyboardPopups        import TouchFeedback
 from Onboard.Sound                 import Sound
 from Onboard.ClickSimulator        import (ClickSimulator,
                                            CSButtonMapper, CSFloatingSlave)
-from Onboard.Scanner               import Scanner
 from Onboard.Timer                 import Timer, ProgressiveDelayTimer
 from Onboard.utils                 import (Modifiers, LABEL_MODIFIERS,
                                            parse_key_combination)
@@ -56,7 +56,7 @@ from Onboard.AutoShow              import AutoShow
 from Onboard.AutoHide              import AutoHide
 from Onboard.WordSuggestions       import WordSuggestions
 from Onboard.canonical_equivalents import canonical_equivalents
-from Onboard.CharacterPalette      import CharacterPalettePanel
+from Onboard.InputRecorder         import LatencyProbe
 
 import Onboard.osk as osk
 
@@ -180,10 +180,78 @@ class KeySynthVirtkey(KeySynth):
     def __init__(self, keyboard, vk):
         self._keyboard = keyboard
         self._vk = vk
+        self._batch = None   # queued (keycode, press) tuples
+        self._keycode_cache = {}      # keysym -> (keycode, mod_mask)
+        self._spare_keycodes = {}     # spare keycode -> remapped keysym
 
     def cleanup(self):
+        self._batch = None
+        self.invalidate_keycode_cache()
         self._vk = None
 
+    def invalidate_keycode_cache(self):
+        """ Call this when the keymap or the active group changed. """
+        self._keycode_cache = {}
+        self._spare_keycodes = {}
+
+    def _keycode_from_keysym(self, keysym):
+        """
+        Cached keycode and modifier mask for keysym in the current group.
+        Saves a round trip to the X server per key-stroke.
+        """
+        result = self._keycode_cache.get(keysym)
+        if result is None:
+            # Keysyms not in the keymap are remapped to a spare keycode.
+            # Clients translate keycodes with the keymap in force when
+            # the events arrive, so send queued key-strokes first, they
+            # may use the keycode about to be remapped.
+            self._flush_batch()
+
+            result = self._vk.keycode_from_keysym(keysym)
+            keycode = result[0]
+
+            # Remapping possibly evicted another keysym, forget about it.
+            if self._vk.touch_keycode(keycode):
+                old_keysym = self._spare_keycodes.get(keycode)
+                if old_keysym is not None and old_keysym != keysym:
+                    self._keycode_cache.pop(old_keysym, None)
+                self._spare_keycodes[keycode] = keysym
+
+            self._keycode_cache[keysym] = result
+
+        elif result[0] in self._spare_keycodes:
+            # keep spare keycodes of frequently typed keysyms mapped
+            self._vk.touch_keycode(result[0])
+
+        return result
+
+    @contextmanager
+    def batched(self):
+        """
+        Queue key-strokes and send them in one go, with a single round trip
+        to the X server, respectively a single write to uinput.
+        Key-strokes are still sent one by one when there is an
+        inter-key-stroke delay, for targets that drop events otherwise.
+        """
+        if self._batch is not None or \
+           config.keyboard.inter_key_stroke_delay:
+            yield None
+        else:
+            self._batch = []
+            try:
+                yield None
+            finally:
+                self._flush_batch()
+                self._batch = None
+
+    def _flush_batch(self):
+        """ Send queued key-strokes, e.g. before modifiers change. """
+        batch = self._batch
+        if batch:
+            self._batch = []
+            if self._vk:
+                self._vk.send_keycodes(batch)
+
     def press_unicode(self, char):
         _logger.debug("KeySynthVirtkey.press_unicode({})".format(repr(char)))
         if self._vk:
@@ -199,7 +267,7 @@ class KeySynthVirtkey(KeySynth):
     def press_keysym(self, keysym):
         _logger.debug("KeySynthVirtkey.press_keysym({})".format(keysym))
         if self._vk:
-            keycode, mod_mask = self._vk.keycode_from_keysym(keysym)
+            keycode, mod_mask = self._keycode_from_keysym(keysym)
 
             # need modifiers for this keysym?
             if mod_mask:
@@ -211,7 +279,7 @@ class KeySynthVirtkey(KeySynth):
     def release_keysym(self, keysym):
         _logger.debug("KeySynthVirtkey.release_keysym({})".format(keysym))
         if self._vk:
-            keycode, mod_mask = self._vk.keycode_from_keysym(keysym)
+            keycode, mod_mask = self._keycode_from_keysym(keysym)
             self.release_keycode(keycode)
 
             self._keyboard.unlock_temporary_modifiers(ModSource.KEYSYNTH)
@@ -219,27 +287,36 @@ class KeySynthVirtkey(KeySynth):
     def press_keycode(self, keycode):
         _logger.debug("KeySynthVirtkey.press_keycode({})".format(keycode))
         if self._vk:
-            self._delay_keypress()
-            self._vk.press_keycode(keycode)
+            if self._batch is not None:
+                self._batch.append((keycode, True))
+            else:
+                self._delay_keypress()
+                self._vk.press_keycode(keycode)
 
     def release_keycode(self, keycode):
         _logger.debug("KeySynthVirtkey.release_keycode({})".format(keycode))
         if self._vk:
-            self._vk.release_keycode(keycode)
+            if self._batch is not None:
+                self._batch.append((keycode, False))
+            else:
+                self._vk.release_keycode(keycode)
 
     def get_current_group(self):
         return self._vk.get_current_group()
 
     def lock_group(self, group):
         if self._vk:
+            self._flush_batch()
             self._vk.lock_group(group)
 
     def lock_mod(self, mod_mask):
         if self._vk:
+            self._flush_batch()
             self._vk.lock_mod(mod_mask)
 
     def unlock_mod(self, mod_mask):
         if self._vk:
+            self._flush_batch()
             self._vk.unlock_mod(mod_mask)
 
     def press_key_string(self, keystr):
@@ -249,21 +326,22 @@ class KeySynthVirtkey(KeySynth):
         keystr = keystr.replace("\\n", "\n")  # for new lines in snippets
 
         if self._vk:   # may be None in the last call before exiting
-            for ch in keystr:
-                if ch == "\b":   # backspace?
-                    keysym = get_keysym_from_name("backspace")
-                    self.press_keysym(keysym)
-                    self.release_keysym(keysym)
-
-                elif ch == "\n":
-                    # press_unicode("\n") fails in gedit.
-                    # -> explicitely send the key symbol instead
-                    keysym = get_keysym_from_name("return")
-                    self.press_keysym(keysym)
-                    self.release_keysym(keysym)
-                else:             # any other printable keys
-                    self.press_unicode(ch)
-                    self.release_unicode(ch)
+            with self.batched():
+                for ch in keystr:
+                    if ch == "\b":   # backspace?
+                        keysym = get_keysym_from_name("backspace")
+                        self.press_keysym(keysym)
+                        self.release_keysym(keysym)
+
+                    elif ch == "\n":
+                        # press_unicode("\n") fails in gedit.
+                        # -> explicitely send the key symbol instead
+                        keysym = get_keysym_from_name("return")
+                        self.press_keysym(keysym)
+                        self.release_keysym(keysym)
+                    else:             # any other printable keys
+                        self.press_unicode(ch)
+                        self.release_unicode(ch)
 
 
 class KeySynthAtspi(KeySynthVirtkey):
@@ -369,6 +447,10 @@ class TextChangerKeyStroke(TextChanger):
 
         self._key_synth = key_synth
 
+    def disable_key_synth(self):
+        """ Swallow all key-strokes, e.g. while replaying recorded input. """
+        self._key_synth = KeySynthVirtkey(self.keyboard, None)
+
     def cleanup(self):
         # Somehow keyboard objects don't get released
         # when switching layouts, there are still
@@ -416,7 +498,15 @@ class TextChangerKeyStroke(TextChanger):
     def unlock_mod(self, mod):
         self._key_synth.unlock_mod(mod)
 
+    def invalidate_keycode_cache(self):
+        if self._key_synth_virtkey:
+            self._key_synth_virtkey.invalidate_keycode_cache()
+
     # Higher-level functions
+    def batched(self):
+        """ Send all key-strokes of the with-block at once. """
+        return self._key_synth.batched()
+
     def press_key_string(self, string):
         self._key_synth.press_key_string(string)
 
@@ -425,9 +515,10 @@ class TextChangerKeyStroke(TextChanger):
         Generate any number of full key-strokes for the given named key symbol.
         """
         keysym = get_keysym_from_name(key_name)
-        for i in range(count):
-            self.press_keysym(keysym)
-            self.release_keysym(keysym)
+        with self.batched():
+            for i in range(count):
+                self.press_keysym(keysym)
+                self.release_keysym(keysym)
 
     def insert_string_at_caret(self, text):
         """
@@ -897,10 +988,14 @@ class Keyboard(WordSuggestions):
     def on_layout_loaded(self):
         """ called when the layout has been loaded """
 
-        palette_panels = \
-            self.find_items_from_classes((CharacterPalettePanel,))
-        for item in palette_panels:
-            item.keyboard = self
+        # Character palettes are imported by the layout loader only
+        # for layouts that contain them, don't load them just to look.
+        module = sys.modules.get("Onboard.CharacterPalette")
+        if module:
+            palette_panels = \
+                self.find_items_from_classes((module.CharacterPalettePanel,))
+            for item in palette_panels:
+                item.keyboard = self
 
         # hide all still visible feedback popups; keys have changed.
         self._touch_feedback.hide()
@@ -941,6 +1036,11 @@ class Keyboard(WordSuggestions):
         self.text_changer_direct_insert = \
             TextChangerDirectInsert(self, vk, self.text_changer_key_stroke)
 
+    def invalidate_keycode_cache(self):
+        """ The keymap or the active keyboard group changed. """
+        if self.text_changer_key_stroke:
+            self.text_changer_key_stroke.invalidate_keycode_cache()
+
     def get_text_changer(self):
         text_context = self.text_context
         if text_context.can_insert_text():
@@ -999,6 +1099,7 @@ class Keyboard(WordSuggestions):
         """ Enable keyboard scanning. """
         if enable:
             if not self.scanner:
+                from Onboard.Scanner import Scanner
                 self.scanner = Scanner(self._on_scanner_redraw,
                                        self._on_scanner_activate)
             if self.layout:
@@ -1668,6 +1769,7 @@ class Keyboard(WordSuggestions):
             activated = False
 
         key.activated = activated
+        LatencyProbe.mark("key-press")
 
     def send_key_release(self, key, view, button=1,
                          event_type=EventType.CLICK):
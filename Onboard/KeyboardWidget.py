@@ -27,6 +27,8 @@ import sys
 import time
 from math import sin, pi
 
+import cairo
+
 from Onboard.Version import require_gi_versions
 require_gi_versions()
 from gi.repository          import GLib, Gdk, Gtk
@@ -40,9 +42,10 @@ from Onboard.KeyGtk         import Key
 from Onboard.KeyCommon      import LOD
 from Onboard.TouchHandles   import TouchHandles
 from Onboard.LayoutView     import LayoutView
-from Onboard.utils          import Rect, escape_markup
+from Onboard.utils          import Rect, escape_markup, XDGDirs
 from Onboard.Timer          import Timer, FadeTimer
 from Onboard.definitions    import Handle, HandleFunction
+from Onboard.StartupSnapshot import StartupSnapshot
 from Onboard.WindowUtils    import WindowManipulator, \
                                    canvas_to_root_window_rect, \
                                    canvas_to_root_window_point, \
@@ -291,6 +294,10 @@ class KeyboardWidget(Gtk.DrawingArea, WindowManipulatorAspectRatio,
     TRANSITION_DURATION_SLIDE = 0.25
     TRANSITION_DURATION_OPACITY_HIDE = 0.3
 
+    # Time after startup until a snapshot of the keyboard is taken
+    # for the next start.
+    STARTUP_SNAPSHOT_DELAY = 3.0
+
     def __init__(self, keyboard):
         Gtk.DrawingArea.__init__(self)
         WindowManipulatorAspectRatio.__init__(self)
@@ -339,6 +346,9 @@ class KeyboardWidget(Gtk.DrawingArea, WindowManipulatorAspectRatio,
 
         self._configure_timer = Timer()
 
+        self._startup_snapshot_key = None   # key to save a snapshot for
+        self._startup_snapshot_timer = Timer()
+
         self._language_menu = LanguageMenu(self)
         self._suggestion_menu = SuggestionMenu(self)
         self._symbol_search_popup = None
@@ -375,6 +385,7 @@ class KeyboardWidget(Gtk.DrawingArea, WindowManipulatorAspectRatio,
         self._auto_release_timer.stop()
         self.stop_click_polling()
         self._configure_timer.stop()
+        self._startup_snapshot_timer.stop()
         self.close_key_popup()
 
         # free xserver memory
@@ -446,11 +457,118 @@ class KeyboardWidget(Gtk.DrawingArea, WindowManipulatorAspectRatio,
 
             self.invalidate_for_resize()
 
+            # At startup show the keyboard as it was drawn last time and
+            # leave rendering keys to the frames after.
+            if self._starting_up and \
+               self._load_startup_snapshot(w, h):
+                return
+
             win = window.get_window()
             if win:
                 context = win.cairo_create()
                 self.render(context)
 
+    @staticmethod
+    def _get_startup_snapshot():
+        return StartupSnapshot(XDGDirs.get_cache_home("onboard/snapshots"))
+
+    def _get_startup_snapshot_key(self, w, h):
+        """ Everything the initial appearance of the keyboard depends on. """
+        layout_filename = config.layout_filename
+        theme_filename = config.theme_filename
+        color_scheme_filename = config.theme_settings.color_scheme_filename
+        theme_settings = config.theme_settings
+        get_mtime = StartupSnapshot.get_mtime
+
+        return StartupSnapshot.get_key(
+            layout_filename, get_mtime(layout_filename),
+            theme_filename, get_mtime(theme_filename),
+            color_scheme_filename, get_mtime(color_scheme_filename),
+            theme_settings.background_gradient,
+            theme_settings.key_style,
+            theme_settings.roundrect_radius,
+            theme_settings.key_size,
+            theme_settings.key_stroke_width,
+            theme_settings.key_fill_gradient,
+            theme_settings.key_stroke_gradient,
+            theme_settings.key_gradient_direction,
+            theme_settings.key_label_font,
+            theme_settings.key_label_overrides,
+            theme_settings.key_shadow_strength,
+            theme_settings.key_shadow_size,
+            config.has_window_decoration(),
+            config.window.transparent_background,
+            list(self.get_background_rgba()),
+            self.supports_alpha,
+            self.can_draw_frame(),
+            self.can_draw_sidebars(),
+            w, h, self.get_scale_factor())
+
+    def _load_startup_snapshot(self, w, h):
+        """
+        Load image and font sizes the keyboard was drawn with at
+        the last start with the same appearance.
+        Returns True if there was a snapshot to show.
+        """
+        if config.xid_mode:
+            return False
+
+        key = self._get_startup_snapshot_key(w, h)
+        surface, font_sizes = self._get_startup_snapshot().load(key)
+
+        if surface is None:
+            # take one once startup has settled down
+            self._startup_snapshot_key = key
+            self._startup_snapshot_timer.start(self.STARTUP_SNAPSHOT_DELAY,
+                                               self._on_startup_snapshot_timer)
+            return False
+
+        scale = self.get_scale_factor()
+        surface.set_device_scale(scale, scale)
+
+        _logger.debug("showing startup snapshot {}".format(key))
+        self._startup_image = surface
+        self.set_font_size_snapshot(font_sizes)
+        return True
+
+    def _on_startup_snapshot_timer(self):
+        key = self._startup_snapshot_key
+        if key is None:
+            return False
+
+        # not drawn yet, e.g. when starting minimized
+        if self._starting_up:
+            return True
+
+        self._startup_snapshot_key = None
+
+        # Save only what a fresh start would show.
+        keyboard = self.keyboard
+        w, h = self.canvas_rect.w, self.canvas_rect.h
+        if key != self._get_startup_snapshot_key(w, h) or \
+           keyboard.get_mod_mask() or \
+           keyboard.get_pressed_key() or \
+           keyboard.has_latched_sticky_keys() or \
+           not keyboard.is_first_layer_active():
+            return False
+
+        self._save_startup_snapshot(key, w, h)
+        return False
+
+    def _save_startup_snapshot(self, key, w, h):
+        scale = self.get_scale_factor()
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                     int(w * scale), int(h * scale))
+        surface.set_device_scale(scale, scale)
+        cr = cairo.Context(surface)
+
+        # Draw uncached, key surfaces are similar to the window's surface.
+        self.draw_frame(cr, LOD.FULL, False)
+        surface.flush()
+
+        _logger.debug("saving startup snapshot {}".format(key))
+        self._get_startup_snapshot().save(key, surface, self.get_font_sizes())
+
     def is_new_layout_size(self, w, h):
         return self.canvas_rect.w != w or \
                self.canvas_rect.h != h
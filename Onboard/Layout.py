@@ -161,6 +161,36 @@ class KeyContext(object):
         return (coord[0] * canvas_rect.w / log_rect.w,
                 coord[1] * canvas_rect.h / log_rect.h)
 
+    def log_to_canvas_rects(self, rects):
+        """
+        Transform a sequence of logical rects in one pass.
+        The transformation is set up only once, so this is much faster
+        than calling log_to_canvas_rect for each rect.
+
+        Doctests:
+        >>> c = KeyContext()
+        >>> c.log_rect = Rect(10, 10, 100, 50)
+        >>> c.canvas_rect = Rect(0, 0, 200, 200)
+        >>> c.log_to_canvas_rects([Rect(10, 10, 50, 25), Rect(60, 35, 0, 5)])
+        [Rect(x=0.0 y=0.0 w=100.0 h=100.0), Rect(x=0.0 y=0.0 w=0.0 h=0.0)]
+        >>> r = Rect(60, 35, 50, 25)
+        >>> c.log_to_canvas_rects([r]) == [c.log_to_canvas_rect(r)]
+        True
+        """
+        canvas_rect = self.canvas_rect
+        log_rect = self.log_rect
+        scale_w = canvas_rect.w / log_rect.w
+        scale_h = canvas_rect.h / log_rect.h
+        offset_x = canvas_rect.x - log_rect.x * scale_w
+        offset_y = canvas_rect.y - log_rect.y * scale_h
+
+        return [Rect(offset_x + r.x * scale_w,
+                     offset_y + r.y * scale_h,
+                     r.w * scale_w,
+                     r.h * scale_h)
+                if r.w > 0 and r.h > 0 else Rect()
+                for r in rects]
+
 
 class LayoutRoot:
     """
@@ -1087,9 +1117,10 @@ class LayoutBox(LayoutItem):
         num_expandables = 0
         length_nonexpandables = 0.0
         num_nonexpandables = 0
+        visibles = [item.has_visible_key() for item in items]
         for i, item in enumerate(items):
             length = item.get_border_rect()[axis + 2]
-            if length and item.has_visible_key():
+            if length and visibles[i]:
                 length *= fully_visible_scale
                 if item.expand:
                     length_expandables += length
@@ -1109,29 +1140,32 @@ class LayoutBox(LayoutItem):
 
         # Calculate the final canvas rectangles and traverse
         # the tree recursively.
-        position = 0.0
+        canvas_rects = []
+        position = canvas_rect[axis]
+        expanded_scale = fully_visible_scale * expandable_scale
         for i, item in enumerate(items):
-            rect = item.get_border_rect()
-            if item.has_visible_key():
-                length  = rect[axis + 2]
+            if visibles[i]:
+                length  = item.get_border_rect()[axis + 2]
                 spacing = canvas_spacing
             else:
                 length  = 0.0
                 spacing = 0.0
 
-            scale = fully_visible_scale
             if item.expand:
-                scale *= expandable_scale
-            canvas_length = length * scale
+                canvas_length = length * expanded_scale
+            else:
+                canvas_length = length * fully_visible_scale
+
+            canvas_rects.append((position, canvas_length))
+            position += canvas_length + spacing
 
-            # set the final canvas rect
-            r = Rect(*canvas_rect)
-            r[axis]   = canvas_rect[axis] + position
+        # set the final canvas rects
+        for item, (position, canvas_length) in zip(items, canvas_rects):
+            r = canvas_rect.copy()
+            r[axis] = position
             r[axis + 2] = canvas_length
             item.do_fit_inside_canvas(r)
 
-            position += canvas_length + spacing
-
     def get_log_extents(self):
         """
         Get the logical extents of the layout tree.
@@ -1294,8 +1328,10 @@ class LayoutPanel(DrawingItem):
             context.log_rect = self.get_border_rect()
             context.canvas_rect = self.get_canvas_rect()  # exclude border
 
-            for item in self.items:
-                rect = context.log_to_canvas_rect(item.context.log_rect)
+            items = self.items
+            rects = context.log_to_canvas_rects(
+                [item.context.log_rect for item in items])
+            for item, rect in zip(items, rects):
                 item.do_fit_inside_canvas(rect)
 
     def update_log_rect(self):
@@ -1673,8 +1709,10 @@ class ScrolledLayoutPanel(LayoutPanel):
                 self.context.scale_log_to_canvas_y(self._scroll_offset[1])
             self.scrolled_context = context
 
-            for item in self.items:
-                rect = context.log_to_canvas_rect(item.context.log_rect)
+            items = self.items
+            rects = context.log_to_canvas_rects(
+                [item.context.log_rect for item in items])
+            for item, rect in zip(items, rects):
                 item.do_fit_inside_canvas(rect)
 
     def draw_item(self, context):
@@ -44,9 +44,13 @@ from Onboard.utils           import (modifiers, Rect,
 from Onboard.WordSuggestions import WordListPanel  # noqa: flake8
 from Onboard.KeyGtk          import (RectKey, WordlistKey, BarKey, # noqa: flake8
                                      WordKey, InputlineKey)
-from Onboard.CharacterPalette import (EmojiPalettePanel,    # noqa: flake8
-                                      SymbolPalettePanel,
-                                      CharacterPaletteKey)
+
+# Layout item classes of optional subsystems, imported on first use.
+LAZY_ITEM_CLASSES = {
+    "EmojiPalettePanel"   : "Onboard.CharacterPalette",
+    "SymbolPalettePanel"  : "Onboard.CharacterPalette",
+    "CharacterPaletteKey" : "Onboard.CharacterPalette",
+}
 
 from Onboard.Config import Config
 config = Config()
@@ -300,6 +304,15 @@ class LayoutLoaderSVG:
             if keysym:
                 parent.update_keysym_rules({keysym : attributes})
 
+    @staticmethod
+    def _get_item_class(class_name):
+        module_name = LAZY_ITEM_CLASSES.get(class_name)
+        if module_name:
+            # Import through __import__, so "--profile-startup" sees it.
+            module = __import__(module_name, fromlist=[class_name])
+            return getattr(module, class_name)
+        return globals()[class_name]
+
     def _init_item(self, attributes, item_class):
         """ Parses attributes common to all LayoutItems """
 
@@ -309,7 +322,7 @@ class LayoutLoaderSVG:
         if "class" in attributes:
             class_name = attributes["class"]
             try:
-                item_class = globals()[class_name]
+                item_class = self._get_item_class(class_name)
             except KeyError as ex:
                 _logger.warning("key {}: class {} not found - "
                                 .format(repr(id), repr(class_name)) +
@@ -22,7 +22,7 @@
 from __future__ import division, print_function, unicode_literals
 
 import time
-from math import pi
+from math import pi, floor, ceil
 
 import cairo
 from Onboard.Version import require_gi_versions
@@ -32,11 +32,14 @@ from gi.repository         import Gtk, Gdk, GdkPixbuf
 from Onboard.utils         import Rect, \
                                   roundrect_arc, roundrect_curve, \
                                   gradient_line, brighten, \
-                                  unicode_str
+                                  unicode_str, merge_rects
 from Onboard.WindowUtils   import get_monitor_dimensions
 from Onboard.KeyGtk        import Key
 from Onboard.KeyCommon     import LOD
+from Onboard.Timer         import Timer, idle_call
 from Onboard.definitions   import UIMask
+from Onboard.InputRecorder import LatencyProbe
+from Onboard.StartupProfile import StartupProfile
 
 
 ### Logging ###
@@ -49,26 +52,77 @@ from Onboard.Config import Config
 config = Config()
 ########################
 
+
+class RedrawStats:
+    """
+    Counters for monitoring the drawing load of a LayoutView.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.redraw_requests = 0  # calls to LayoutView.redraw
+        self.damage_flushes = 0   # batches of damage sent to gtk
+        self.damage_rects = 0     # rectangles queued for drawing
+        self.keys_redrawn = 0     # keys queued for redrawing
+        self.frames_drawn = 0     # calls to LayoutView.draw
+        self.draw_time = 0.0      # total time spent drawing [s]
+
+    def __str__(self):
+        return "redraw_requests={} damage_flushes={} damage_rects={} " \
+               "keys_redrawn={} frames_drawn={} draw_time={:.1f}ms" \
+               .format(self.redraw_requests, self.damage_flushes,
+                       self.damage_rects, self.keys_redrawn,
+                       self.frames_drawn, self.draw_time * 1000)
+
+
 class LayoutView:
     """
     Viewer for a tree of layout items.
     """
 
+    # Upper limit for the moving average of draw times [s]. Exceeding it
+    # reduces the level of detail until drawing has been idle for a while.
+    frame_time_budget = 0.025
+    frame_time_weight = 0.25   # weight of the latest frame in the average
+    adaptive_lod_idle_delay = 1.5  # time until full detail is restored [s]
+
     def __init__(self, keyboard):
         self.keyboard = keyboard
         self.supports_alpha = False
 
         self._lod = LOD.FULL
+        self._adaptive_lod = LOD.FULL
+        self._draw_time_average = 0.0
+        self._adaptive_lod_timer = Timer()
         self._shadow_quality_valid = False
         self._last_canvas_shadow_rect = Rect()
 
         self._starting_up = True
         self._keys_pre_rendered = False
 
+        # Keyboard image and font sizes of an earlier session,
+        # stand-ins until the real thing has been rendered.
+        self._startup_image = None
+        self._font_size_snapshot = None
+
+        # Damage collected until the next frame of the frame clock.
+        self._damage_rects = []
+        self._damage_keys = set()
+        self._damage_all = False
+        self._damage_tick_id = None
+        self.redraw_stats = RedrawStats()
+
         self.keyboard.register_view(self)
 
     def cleanup(self):
         self.keyboard.deregister_view(self)
+        self._adaptive_lod_timer.stop()
+
+        if self._damage_tick_id is not None:
+            self.remove_tick_callback(self._damage_tick_id)
+            self._damage_tick_id = None
+        _logger.debug("redraw statistics: {}".format(self.redraw_stats))
 
         # free xserver memory
         self.invalidate_keys()
@@ -122,6 +176,7 @@ class LayoutView:
         Clear cached shadow surfaces, e.g. after resizing,
         change of theme settings.
         """
+        Key.reset_shadow_masks()
         layout = self.get_layout()
         if layout:
             for item in layout.iter_keys():
@@ -135,6 +190,7 @@ class LayoutView:
         Clear cached resolution independent label extents, e.g.
         after changes to the systems font dpi setting (gtk-xft-dpi).
         """
+        Key.reset_shared_label_extents()
         layout = self.get_layout()
         if layout:
             for item in layout.iter_keys():
@@ -149,6 +205,35 @@ class LayoutView:
             self.keyboard.invalidate_canvas()
             self.keyboard.commit_ui_updates()
 
+    def _update_adaptive_lod(self, draw_time):
+        """
+        Track the moving average of draw times and reduce the level
+        of detail when it exceeds the frame time budget.
+        """
+        k = self.frame_time_weight
+        self._draw_time_average = self._draw_time_average * (1.0 - k) + \
+                                  draw_time * k
+
+        if self._adaptive_lod == LOD.FULL and \
+           self._draw_time_average > self.frame_time_budget:
+            _logger.info("Average draw time {:.1f}ms exceeds budget of "
+                         "{:.1f}ms, reducing level of detail."
+                         .format(self._draw_time_average * 1000,
+                                 self.frame_time_budget * 1000))
+            self._adaptive_lod = LOD.REDUCED
+
+        if self._adaptive_lod != LOD.FULL:
+            self._adaptive_lod_timer.start(self.adaptive_lod_idle_delay,
+                                           self._on_adaptive_lod_idle)
+
+    def _on_adaptive_lod_idle(self):
+        """ Drawing was idle for a while, restore full level of detail. """
+        _logger.info("Restoring full level of detail.")
+        self._adaptive_lod = LOD.FULL
+        self._draw_time_average = 0.0
+        self.redraw()
+        return False
+
     def is_visible(self):
         return None
 
@@ -164,31 +249,74 @@ class LayoutView:
     def redraw(self, items=None, invalidate=True):
         """
         Queue redrawing for individual keys or the whole keyboard.
+
+        Damage is accumulated and handed to gtk once per frame of the
+        frame clock, so bursts of redraw requests, e.g. from modifier
+        changes, dwelling and scanning, result in a single repaint.
         """
+        self.redraw_stats.redraw_requests += 1
+
         if items is None:
-            self.queue_draw()
+            self._damage_all = True
 
         elif len(items) == 0:
-            pass
+            return
 
-        else:
-            area = None
+        elif not self._damage_all:
+            have_layout = bool(self.get_layout())
             for item in items:
                 rect = item.get_canvas_border_rect()
-                area = area.union(rect) if area else rect
 
-                # assume keys need to be refreshed when actively redrawn
-                # e.g. for pressed state changes, dwell progress updates...
-                if invalidate and \
-                   item.is_key():
+                # account for stroke width, anti-aliasing
+                if have_layout:
+                    rect = rect.inflate(*item.get_extra_render_size())
+
+                self._damage_rects.append(rect)
+                if item.is_key():
+                    self._damage_keys.add(item)
+
+        # assume keys need to be refreshed when actively redrawn
+        # e.g. for pressed state changes, dwell progress updates...
+        if invalidate and items:
+            for item in items:
+                if item.is_key():
                     item.invalidate_key()
 
-            # account for stroke width, anti-aliasing
-            if self.get_layout():
-                extra_size = items[0].get_extra_render_size()
-                area = area.inflate(*extra_size)
+        LatencyProbe.damage()
+        self._schedule_damage_flush()
+
+    def _schedule_damage_flush(self):
+        if self._damage_tick_id is None:
+            if self.get_realized() and self.get_frame_clock():
+                self._damage_tick_id = \
+                    self.add_tick_callback(self._on_damage_tick)
+            else:
+                self._flush_damage()
+
+    def _on_damage_tick(self, widget, frame_clock):
+        self._damage_tick_id = None
+        self._flush_damage()
+        return False
+
+    def _flush_damage(self):
+        """ Queue all accumulated damage for drawing in the next frame. """
+        stats = self.redraw_stats
+        stats.damage_flushes += 1
 
-            self.queue_draw_area(*area)
+        if self._damage_all:
+            stats.damage_rects += 1
+            self.queue_draw()
+        else:
+            for rect in merge_rects(self._damage_rects):
+                x0, y0 = floor(rect.x), floor(rect.y)
+                x1, y1 = ceil(rect.right()), ceil(rect.bottom())
+                self.queue_draw_area(x0, y0, x1 - x0, y1 - y0)
+                stats.damage_rects += 1
+            stats.keys_redrawn += len(self._damage_keys)
+
+        self._damage_rects = []
+        self._damage_keys = set()
+        self._damage_all = False
 
     def redraw_labels(self, invalidate=True):
         self.redraw(self.update_labels(), invalidate)
@@ -227,6 +355,11 @@ class LayoutView:
 
     def process_updates(self):
         """ Draw now, synchronously. """
+        if self._damage_tick_id is not None:
+            self.remove_tick_callback(self._damage_tick_id)
+            self._damage_tick_id = None
+            self._flush_damage()
+
         window = self.get_window()
         if window:
             window.process_updates(True)
@@ -261,8 +394,11 @@ class LayoutView:
 
         We can't easily pre-render keys in xembed mode because the window size
         is unknown in advance. Draw there once uncached instead (faster).
+
+        Key surfaces are cached per level of detail. Only the minimal
+        level of detail while resizing is always drawn uncached.
         """
-        return (lod == LOD.FULL) and \
+        return (lod >= LOD.REDUCED) and \
                (not self._starting_up or self._keys_pre_rendered)
 
     def draw(self, widget, cr):
@@ -273,12 +409,44 @@ class LayoutView:
         if not layout:
             return
 
-        lod = self._lod
+        if self._startup_image is not None:
+            self._draw_startup_image(cr)
+            StartupProfile.on_frame_drawn()
+            return False
+
+        begin = time.time()
+        lod = min(self._lod, self._adaptive_lod)
         draw_cached = self._can_draw_cached(lod)
 
         # lazily update font sizes and labels
         if not layout.get_font_sizes_valid():
-            self.update_labels(lod)
+            self.update_labels(self._lod)
+
+        decorated = self.draw_frame(cr, lod, draw_cached)
+
+        draw_time = time.time() - begin
+
+        # Frames while starting up and resizing don't say much about
+        # the regular drawing load.
+        if not self._starting_up and \
+           self._lod == LOD.FULL:
+            self._update_adaptive_lod(draw_time)
+
+        self._starting_up = False
+        self._font_size_snapshot = None
+
+        stats = self.redraw_stats
+        stats.frames_drawn += 1
+        stats.draw_time += draw_time
+
+        LatencyProbe.mark_drawn()
+        StartupProfile.on_frame_drawn()
+
+        return decorated
+
+    def draw_frame(self, cr, lod, draw_cached):
+        """ Draw background and layout items into <cr>. """
+        layout = self.get_layout()
 
         # draw background
         decorated = self._draw_background(cr, lod)
@@ -313,10 +481,26 @@ class LayoutView:
         # draw all visible layout items
         layout.draw_tree(context)
 
-        self._starting_up = False
-
         return decorated
 
+    def _draw_startup_image(self, cr):
+        """
+        Show the snapshot of an earlier session and queue
+        drawing the real keyboard for the next frame.
+        """
+        cr.save()
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.set_source_surface(self._startup_image, 0, 0)
+        cr.paint()
+        cr.restore()
+
+        self._startup_image = None
+        idle_call(self._on_startup_image_shown)
+
+    def _on_startup_image_shown(self):
+        self.redraw()
+        return False
+
     def _draw_background(self, context, lod):
         """ Draw keyboard background """
         transparent_bg = False
@@ -611,6 +795,8 @@ class LayoutView:
         """
         Determine shadow quality based on the estimated render time of
         the first layer's shadows.
+        Keys of identical shape share their shadow masks, so only the
+        number of distinct shapes counts towards the estimate.
         """
         probe_begin = time.time()
         quality = None
@@ -620,23 +806,26 @@ class LayoutView:
         max_probe_keys = 10
         keys = None
         for layer_id in layout.get_layer_ids():
-            layer_keys = list(layout.iter_layer_keys(layer_id))
-            num_first_layer_keys = len(layer_keys)
+            layer_keys = [key for key in layout.iter_layer_keys(layer_id)
+                          if not key.get_canvas_rect().is_empty()]
             keys = layer_keys[:max_probe_keys]
             break
 
         if keys:
             for quality, (steps, alpha) in enumerate(Key._shadow_presets):
+                num_shapes = len(set(key.get_shadow_signature(
+                                         key.get_canvas_rect(), steps, alpha)
+                                     for key in layer_keys))
                 begin = time.time()
                 for key in keys:
-                    key.create_shadow_surface(context, steps, 0.1)
+                    key.create_shadow_surface(context, steps, 0.1, False)
                 elapsed = time.time() - begin
-                estimate = elapsed / len(keys) * num_first_layer_keys
+                estimate = elapsed / len(keys) * num_shapes
                 _logger.debug("Probing shadow performance: "
                               "estimated full refresh time {:6.1f}ms "
-                              "at quality {}, {} steps." \
+                              "at quality {}, {} steps, {} shapes." \
                               .format(estimate * 1000,
-                                      quality, steps))
+                                      quality, steps, num_shapes))
                 if estimate > max_total_time:
                     break
 
@@ -729,6 +918,10 @@ class LayoutView:
         """
         Iterate through all key groups and set each key's
         label font size to the maximum possible for that group.
+
+        Fitting is incremental: unless font sizes were invalidated as a
+        whole, e.g. when resizing, only groups with keys whose label or
+        rectangle changed since the last call are fitted again.
         """
         changed_keys = set()
         layout = self.get_layout()
@@ -746,7 +939,29 @@ class LayoutView:
                         changed_keys.add(key)
 
             # update font sizes
-            for keys in layout.get_key_groups().values():
+            refit_all = not layout.get_font_sizes_valid()
+            snapshot = self._font_size_snapshot
+            for group, keys in layout.get_key_groups().items():
+                fit_states = [self._get_font_fit_state(key)
+                              for key in keys]
+                if not refit_all and \
+                   all(key.font_fit_state == state
+                       for key, state in zip(keys, fit_states)):
+                    continue
+
+                # Skip fitting if the snapshot of an earlier
+                # session was taken in the very same state.
+                if snapshot:
+                    entries = snapshot.get(group)
+                    if entries and \
+                       [state for state, size in entries] == fit_states:
+                        for key, (state, size) in zip(keys, entries):
+                            if key.font_size != size:
+                                key.font_size = size
+                                changed_keys.add(key)
+                            key.font_fit_state = state
+                        continue
+
                 max_size = 0
                 for key in keys:
                     best_size = key.get_best_font_size(mod_mask)
@@ -759,16 +974,48 @@ class LayoutView:
                             if not max_size or best_size < max_size:
                                 max_size = best_size
 
-                for key in keys:
+                for key, state in zip(keys, fit_states):
                     if key.font_size != max_size and \
                        not key.ignore_group:
                         key.font_size = max_size
                         changed_keys.add(key)
+                    key.font_fit_state = state
 
         layout.set_font_sizes_valid(True)
 
         return tuple(changed_keys)
 
+    def get_font_sizes(self):
+        """
+        Font sizes and the states they were fitted in by key group,
+        in a JSON serializable format.
+        """
+        layout = self.get_layout()
+        if not layout:
+            return []
+        return [[group, [[key.font_fit_state, key.font_size]
+                         for key in keys]]
+                for group, keys in layout.get_key_groups().items()]
+
+    def set_font_size_snapshot(self, font_sizes):
+        """ Use font sizes of get_font_sizes() until the next frame. """
+        snapshot = {}
+        for group, entries in font_sizes:
+            snapshot[group] = [(tuple(state) if state else None, size)
+                               for state, size in entries]
+        self._font_size_snapshot = snapshot
+
+    @staticmethod
+    def _get_font_fit_state(key):
+        """
+        Everything the best font size of a key depends on.
+        The label already reflects the modifier state, so modifier
+        changes only refit groups of keys whose labels changed.
+        """
+        r = key.get_border_rect()
+        return (key.get_label(), key.ignore_group,
+                r.x, r.y, r.w, r.h)
+
     def get_key_at_location(self, point):
         layout = self.get_layout()
         keyboard = self.keyboard
@@ -55,6 +55,8 @@ from Onboard.Exceptions      import LayoutFileError
 from Onboard.utils           import unicode_str
 from Onboard.Timer           import CallOnce, Timer
 from Onboard.WindowUtils     import show_confirmation_dialog
+from Onboard.InputRecorder   import InputRecorder
+from Onboard.StartupProfile  import StartupProfile
 import Onboard.osk as osk
 
 ### Config Singleton ###
@@ -176,6 +178,7 @@ class OnboardGtk(object):
 
         # finish config initialization
         config.init()
+        StartupProfile.mark("config")
 
         # Optionally wait a little before proceeding.
         # When the system starts up, the docking strut can be unreliable
@@ -198,13 +201,18 @@ class OnboardGtk(object):
 
         sys.path.append(os.path.join(config.install_dir, 'scripts'))
 
+        if config.options.record_input:
+            InputRecorder.start(config.options.record_input)
+
         # Create the central keyboard model
         self.keyboard = Keyboard(self)
+        StartupProfile.mark("keyboard")
 
         # Create the initial keyboard widget
         # Care for toolkit independence only once there is another
         # supported one besides GTK.
         self.keyboard_widget = KeyboardWidget(self.keyboard)
+        StartupProfile.mark("keyboard widget")
 
         # create the main window
         if config.xid_mode:    # XEmbed mode for gnome-screensaver?
@@ -226,6 +234,8 @@ class OnboardGtk(object):
             self.do_connect(self._window, "quit-onboard",
                             lambda x: self.do_quit_onboard())
 
+        StartupProfile.mark("windows")
+
         # config.xid_mode = True
         self._window.application = self
         # need this to access screen properties
@@ -234,6 +244,7 @@ class OnboardGtk(object):
         # load the initial layout
         _logger.info("Loading initial layout")
         self.reload_layout()
+        StartupProfile.mark("initial layout")
 
         # Handle command line options x, y, size after window creation
         # because the rotation code needs the window's screen.
@@ -547,10 +558,12 @@ class OnboardGtk(object):
 
     def cb_group_changed(self):
         """ keyboard group change """
+        self.keyboard.invalidate_keycode_cache()
         self.reload_layout_delayed()
 
     def cb_keys_changed(self, keymap):
         """ keyboard map change """
+        self.keyboard.invalidate_keycode_cache()
         self.reload_layout_delayed()
 
     def cb_state_changed(self, keymap):
@@ -768,6 +781,7 @@ class OnboardGtk(object):
 
     def cleanup(self):
         self._reload_layout_timer.stop()
+        InputRecorder.stop()
 
         config.cleanup()
 
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Import and initialization timings for "onboard --profile-startup".
+Only depends on the standard library, so it can be installed before
+any other module of Onboard is imported.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+
+class StartupProfile:
+    """
+    Records the time spent importing each module and the time at which
+    startup stages were reached, and writes a report once the
+    first frame was drawn.
+
+    Doctests:
+    >>> StartupProfile._install_time = 10.0
+    >>> StartupProfile._imports = [("a", 0.5, 0.8, 0), ("a.b", 0.3, 0.3, 1)]
+    >>> StartupProfile._stages = [("keyboard", 11.0), ("first frame", 12.5)]
+    >>> print(StartupProfile.format_report(1))
+    startup stages              since start ms
+    keyboard                           1000.00
+    first frame                        2500.00
+    <BLANKLINE>
+    slowest imports              self ms  total ms
+    a                             500.00    800.00
+    """
+    _enabled = False
+    _install_time = None
+    _original_import = None
+    _imports = []     # (module name, self time, total time, nesting depth)
+    _stages = []      # (stage name, time)
+    _stack = []       # [time spent in nested imports] per active import
+
+    @classmethod
+    def install(cls, argv):
+        """ Start profiling if "--profile-startup" is on the command line. """
+        if "--profile-startup" not in argv or cls._enabled:
+            return
+
+        cls._enabled = True
+        cls._install_time = time.time()
+        cls._original_import = builtins.__import__
+        builtins.__import__ = cls._timed_import
+
+    @classmethod
+    def uninstall(cls):
+        if cls._original_import is not None:
+            builtins.__import__ = cls._original_import
+            cls._original_import = None
+        cls._enabled = False
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._enabled
+
+    @classmethod
+    def _timed_import(cls, name, globals=None, locals=None,
+                      fromlist=(), level=0):
+        original_import = cls._original_import
+
+        # Only time the first, actually loading import of a module.
+        if level or name in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+
+        stack = cls._stack
+        stack.append(0.0)
+        begin = time.time()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.time() - begin
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+            cls._imports.append((name, total - nested, total, len(stack)))
+
+    @classmethod
+    def mark(cls, stage):
+        """ Startup has reached <stage>. """
+        if cls._enabled:
+            cls._stages.append((stage, time.time()))
+
+    @classmethod
+    def on_frame_drawn(cls):
+        """
+        Write the report to stderr after the first frame and stop
+        profiling. Like --help it's command line output, so it doesn't
+        depend on the log level.
+        """
+        if cls._enabled:
+            cls.mark("first frame")
+            cls.uninstall()
+            sys.stderr.write(cls.format_report() + "\n")
+
+    @classmethod
+    def format_report(cls, max_imports = 30):
+        lines = ["{:<24} {:>17}".format("startup stages", "since start ms")]
+        for stage, t in cls._stages:
+            lines.append("{:<24} {:>17.2f}"
+                         .format(stage, (t - cls._install_time) * 1000.0))
+
+        lines.append("")
+        lines.append("{:<24} {:>11} {:>9}"
+                     .format("slowest imports", "self ms", "total ms"))
+        imports = sorted(cls._imports, key=lambda x: -x[1])[:max_imports]
+        for name, self_time, total, depth in imports:
+            lines.append("{:<24} {:>11.2f} {:>9.2f}"
+                         .format(name, self_time * 1000.0, total * 1000.0))
+
+        return "\n".join(lines)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Image and font sizes of the keyboard as it was first drawn,
+cached on disk to be shown right away on the next start.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import os
+import json
+import hashlib
+
+import cairo
+
+from Onboard.utils import unicode_str
+
+### Logging ###
+import logging
+_logger = logging.getLogger("StartupSnapshot")
+###############
+
+
+class StartupSnapshot:
+    """
+    Snapshots are stored per key, a hash of everything the appearance of
+    the keyboard depends on, e.g. layout, theme, canvas size and scale.
+    """
+
+    VERSION = 1
+    MAX_SNAPSHOTS = 8   # keep the most recently saved ones
+
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+
+    @staticmethod
+    def get_key(*values):
+        """
+        Hash of <values>, which must be JSON serializable.
+
+        Doctests:
+        >>> k = StartupSnapshot.get_key("layout.onboard", 1.5, [600, 200])
+        >>> len(k)
+        40
+        >>> k == StartupSnapshot.get_key("layout.onboard", 1.5, (600, 200))
+        True
+        >>> k == StartupSnapshot.get_key("layout.onboard", 1.5, [600, 201])
+        False
+        """
+        data = json.dumps([StartupSnapshot.VERSION, values], sort_keys=True)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_mtime(filename):
+        """ Modification time of <filename>, None if it doesn't exist. """
+        try:
+            return os.path.getmtime(filename)
+        except (OSError, TypeError):
+            return None
+
+    def _get_filenames(self, key):
+        base = os.path.join(self._cache_dir, key)
+        return base + ".png", base + ".json"
+
+    def load(self, key):
+        """
+        Returns the image surface and the font sizes of snapshot <key>,
+        (None, None) if there is no such snapshot.
+        """
+        image_filename, font_sizes_filename = self._get_filenames(key)
+        if not os.path.exists(image_filename):
+            return None, None
+
+        try:
+            surface = cairo.ImageSurface.create_from_png(image_filename)
+            with open(font_sizes_filename) as f:
+                font_sizes = json.load(f)
+        except (IOError, OSError, ValueError, MemoryError,
+                cairo.Error) as ex:
+            _logger.warning("discarding startup snapshot '{}': {}"
+                            .format(image_filename, unicode_str(ex)))
+            return None, None
+
+        return surface, font_sizes
+
+    def save(self, key, surface, font_sizes):
+        """ Store image surface and font sizes as snapshot <key>. """
+        image_filename, font_sizes_filename = self._get_filenames(key)
+        try:
+            if not os.path.exists(self._cache_dir):
+                os.makedirs(self._cache_dir)
+
+            # Write the image last, it marks the snapshot as complete.
+            with open(font_sizes_filename, "w") as f:
+                json.dump(font_sizes, f)
+            tmp_filename = image_filename + ".tmp"
+            surface.write_to_png(tmp_filename)
+            os.replace(tmp_filename, image_filename)
+
+        except (IOError, OSError, cairo.Error) as ex:
+            _logger.warning("failed to save startup snapshot '{}': {}"
+                            .format(image_filename, unicode_str(ex)))
+            return
+
+        self._prune()
+
+    def _prune(self):
+        """ Remove all but the MAX_SNAPSHOTS most recent snapshots. """
+        try:
+            keys = [fn[:-4] for fn in os.listdir(self._cache_dir)
+                    if fn.endswith(".png")]
+            keys.sort(key=lambda k: self.get_mtime(
+                self._get_filenames(k)[0]) or 0, reverse=True)
+            for key in keys[self.MAX_SNAPSHOTS:]:
+                for filename in self._get_filenames(key):
+                    if os.path.exists(filename):
+                        os.remove(filename)
+        except (IOError, OSError) as ex:
+            _logger.warning("failed to prune startup snapshots in '{}': {}"
+                            .format(self._cache_dir, unicode_str(ex)))
@@ -20,6 +20,7 @@
 from __future__ import division, print_function, unicode_literals
 
 import time
+import random
 
 ### Logging ###
 import logging
@@ -38,12 +39,38 @@ class TextSpan:
     """
 
     def __init__(self, pos = 0, length = 0, text = "", text_pos = 0):
-        self.pos = pos              # document caret position
+        self._node = None           # SpanTree node while in a TextChanges
+        self._pos = pos             # document caret position
         self.length = length        # span length
         self.text = text            # text that includes span, but may be larger
-        self.text_pos = text_pos    # document position of text begin
+        self._text_pos = text_pos   # document position of text begin
         self.last_modified = None
 
+    def _get_pending_shift(self):
+        """ Shift of the SpanTree not yet applied to this span. """
+        shift = 0
+        node = self._node
+        while node:
+            shift += node.shift
+            node = node.parent
+        return shift
+
+    def _get_pos(self):
+        return self._pos + self._get_pending_shift()
+
+    def _set_pos(self, pos):
+        self._pos = pos - self._get_pending_shift()
+
+    pos = property(_get_pos, _set_pos)
+
+    def _get_text_pos(self):
+        return self._text_pos + self._get_pending_shift()
+
+    def _set_text_pos(self, text_pos):
+        self._text_pos = text_pos - self._get_pending_shift()
+
+    text_pos = property(_get_text_pos, _set_text_pos)
+
     def copy(self):
         return TextSpan(self.pos, self.length, self.text, self.text_pos)
 
@@ -208,10 +235,281 @@ class TextSpan:
                         self.last_modified)
 
 
+class SpanTreeNode:
+    """ Node of a SpanTree """
+
+    def __init__(self, span):
+        self.span = span
+        self.priority = random.random()
+        self.parent = None
+        self.left = None
+        self.right = None
+        self.shift = 0          # not yet applied to this node and its subtree
+
+
+class SpanTree:
+    """
+    Text spans sorted by position, in a randomized balanced
+    binary tree (treap).
+
+    Every node carries a position shift still to be applied to itself
+    and its subtree. Moving all spans after a text change then takes
+    logarithmic time, and so do insertions, removals and lookups.
+    Spans resolve the pending shifts of their ancestors when their
+    position is read.
+
+    Doctests:
+    >>> t = SpanTree()
+    >>> for i in range(10):
+    ...     t.insert_before(None, TextSpan(i * 10, 5))
+    >>> t.shift(t.find_first_begin(35), 100)
+    >>> [span.pos for span in t]
+    [0, 10, 20, 30, 140, 150, 160, 170, 180, 190]
+    >>> t.remove(t.find_first_begin(150))
+    >>> [span.pos for span in t], len(t)
+    ([0, 10, 20, 30, 140, 160, 170, 180, 190], 9)
+    >>> t.find_first_end(36).pos, t.prev(t.find_first_end(36)).pos
+    (140, 30)
+    >>> t.insert_before(t.find_first_begin(140), TextSpan(100, 1))
+    >>> [span.pos for span in t.iter_from(t.find_first_begin(40))]
+    [100, 140, 160, 170, 180, 190]
+    """
+
+    def __init__(self):
+        self._root = None
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        node = self._root
+        if node:
+            node = self._leftmost(node)
+        while node:
+            yield node.span
+            node = self._next_node(node)
+
+    def iter_from(self, span):
+        """ Iterate over <span> and all spans after it. """
+        node = span._node if span else None
+        while node:
+            yield node.span
+            node = self._next_node(node)
+
+    def clear(self):
+        """ Remove all spans, they keep their current positions. """
+        nodes = [self._root] if self._root else []
+        while nodes:
+            node = nodes.pop()
+            self._push(node)
+            node.span._node = None
+            if node.left:
+                nodes.append(node.left)
+            if node.right:
+                nodes.append(node.right)
+        self._root = None
+        self._count = 0
+
+    def next(self, span):
+        node = self._next_node(span._node)
+        return node.span if node else None
+
+    def prev(self, span):
+        node = self._prev_node(span._node)
+        return node.span if node else None
+
+    def find_first_begin(self, pos):
+        """ First span beginning at or after pos, None if there is none. """
+        return self._find_first(pos, False)
+
+    def find_first_end(self, pos):
+        """ First span ending at or after pos, None if there is none. """
+        return self._find_first(pos, True)
+
+    def _find_first(self, pos, by_end):
+        result = None
+        node = self._root
+        shift = 0
+        while node:
+            shift += node.shift
+            span = node.span
+            p = span._pos + shift
+            if by_end:
+                p += span.length
+            if p >= pos:
+                result = node
+                node = node.left
+            else:
+                node = node.right
+        return result.span if result else None
+
+    def insert_before(self, span, new_span):
+        """ Insert new_span before span, at the end if span is None. """
+        node = SpanTreeNode(new_span)
+        if self._root is None:
+            self._root = node
+        else:
+            if span is None:
+                parent = self._rightmost(self._root)
+                left = False
+            elif span._node.left:
+                parent = self._rightmost(span._node.left)
+                left = False
+            else:
+                parent = span._node
+                left = True
+
+            # new_span's position is absolute, clear the way
+            self._push_path(parent)
+            node.parent = parent
+            if left:
+                parent.left = node
+            else:
+                parent.right = node
+
+            while node.parent and \
+                  node.priority > node.parent.priority:
+                self._rotate_up(node)
+
+        new_span._node = node
+        self._count += 1
+
+    def remove(self, span):
+        node = span._node
+        if not self._contains(node):
+            raise ValueError("span not in SpanTree")
+
+        # rotate node down to a leaf
+        self._push_path(node)
+        while node.left or node.right:
+            if node.right is None or \
+               node.left and node.left.priority > node.right.priority:
+                child = node.left
+            else:
+                child = node.right
+            self._push(child)
+            self._rotate_up(child)
+
+        parent = node.parent
+        if parent is None:
+            self._root = None
+        elif parent.left is node:
+            parent.left = None
+        else:
+            parent.right = None
+        node.parent = None
+
+        span._node = None
+        self._count -= 1
+
+    def shift(self, span, delta):
+        """ Move span and all spans after it by delta. """
+        node = span._node
+        self._shift_node_and_right(node, delta)
+        while node.parent:
+            if node.parent.left is node:
+                self._shift_node_and_right(node.parent, delta)
+            node = node.parent
+
+    @staticmethod
+    def _shift_node_and_right(node, delta):
+        span = node.span
+        span._pos += delta
+        span._text_pos += delta
+        if node.right:
+            node.right.shift += delta
+
+    @staticmethod
+    def _push(node):
+        """ Apply the pending shift to the node and pass it on to the
+            children. """
+        shift = node.shift
+        if shift:
+            span = node.span
+            span._pos += shift
+            span._text_pos += shift
+            if node.left:
+                node.left.shift += shift
+            if node.right:
+                node.right.shift += shift
+            node.shift = 0
+
+    def _push_path(self, node):
+        """ Apply all pending shifts from the root down to node. """
+        path = []
+        while node:
+            path.append(node)
+            node = node.parent
+        for node in reversed(path):
+            self._push(node)
+
+    def _rotate_up(self, node):
+        """ Swap node with its parent, both without pending shift. """
+        parent = node.parent
+        grand_parent = parent.parent
+
+        if parent.left is node:
+            parent.left = node.right
+            if node.right:
+                node.right.parent = parent
+            node.right = parent
+        else:
+            parent.right = node.left
+            if node.left:
+                node.left.parent = parent
+            node.left = parent
+        parent.parent = node
+        node.parent = grand_parent
+
+        if grand_parent is None:
+            self._root = node
+        elif grand_parent.left is parent:
+            grand_parent.left = node
+        else:
+            grand_parent.right = node
+
+    def _contains(self, node):
+        while node and node.parent:
+            node = node.parent
+        return node is not None and node is self._root
+
+    @staticmethod
+    def _leftmost(node):
+        while node.left:
+            node = node.left
+        return node
+
+    @staticmethod
+    def _rightmost(node):
+        while node.right:
+            node = node.right
+        return node
+
+    def _next_node(self, node):
+        if node.right:
+            return self._leftmost(node.right)
+        while node.parent and node.parent.right is node:
+            node = node.parent
+        return node.parent
+
+    def _prev_node(self, node):
+        if node.left:
+            return self._rightmost(node.left)
+        while node.parent and node.parent.left is node:
+            node = node.parent
+        return node.parent
+
+
 class TextChanges:
     __doc__ = """
     Collection of text spans yet to be learned.
 
+    Spans are kept in a SpanTree, sorted by position and without
+    overlaps. Lookups as well as the position shifts of insertions and
+    deletions take logarithmic time, however many spans are waiting to
+    be learned. Only spans near a change are returned for a text update.
+
     Example:
     >>> c = TextChanges()
     >>> c.insert(0, 1) # IGNORE_RESULT
@@ -302,13 +600,24 @@ class TextChanges:
 
     """.replace('IGNORE_RESULT', 'doctest: +ELLIPSIS\n    [...')
 
+    # Characters of text kept around each span, see TextContext.
+    # Spans shifted by a change this close by are returned for a
+    # text update, the text of spans further away stays valid.
+    TEXT_MARGIN = 100
+
     def __init__(self, spans = None):
+        self._spans = SpanTree()
         self.clear()
         if spans:
-            self._spans = spans
+            for span in sorted(spans, key=lambda x: (x.begin(), x.end())):
+                self._spans.insert_before(None, span)
 
     def clear(self):
-        self._spans = []
+        self._spans.clear()
+
+        # Spans changed since the last consolidation, only these
+        # may touch their neighbors.
+        self._unconsolidated = set()
 
         # some counts for book-keeping, not used by this class itself.
         self.insert_count = 0
@@ -318,10 +627,12 @@ class TextChanges:
         return len(self._spans) == 0
 
     def get_spans(self):
-        return self._spans
+        """ All spans, sorted by position """
+        return list(self._spans)
 
     def remove_span(self, span):
         self._spans.remove(span)
+        self._unconsolidated.discard(span)
 
     def get_change_count(self):
         return self.insert_count + self.delete_count
@@ -341,47 +652,74 @@ class TextChanges:
         include_length =   +n: include n
         include_length = None: include nothing, don't record
                                zero length span either
-        """
-        end = pos + length
-        spans_to_update = []
 
-        # shift all existing spans after position
-        for span in self._spans:
-            if span.pos > pos:
-                span.pos += length
-                spans_to_update.append(span)
+        Doctests:
+        # spans starting at the insertion point move along
+        >>> c = TextChanges()
+        >>> _ = c.insert(0, 3); _ = c.insert(5, 3); _ = c.delete(2, 4, False)
+        >>> c.get_span_ranges()
+        [[0, 2], [2, 2]]
+        >>> _ = c.insert(2, 1)
+        >>> c.get_span_ranges()
+        [[0, 3], [3, 2]]
+
+        # only spans near the insertion are returned for a text update
+        >>> c = TextChanges()
+        >>> for i in range(10):
+        ...     _ = c.insert(i * 50, 1)
+        >>> [span.pos for span in c.insert(100, 5)]
+        [155, 205, 100]
+        >>> c.get_span_ranges()[:5]
+        [[0, 1], [50, 1], [100, 6], [155, 1], [205, 1]]
+        """
+        spans = self._spans
+        modified = []
+
+        span = self.find_span_at(pos)
+
+        # shift the spans after position
+        first = spans.find_first_begin(pos)
+        if first is not None and \
+           first is span:
+            first = spans.next(first)
+        if first:
+            spans.shift(first, length)
+            shifted = self._get_shifted_spans_near(first, pos + length)
+        else:
+            shifted = []
 
         if include_length == -1:
             # include all of the insertion
-            span = self.find_span_at(pos)
             if span:
                 span.length += length
             else:
                 span = TextSpan(pos, length);
-                self._spans.append(span)
-            spans_to_update.append(span)
+                spans.insert_before(first, span)
+            modified.append(span)
         else:
             # include the insertion up to include_length only
             max_include = min(length, include_length or 0)
-            span = self.find_span_at(pos)
             if span:
                  # cut existing span
                 old_length = span.length
                 span.length = pos - span.pos + max_include
-                spans_to_update.append(span)
+                modified.append(span)
 
                 # new span for the cut part
                 l = old_length - span.length
                 if l > 0 or \
                    l == 0 and include_length is None:
                     span2 = TextSpan(pos + length, l)
-                    self._spans.append(span2)
-                    spans_to_update.append(span2)
+                    spans.insert_before(spans.next(span), span2)
+                    modified.append(span2)
 
             elif not include_length is None:
                 span = TextSpan(pos, max_include)
-                self._spans.append(span)
-                spans_to_update.append(span)
+                spans.insert_before(first, span)
+                modified.append(span)
+
+        self._unconsolidated.update(modified)
+        spans_to_update = shifted + modified
 
         t = time.time()
         for span in spans_to_update:
@@ -400,32 +738,55 @@ class TextChanges:
                                     at deletion point
         record_empty_spans = False: no extra new spans, but keep existing ones
                                     that become zero length (terminal scrolling)
+
+        Doctests:
+        # join spans touching anywhere, not only at the deletion point
+        >>> c = TextChanges()
+        >>> _ = c.insert(30, 1); _ = c.insert(32, 3); _ = c.delete(31, 1, False)
+        >>> c.get_span_ranges()
+        [[30, 1], [31, 3]]
+        >>> _ = c.delete(60, 1)
+        >>> c.get_span_ranges()
+        [[30, 4], [60, 0]]
         """
         begin = pos
         end   = pos + length
+        spans = self._spans
         spans_to_update = []
 
-        #from pudb import set_trace; set_trace()
+        # cut/remove existing spans, those ending before the
+        # deletion point remain untouched.
+        span = spans.find_first_end(begin)
+        while span:
+            next_span = spans.next(span)
 
-        # cut/remove existing spans
-        for span in list(self._spans):
             if span.pos <= pos:          # span begins before deletion point?
                 k = min(span.end() - begin, length)   # intersecting length
                 if k >= 0:
                     span.length -= k
                     spans_to_update.append(span)
-            else:                        # span begins after deletion point
+                    self._unconsolidated.add(span)
+
+            elif span.pos <= end:        # span begins inside deleted range
                 k = end - span.begin()   # intersecting length
-                if k >= 0:
-                    span.pos += k
-                    span.length -= k
-                span.pos -= length       # shift by deleted length
+                span.length -= k
 
                 # remove spans fully contained in the deleted range
-                if span.length < 0:
-                    self._spans.remove(span)
-                else:
+                if span.length >= 0:
+                    span.pos = pos
                     spans_to_update.append(span)
+                    self._unconsolidated.add(span)
+                else:
+                    self.remove_span(span)
+
+            else:                        # span begins after deleted range
+                # shift by deleted length, this and all following spans
+                spans.shift(span, -length)
+                spans_to_update.extend(
+                    self._get_shifted_spans_near(span, pos))
+                break
+
+            span = next_span
 
         # Add new empty span
         if record_empty_spans:
@@ -434,9 +795,9 @@ class TextChanges:
                 # Create empty span when deleting too, because this
                 # is still a change that can result in a word to learn.
                 span = TextSpan(pos, 0);
-                self._spans.append(span)
+                spans.insert_before(spans.find_first_begin(pos + 1), span)
 
-            self._spans, span = self.consolidate_spans(self._spans, span)
+            span = self._consolidate(span)
             spans_to_update.append(span)
 
         if spans_to_update:
@@ -444,6 +805,59 @@ class TextChanges:
 
         return spans_to_update
 
+    def _get_shifted_spans_near(self, span, pos):
+        """
+        Span and the spans following it, that begin within TEXT_MARGIN
+        of the changed text ending at pos. Their text includes the
+        change and needs updating.
+        """
+        spans = []
+        for s in self._spans.iter_from(span):
+            if s.begin() > pos + self.TEXT_MARGIN:
+                break
+            spans.append(s)
+        return spans
+
+    def _consolidate(self, tracked_span):
+        """
+        Join touching or intersecting spans. Only spans changed since
+        the last consolidation can touch their neighbors, the gaps
+        between spans that merely moved stay the same.
+        Returns the span that now includes <tracked_span>.
+        """
+        for span in self._unconsolidated:
+            if span._node:    # not joined with another span yet?
+                self._consolidate_around(span)
+        self._unconsolidated.clear()
+
+        if not tracked_span._node:
+            return self.find_span_at(tracked_span.pos)
+        return self._consolidate_around(tracked_span)
+
+    def _consolidate_around(self, span):
+        """
+        Join the neighbors of span that touch or intersect it.
+        Returns the span that now includes <span>.
+        """
+        spans = self._spans
+
+        prev = spans.prev(span)
+        while prev and \
+              prev.end() >= span.begin():
+            prev.union_inplace(span)
+            spans.remove(span)
+            span = prev
+            prev = spans.prev(span)
+
+        next = spans.next(span)
+        while next and \
+              span.end() >= next.begin():
+            span.union_inplace(next)
+            spans.remove(next)
+            next = spans.next(span)
+
+        return span
+
     @staticmethod
     def consolidate_spans(spans, tracked_span = None):
         """
@@ -501,9 +915,10 @@ class TextChanges:
         >>> c.find_span_at(0)   # doctest: +ELLIPSIS
         TextSpan(0, 0,...
         """
-        for span in self._spans:
-            if span.pos <= pos <= span.pos + span.length:
-                return span
+        span = self._spans.find_first_end(pos)
+        if span and \
+           span.pos <= pos:
+            return span
         return None
 
     def find_span_excluding(self, pos):
@@ -523,9 +938,12 @@ class TextChanges:
         >>> c.find_span_excluding(1)   # doctest: +ELLIPSIS
 
         """
-        for span in self._spans:
+        spans = self._spans
+        for span in spans.iter_from(spans.find_first_end(pos)):
+            if span.pos > pos:
+                break
             if span.pos == pos or \
-               span.pos <= pos < span.pos + span.length:
+               pos < span.pos + span.length:
                 return span
         return None
 
@@ -539,3 +957,254 @@ class TextChanges:
     def __repr__(self):
         return "TextChanges(" + repr([str(span) for span in self._spans]) + ")"
 
+
+
+class TextMirror:
+    """
+    Client-side copy of the text around the caret of an accessible.
+
+    The mirror is patched with the insertions and deletions reported by
+    text-changed events, so reading the text context doesn't have to go
+    through D-Bus for every key stroke. Whenever a change can't be
+    applied or doesn't match the mirrored text, the mirror becomes
+    invalid and the owner has to sync it with the accessible again.
+
+    Doctests:
+    >>> m = TextMirror()
+    >>> m.is_valid()
+    False
+    >>> m.set_contents("hello world", 0, 11, 5)
+    >>> m.get_text(0, 5)
+    'hello'
+
+    # typing at the caret moves the caret
+    >>> m.insert(5, 1, ",")
+    >>> m.get_text(0, 12), m.get_caret(), m.get_character_count()
+    ('hello, world', 6, 12)
+    >>> m.set_caret(6)
+    True
+
+    # deletions are checked against the mirrored text
+    >>> m.delete(5, 1, ",")
+    >>> m.get_text(0, 11), m.get_caret()
+    ('hello world', 5)
+    >>> m.delete(0, 1, "x")
+    >>> m.is_valid()
+    False
+
+    # moving the caret within the mirrored text keeps the text
+    >>> m.set_contents("hello world", 0, 11, 5, (0, 5))
+    >>> m.set_caret(8)
+    True
+    >>> m.get_caret(), m.is_valid(), m.is_selection_valid()
+    (8, True, False)
+
+    # moving the caret beyond the mirrored text invalidates the mirror
+    >>> m.set_contents("world", 6, 11, 8)
+    >>> m.set_caret(2)
+    False
+    >>> m.is_valid()
+    False
+
+    # selection changes keep the text
+    >>> m.set_contents("hello world", 0, 11, 5, (0, 5))
+    >>> m.invalidate_selection()
+    >>> m.is_valid(), m.is_selection_valid()
+    (True, False)
+    """
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        self._valid = False
+        self._text = ""           # mirrored part of the text
+        self._text_pos = 0        # document position of _text
+        self._count = 0           # character count of the whole text
+        self._caret = 0
+        self._selection = None    # (begin, end) or None for no selection
+        self._selection_valid = False
+
+    def is_valid(self):
+        return self._valid
+
+    def set_contents(self, text, text_pos, count, caret,
+                     selection = None, selection_valid = True):
+        """ Sync the mirror with text read from the accessible. """
+        self._valid = True
+        self._text = text
+        self._text_pos = text_pos
+        self._count = count
+        self._caret = caret
+        self._selection = selection
+        self._selection_valid = selection_valid
+
+    def get_character_count(self):
+        return self._count
+
+    def get_caret(self):
+        return self._caret
+
+    def set_caret(self, caret):
+        """
+        Caret moved. Arrow keys and mouse clicks move it without changing
+        the text, so only the selection is dropped then. Returns False if
+        the caret left the mirrored text or the text, the mirror is
+        invalid then.
+        """
+        if caret != self._caret:
+            if not 0 <= caret <= self._count or \
+               not self._text_pos <= caret <= self._text_pos + len(self._text):
+                self.invalidate()
+                return False
+
+            self._caret = caret
+            self.invalidate_selection()
+        return True
+
+    def is_selection_valid(self):
+        return self._valid and self._selection_valid
+
+    def get_selection(self):
+        return self._selection
+
+    def set_selection(self, selection):
+        self._selection = selection
+        self._selection_valid = True
+
+    def invalidate_selection(self):
+        """ The selection changed, keep the text, but forget the selection. """
+        self._selection_valid = False
+
+    def covers(self, begin, end):
+        """
+        Is the text range available in the mirror?
+
+        Doctests:
+        >>> m = TextMirror()
+        >>> m.set_contents("3456", 3, 10, 5)
+        >>> m.covers(3, 7), m.covers(2, 7), m.covers(3, 8)
+        (True, False, False)
+
+        # ranges beyond the end of the text are clipped
+        >>> m.set_contents("3456", 3, 7, 5)
+        >>> m.covers(3, 100)
+        True
+        """
+        end = min(end, self._count)
+        return self._valid and \
+               self._text_pos <= begin and \
+               end <= self._text_pos + len(self._text)
+
+    def get_text(self, begin, end):
+        """ Text of the given range, None if it isn't mirrored. """
+        if not self.covers(begin, end):
+            return None
+        end = min(end, self._count)
+        return self._text[begin - self._text_pos : end - self._text_pos]
+
+    def get_line_at(self, offset):
+        """
+        Line containing offset, including its line feed, like
+        Atspi.TextBoundaryType.LINE_START. Returns (text, begin, end)
+        or None if the line isn't completely mirrored.
+
+        Doctests:
+        >>> m = TextMirror()
+        >>> m.set_contents("abc\\ndef\\nghi", 0, 11, 5)
+        >>> m.get_line_at(5)
+        ('def\\n', 4, 8)
+        >>> m.get_line_at(9)
+        ('ghi', 8, 11)
+
+        # line begin not mirrored
+        >>> m.set_contents("bc\\ndef", 1, 7, 5)
+        >>> m.get_line_at(2) is None
+        True
+        """
+        if not self.covers(offset, offset):
+            return None
+
+        text = self._text
+        text_pos = self._text_pos
+        pos = offset - text_pos
+
+        begin = text.rfind("\n", 0, pos) + 1
+        if begin == 0 and text_pos > 0:
+            return None
+
+        end = text.find("\n", pos)
+        if end < 0:
+            if text_pos + len(text) < self._count:
+                return None
+            end = len(text)
+        else:
+            end += 1
+
+        return text[begin:end], text_pos + begin, text_pos + end
+
+    def insert(self, pos, length, text):
+        """ Apply an insertion of <text> at document position <pos>. """
+        if not self._valid:
+            return
+
+        if text is None or \
+           len(text) != length or \
+           not 0 <= pos <= self._count:
+            self.invalidate()
+            return
+
+        text_begin = self._text_pos
+        text_end = text_begin + len(self._text)
+        if pos < text_begin:
+            self._text_pos += length
+        elif pos <= text_end:
+            i = pos - text_begin
+            self._text = self._text[:i] + text + self._text[i:]
+
+        self._count += length
+        if self._caret >= pos:
+            self._caret += length
+
+        # typing replaces any selection
+        self.set_selection(None)
+
+    def delete(self, pos, length, text = None):
+        """
+        Apply a deletion at document position <pos>. If known, <text>
+        is the deleted text, used to verify the mirror.
+        """
+        if not self._valid:
+            return
+
+        end = pos + length
+        if text is not None and len(text) != length or \
+           not 0 <= pos <= end <= self._count:
+            self.invalidate()
+            return
+
+        text_begin = self._text_pos
+        text_end = text_begin + len(self._text)
+        if end <= text_begin:
+            self._text_pos -= length
+        elif pos >= text_end:
+            pass
+        elif pos >= text_begin and end <= text_end:
+            i = pos - text_begin
+            if text is not None and \
+               self._text[i:i + length] != text:
+                self.invalidate()
+                return
+            self._text = self._text[:i] + self._text[i + length:]
+        else:
+            # partial overlap with the mirrored range
+            self.invalidate()
+            return
+
+        self._count -= length
+        if self._caret >= end:
+            self._caret -= length
+        elif self._caret > pos:
+            self._caret = pos
+
+        self.set_selection(None)
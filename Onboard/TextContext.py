@@ -292,7 +292,8 @@ class AtspiTextContext(TextContext):
         # Only the nautilus rename text entry appears to need this.
         offset_before = offset
         try:
-            offset_after = self._accessible.get_caret_offset()
+            # The text mirror hasn't seen the insertion yet, ask directly.
+            offset_after = self._accessible.get_caret_offset(False)
         except Exception as ex:  # Private exception gi._glib.GError when
             _logger.info("TextContext.insert_text(): " +
                          unicode_str(ex))
@@ -375,6 +376,11 @@ class AtspiTextContext(TextContext):
         self._can_insert_text = \
             self.get_accessible_capabilities(accessible)
 
+        # track the text locally to save D-Bus round trips
+        if accessible:
+            accessible.enable_text_mirror(
+                self._text_domain.can_mirror_text())
+
         # log accessible info
         if _logger.isEnabledFor(_logger.LEVEL_ATSPI):
             log = _logger.atspi
@@ -408,6 +414,10 @@ class AtspiTextContext(TextContext):
         _logger.atspi("_on_text_changed: pos={}, length={}, insert={}"
                       .format(event.pos, event.length, event.insert))
 
+        if self._accessible:
+            self._accessible.apply_text_change(event.pos, event.length,
+                                               event.insert, event.text)
+
         insertion_span = self._record_text_change(event.pos,
                                                   event.length,
                                                   event.insert)
@@ -425,6 +435,9 @@ class AtspiTextContext(TextContext):
         self._update_context()
 
     def _on_text_caret_moved(self, event):
+        if self._accessible:
+            self._accessible.apply_caret_move(event.caret)
+
         self._last_caret_move_time = time.time()
         self._last_caret_move_position = event.caret
         self._update_context()
@@ -511,8 +524,9 @@ class AtspiTextContext(TextContext):
                             include_length = 2
 
                         # simple span for current insertion
-                        begin = max(pos - 100, 0)
-                        end = min(pos + length + 100, char_count)
+                        margin = TextChanges.TEXT_MARGIN
+                        begin = max(pos - margin, 0)
+                        end = min(pos + length + margin, char_count)
                         try:
                             text = accessible.get_text(begin, end)
                         except Exception as ex:
@@ -531,8 +545,9 @@ class AtspiTextContext(TextContext):
             for span in spans_to_update:
                 # Get some more text around the span to hopefully
                 # include whole words at beginning and end.
-                begin = max(span.begin() - 100, 0)
-                end = min(span.end() + 100, char_count)
+                margin = TextChanges.TEXT_MARGIN
+                begin = max(span.begin() - margin, 0)
+                end = min(span.end() + margin, char_count)
                 try:
                     span.text = accessible.get_text(begin, end)
                 except Exception as ex:
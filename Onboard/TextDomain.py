@@ -285,6 +285,13 @@ class TextDomain:
         """ Can give word suggestions before typing has started? """
         return True
 
+    def can_mirror_text(self):
+        """
+        Can the accessible's text be tracked locally through
+        text-changed events instead of reading it via D-Bus?
+        """
+        return True
+
     def handle_key_press(self, keycode, mod_mask):
         return True, None  # entering_text, end_of_editing
 
@@ -324,6 +331,10 @@ class DomainNOP(TextDomain):
     def read_context(self, keyboard, accessible):
         return "", "", 0, TextSpan(), False, 0
 
+    def can_mirror_text(self):
+        """ Don't keep copies of e.g. password text around. """
+        return False
+
     def get_auto_separator(self, context):
         """ Get word separator to add after inserting a prediction choice. """
         return ""
@@ -641,6 +652,13 @@ class DomainTerminal(TextDomain):
         # Mostly prevent updates to word suggestions while text is scrolling by
         return False
 
+    def can_mirror_text(self):
+        """
+        Terminals scroll large amounts of text, mirroring would mostly
+        re-sync, read the text directly instead.
+        """
+        return False
+
     def handle_key_press(self, keycode, mod_mask):
         """
         End recording and learn when pressing [Return]
@@ -38,6 +38,8 @@ from Onboard.Timer         import Timer
 from Onboard.definitions   import TouchInputEnum
 from Onboard.XInput        import XIDeviceManager, XIEventType, XIEventMask, \
                                   XIDeviceEventLogger
+from Onboard.GestureRecognizer import GestureRecognizer, GestureType
+from Onboard.InputRecorder import InputRecorder, LatencyProbe
 
 ### Logging ###
 import logging
@@ -48,16 +50,6 @@ BUTTON123_MASK = Gdk.ModifierType.BUTTON1_MASK | \
                  Gdk.ModifierType.BUTTON2_MASK | \
                  Gdk.ModifierType.BUTTON3_MASK
 
-DRAG_GESTURE_THRESHOLD2 = 40**2  # square of the distance in pixels until
-                                 # a drag gesture is detected.
-# gesture type
-(
-    NO_GESTURE,
-    TAP_GESTURE,
-    DRAG_GESTURE,
-    FLICK_GESTURE,
-) = range(4)
-
 # sequence id of core pointer events (single-touch/click events)
 POINTER_SEQUENCE = 0
 
@@ -78,7 +70,7 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
         self._master_device = None      # receives enter/leave events
         self._master_device_id = None   # for convenience/performance
         self._slave_devices = None      # receive pointer and touch events
-        self._slave_device_ids = None   # for convenience/performance
+        self._slave_device_ids = frozenset()  # for convenience/performance
 
         self._xi_grab_active = False
         self._xi_grab_events_selected = False
@@ -91,12 +83,40 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
                                    # become touch-active, i.e. they don't
                                    # generate touch events.
 
+        # Window state needed for every XI2 event, refreshed only on
+        # configure, scale and hierarchy changes.
+        self._xi_window = None
+        self._xi_scale = 1.0            # factor for event coordinates
+        self._xi_xid = 0
+        self._xi_root_origin = None     # root coordinates of window origin
+        self._xi_toplevel = None
+        self._xi_toplevel_handler_id = None
+
+        # Motion and touch update events are compressed to the
+        # latest one per device/touch and frame.
+        self._xi_pending_motion = {}
+        self._xi_motion_tick_id = None
+
+        self._xi_dispatch = {
+            XIEventType.Motion        : self._on_xi_motion_event,
+            XIEventType.TouchBegin    : self._on_xi_touch_event,
+            XIEventType.TouchUpdate   : self._on_xi_touch_event,
+            XIEventType.TouchEnd      : self._on_xi_touch_event,
+            XIEventType.ButtonPress   : self._on_xi_button_press_event,
+            XIEventType.ButtonRelease : self._on_xi_button_release_event,
+            XIEventType.Enter         : self._on_xi_enter_notify,
+            XIEventType.Leave         : self._on_xi_leave_notify,
+        }
+
         self.connect("realize",              self._on_realize_event)
         self.connect("unrealize",            self._on_unrealize_event)
+        self.connect("configure-event",      self._on_xi_configure_event)
+        self.connect("notify::scale-factor", self._on_xi_scale_factor_changed)
 
     def cleanup(self):
         self._register_gtk_events(False)
         self._register_xinput_events(False)
+        self._invalidate_xi_window_state()
 
     def _clear_touch_active(self):
         self._touch_active = set()
@@ -114,6 +134,7 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
 
     def _on_unrealize_event(self, user_data):
         self.handle_unrealize_event()
+        self._invalidate_xi_window_state()
 
     def handle_realize_event(self):
         # register events in derived class
@@ -122,6 +143,74 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
     def handle_unrealize_event(self):
         self.register_input_events(False)
 
+    def _on_xi_configure_event(self, widget, event):
+        self._xi_root_origin = None
+        return False
+
+    def _on_xi_toplevel_configure_event(self, widget, event):
+        self._xi_root_origin = None
+        return False
+
+    def _on_xi_scale_factor_changed(self, widget, pspec):
+        self._invalidate_xi_window_state()
+
+    def _invalidate_xi_window_state(self):
+        self._discard_xi_motion()
+        if self._xi_toplevel_handler_id is not None:
+            self._xi_toplevel.disconnect(self._xi_toplevel_handler_id)
+        self._xi_toplevel = None
+        self._xi_toplevel_handler_id = None
+        self._xi_window = None
+        self._xi_root_origin = None
+
+    def _update_xi_window_state(self):
+        """
+        Cache the window properties _on_device_event needs.
+        Returns False if the window isn't realized yet.
+        """
+        win = self.get_window()
+        if not win:
+            return False
+
+        # scale coordinates in response to changes to
+        # org.gnome.desktop.interface scaling-factor
+        scale = 1.0
+        try:
+            scale = win.get_scale_factor()  # from Gdk 3.10
+            if scale and scale != 1.0:
+                scale = 1.0 / scale
+            else:
+                scale = 1.0
+        except AttributeError:
+            pass
+
+        # The toplevel moves when dragging the keyboard around,
+        # track its position for the root coordinates.
+        toplevel = self.get_toplevel()
+        if toplevel is not self._xi_toplevel:
+            if self._xi_toplevel_handler_id is not None:
+                self._xi_toplevel.disconnect(self._xi_toplevel_handler_id)
+            self._xi_toplevel_handler_id = None
+            if toplevel is not None and \
+               toplevel is not self:
+                self._xi_toplevel_handler_id = \
+                    toplevel.connect("configure-event",
+                                     self._on_xi_toplevel_configure_event)
+            self._xi_toplevel = toplevel
+
+        self._xi_window = win
+        self._xi_scale = scale
+        self._xi_xid = self.get_xid()
+        self._xi_root_origin = None
+        return True
+
+    def _get_xi_root_origin(self):
+        origin = self._xi_root_origin
+        if origin is None:
+            origin = self._xi_window.get_root_coords(0, 0)
+            self._xi_root_origin = origin
+        return origin
+
     def grab_xi_pointer(self, active):
         """
         Tell the xi event source a drag operation has started (ended)
@@ -238,7 +327,9 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
                                        "{id}: {ex}"
                                        .format(id = device.id, ex = ex))
                 self._slave_devices = None
-                self._slave_device_ids = None
+                self._slave_device_ids = frozenset()
+
+            self._discard_xi_motion()
 
         return success
 
@@ -285,7 +376,9 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
                                 .format(id = device.id, ex = ex))
 
         self._slave_devices = devices
-        self._slave_device_ids = [d.id for d in devices]
+        self._slave_device_ids = frozenset(d.id for d in devices)
+
+        self._invalidate_xi_window_state()
 
     def _select_xi_grab_events(self, select):
         """
@@ -326,28 +419,35 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
         Handler for XI2 events.
         """
         event_type = event.xi_type
-        device_id  = event.device_id
+
+        # Fast path for the high frequency events, no logging.
+        if event_type == XIEventType.Motion or \
+           event_type == XIEventType.TouchUpdate:
+            if event.device_id in self._slave_device_ids and \
+               self._transform_xi_event(event, event_type):
+                key = (event_type, event.source_id, event.sequence)
+                self._xi_pending_motion[key] = event
+                self._schedule_xi_motion_flush()
+            return
 
         log = self._log_event_stub
-        if _logger.isEnabledFor(logging.DEBUG) and \
-            event_type != XIEventType.Motion and \
-            event_type != XIEventType.TouchUpdate:
+        if _logger.isEnabledFor(logging.DEBUG):
             self._log_device_event(event)
             log = self.log_event
 
         # re-select devices on changes to the device hierarchy
         if event_type in XIEventType.HierarchyEvents or \
            event_type == XIEventType.DeviceChanged:
+            self._discard_xi_motion()
             self.select_xinput_devices()
             return
 
-        log("_on_device_event1")
-
-        if event_type == XIEventType.KeyPress or \
-           event_type == XIEventType.KeyRelease:
+        handler = self._xi_dispatch.get(event_type)
+        if handler is None:  # e.g. KeyPress, KeyRelease
             return
 
         # check device_id, discard duplicate and unknown events
+        device_id = event.device_id
         if event_type == XIEventType.Enter or \
            event_type == XIEventType.Leave:
 
@@ -359,30 +459,38 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
 
         else:
             # all other pointer/touch events have to come from slaves
-            log("_on_device_event4 {} {}", event.device_id, self._slave_device_ids)
-            if not event.device_id in self._slave_device_ids:
+            log("_on_device_event4 {} {}", device_id, self._slave_device_ids)
+            if not device_id in self._slave_device_ids:
                 log("_on_device_event5")
                 return
 
-        # bail if the window isn't realized yet
-        win = self.get_window()
-        if not win:
+        if not self._transform_xi_event(event, event_type):
             log("_on_device_event6")
             return
 
-        # scale coordinates in response to changes to
-        # org.gnome.desktop.interface scaling-factor
-        try:
-            scale = win.get_scale_factor()  # from Gdk 3.10
-            log("_on_device_event7 {}", scale)
-            if scale and scale != 1.0:
-                scale = 1.0 / scale
-                event.x = event.x * scale
-                event.y = event.y * scale
-                event.x_root = event.x_root * scale
-                event.y_root = event.y_root * scale
-        except AttributeError:
-            pass
+        # keep the order of events, motion first
+        self._flush_xi_motion()
+
+        # Dispatch events
+        self._xi_event_handled = False
+        handler(event)
+
+    def _transform_xi_event(self, event, event_type):
+        """
+        Convert event coordinates to the window's coordinate system.
+        Returns False if the event is not meant for us.
+        """
+        # bail if the window isn't realized yet
+        if self._xi_window is None and \
+           not self._update_xi_window_state():
+            return False
+
+        scale = self._xi_scale
+        if scale != 1.0:
+            event.x = event.x * scale
+            event.y = event.y * scale
+            event.x_root = event.x_root * scale
+            event.y_root = event.y_root * scale
 
         # Slaves aren't grabbed for moving/resizing when simulating a drag
         # operation (drag click button), or when multiple slave devices are
@@ -390,18 +498,15 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
         # -> Simulate pointer grab, select root events we can track even
         #    outside the keyboard window.
         # None of these problems are assumed to exist for touch devices.
-        log("_on_device_event8 {}", self._xi_grab_active)
         if self._xi_grab_active and \
            (event_type == XIEventType.Motion or
             event_type == XIEventType.ButtonRelease):
             if not self._xi_grab_events_selected:
                 self._select_xi_grab_events(True)
 
-            log("_on_device_event9")
-
             # We only get root window coordinates for root window events,
             # so convert them to our target window's coordinates.
-            rx, ry = win.get_root_coords(0, 0)
+            rx, ry = self._get_xi_root_origin()
             event.x = event.x_root - rx
             event.y = event.y_root - ry
 
@@ -412,38 +517,61 @@ class InputEventSource(EventSource, XIDeviceEventLogger):
             # one finger, touching anything in a long press popup must
             # not also affect the keyboard below.
             xid_event = event.xid_event
-            xid_win = self.get_xid()
-            log("_on_device_event10 {} {}", xid_event, xid_win)
             if xid_event != 0 and \
-               xid_event != xid_win:
-                log("_on_device_event11")
-                return
+               xid_event != self._xi_xid:
+                return False
 
-        # Dispatch events
-        self._xi_event_handled = False
-        if event_type == XIEventType.Motion:
-            self._on_motion_event(self, event)
+        return True
 
-        elif event_type == XIEventType.TouchUpdate or \
-             event_type == XIEventType.TouchBegin or \
-             event_type == XIEventType.TouchEnd:
-            self._on_touch_event(self, event)
+    def _schedule_xi_motion_flush(self):
+        if self._xi_motion_tick_id is None:
+            if self.get_mapped() and self.get_frame_clock():
+                self._xi_motion_tick_id = \
+                    self.add_tick_callback(self._on_xi_motion_tick)
+            else:
+                self._flush_xi_motion()
+
+    def _on_xi_motion_tick(self, widget, frame_clock):
+        self._xi_motion_tick_id = None
+        self._flush_xi_motion()
+        return False
 
-        elif event_type == XIEventType.ButtonPress:
-            self._on_button_press_event(self, event)
+    def _flush_xi_motion(self):
+        """ Dispatch the latest motion of each device and touch. """
+        if self._xi_pending_motion:
+            events = list(self._xi_pending_motion.values())
+            self._xi_pending_motion = {}
+            for event in events:
+                self._xi_event_handled = False
+                self._xi_dispatch[event.xi_type](event)
 
-        elif event_type == XIEventType.ButtonRelease:
-            self._on_button_release_event(self, event)
+    def _discard_xi_motion(self):
+        self._xi_pending_motion = {}
+        if self._xi_motion_tick_id is not None:
+            self.remove_tick_callback(self._xi_motion_tick_id)
+            self._xi_motion_tick_id = None
 
-            # Notify CSButtonMapper, end remapped click.
-            if not self._xi_event_handled:
-                EventSource.emit(self, "button-release", event)
+    def _on_xi_motion_event(self, event):
+        self._on_motion_event(self, event)
 
-        elif event_type == XIEventType.Enter:
-            self._on_enter_notify(self, event)
+    def _on_xi_touch_event(self, event):
+        self._on_touch_event(self, event)
 
-        elif event_type == XIEventType.Leave:
-            self._on_leave_notify(self, event)
+    def _on_xi_button_press_event(self, event):
+        self._on_button_press_event(self, event)
+
+    def _on_xi_button_release_event(self, event):
+        self._on_button_release_event(self, event)
+
+        # Notify CSButtonMapper, end remapped click.
+        if not self._xi_event_handled:
+            EventSource.emit(self, "button-release", event)
+
+    def _on_xi_enter_notify(self, event):
+        self._on_enter_notify(self, event)
+
+    def _on_xi_leave_notify(self, event):
+        self._on_leave_notify(self, event)
 
     def _log_device_event(self, event):
         if not event.xi_type in [ XIEventType.TouchUpdate,
@@ -497,14 +625,18 @@ class TouchInput(InputEventSource):
         self._last_event_was_touch = False
         self._last_sequence_time = 0
 
-        self._gesture = NO_GESTURE
-        self._gesture_begin_point = (0, 0)
-        self._gesture_begin_time = 0
-        self._gesture_detected = False
-        self._gesture_cancelled = False
-        self._num_tap_sequences = 0
+        self._gestures = GestureRecognizer(self.GESTURE_DETECTION_SPAN)
         self._gesture_timer = Timer()
 
+        # Sequence updates are delivered at most once per frame,
+        # only the latest state of each sequence is of interest.
+        self._pending_sequence_updates = {}
+        self._sequence_update_tick_id = None
+
+    def handle_unrealize_event(self):
+        InputEventSource.handle_unrealize_event(self)
+        self._discard_sequence_updates()
+
     def set_touch_input_mode(self, touch_input):
         """ Call this to enable single/multi-touch """
         self._touch_events_enabled = touch_input != TouchInputEnum.NONE
@@ -645,6 +777,7 @@ class TouchInput(InputEventSource):
         if event_type == Gdk.EventType.TOUCH_BEGIN:
             sequence = InputSequence()
             sequence.init_from_touch_event(touch, id)
+            sequence.source_device = device
             if len(self._input_sequences) == 0:
                 sequence.primary = True
 
@@ -671,12 +804,18 @@ class TouchInput(InputEventSource):
             if not sequence is None:
                 sequence.time = event.get_time()
                 self._input_sequence_end(sequence)
+            else:
+                # untracked touch in single-touch mode, still
+                # part of the gesture
+                gestures = self._gestures.end(id, event.get_time())
+                self._dispatch_gestures(gestures)
 
         return True
 
     def _input_sequence_begin(self, sequence):
         """ Button press/touch begin """
         self.log_event("_input_sequence_begin1 {}", sequence)
+        self._flush_sequence_updates()
         self._gesture_sequence_begin(sequence)
         first_sequence = len(self._input_sequences) == 0
 
@@ -684,7 +823,7 @@ class TouchInput(InputEventSource):
            self._multi_touch_enabled:
             self._input_sequences[sequence.id] = sequence
 
-            if not self._gesture_detected:
+            if not self._gestures.is_detected():
                 if first_sequence and \
                    self._multi_touch_enabled and \
                    self.DELAY_SEQUENCE_BEGIN and \
@@ -708,14 +847,15 @@ class TouchInput(InputEventSource):
         return True
 
     def on_delayed_sequence_begin(self, sequence, point):
-        if not self._gesture_detected: # work around race condition
+        if not self._gestures.is_detected(): # work around race condition
             sequence.point = point # return to the original begin point
             self.deliver_input_sequence_begin(sequence)
-            self._gesture_cancelled = True
+            self._gestures.cancel_detection()
         return False
 
     def deliver_input_sequence_begin(self, sequence):
         self.log_event("deliver_input_sequence_begin {}", sequence)
+        self._record_input_sequence("begin", sequence)
         self.on_input_sequence_begin(sequence)
         sequence.delivered = True
 
@@ -724,12 +864,55 @@ class TouchInput(InputEventSource):
         self._gesture_sequence_update(sequence)
         if not sequence.state & BUTTON123_MASK or \
            not self.in_gesture_detection_delay(sequence):
+            if self._device_manager:
+                # XInput motion was already merged per frame, deliver it now.
+                self._gesture_timer.finish()  # run delayed begin before update
+                self._record_input_sequence("update", sequence)
+                self.on_input_sequence_update(sequence)
+            else:
+                # GTK motion arrives unmerged, keep only the latest
+                # update of each sequence until the next frame.
+                self._pending_sequence_updates[sequence.id] = sequence
+                self._schedule_sequence_updates()
+
+    def _schedule_sequence_updates(self):
+        if self._sequence_update_tick_id is None:
+            if self.get_mapped() and self.get_frame_clock():
+                self._sequence_update_tick_id = \
+                    self.add_tick_callback(self._on_sequence_update_tick)
+            else:
+                self._flush_sequence_updates()
+
+    def _on_sequence_update_tick(self, widget, frame_clock):
+        self._sequence_update_tick_id = None
+        self._flush_sequence_updates()
+        return False
+
+    def _flush_sequence_updates(self):
+        """ Deliver the latest update of each sequence. """
+        if self._sequence_update_tick_id is not None:
+            self.remove_tick_callback(self._sequence_update_tick_id)
+            self._sequence_update_tick_id = None
+
+        if self._pending_sequence_updates:
+            sequences = list(self._pending_sequence_updates.values())
+            self._pending_sequence_updates = {}
+
             self._gesture_timer.finish()  # run delayed begin before update
-            self.on_input_sequence_update(sequence)
+            for sequence in sequences:
+                self._record_input_sequence("update", sequence)
+                self.on_input_sequence_update(sequence)
+
+    def _discard_sequence_updates(self):
+        if self._sequence_update_tick_id is not None:
+            self.remove_tick_callback(self._sequence_update_tick_id)
+            self._sequence_update_tick_id = None
+        self._pending_sequence_updates = {}
 
     def _input_sequence_end(self, sequence):
         """ Button release/touch end """
         self.log_event("_input_sequence_end1 {}", sequence)
+        self._flush_sequence_updates()
         self._gesture_sequence_end(sequence)
         self._gesture_timer.finish()  # run delayed begin before end
         if sequence.id in self._input_sequences:
@@ -737,6 +920,7 @@ class TouchInput(InputEventSource):
 
             if sequence.delivered:
                 self.log_event("_input_sequence_end2 {}", sequence)
+                self._record_input_sequence("end", sequence)
                 self.on_input_sequence_end(sequence)
 
         if self._input_sequences:
@@ -744,6 +928,21 @@ class TouchInput(InputEventSource):
 
         self._last_sequence_time = sequence.time
 
+    def _record_input_sequence(self, kind, sequence):
+        """
+        Write the sequence to the input recording, if there is one,
+        and start measuring latencies of its processing stages.
+        """
+        recorder = InputRecorder.get_instance()
+        if recorder:
+            receive_time = sequence.update_time
+            latency = time.time() - receive_time \
+                      if receive_time is not None else None
+            recorder.record(kind, sequence, type(self).__name__, latency)
+
+            LatencyProbe.begin_input(receive_time)
+            LatencyProbe.mark("deliver")
+
     def _discard_stuck_input_sequences(self):
         """
         Input sequence handling requires guaranteed balancing of
@@ -758,63 +957,54 @@ class TouchInput(InputEventSource):
             if sequence.update_time < expired_time:
                 _logger.warning("discarding expired input sequence " + str(id))
                 del self._input_sequences[id]
+                self._gestures.end(id, sequence.time)
 
     def in_gesture_detection_delay(self, sequence):
         """
         Are we still in the time span where sequence begins aren't delayed
         and can't be undone after gesture detection?
         """
-        span = sequence.time - self._gesture_begin_time
-        return span < self.GESTURE_DETECTION_SPAN
+        return self._gestures.in_detection_span(sequence.time)
 
     def _gesture_sequence_begin(self, sequence):
-        # first tap?
-        if self._num_tap_sequences == 0:
-            self._gesture = NO_GESTURE
-            self._gesture_detected = False
-            self._gesture_cancelled = False
-            self._gesture_begin_point = sequence.point
-            self._gesture_begin_time = sequence.time # event time
-        else: # subsequent taps
-            if self.in_gesture_detection_delay(sequence) and \
-               not self._gesture_cancelled:
-                self._gesture_timer.stop()  # cancel delayed sequence begin
-                self._gesture_detected = True
-        self._num_tap_sequences += 1
+        detected = self._gestures.is_detected()
+        gestures = self._gestures.begin(sequence.id,
+                                        sequence.point, sequence.time)
+        if not detected and \
+           self._gestures.is_detected():
+            self._gesture_timer.stop()  # cancel delayed sequence begin
+        self._dispatch_gestures(gestures)
 
     def _gesture_sequence_update(self, sequence):
-        #print("_gesture_sequence_update", self._gesture_detected)
-        if self._gesture_detected and \
-           sequence.state & BUTTON123_MASK and \
-           self._gesture == NO_GESTURE:
-            print("_gesture_sequence_update")
-            point = sequence.point
-            dx = self._gesture_begin_point[0] - point[0]
-            dy = self._gesture_begin_point[1] - point[1]
-            d2 = dx * dx + dy * dy
-
-            # drag gesture?
-            if d2 >= DRAG_GESTURE_THRESHOLD2:
-                num_touches = len(self._input_sequences)
-                self._gesture = DRAG_GESTURE
-                self.on_drag_gesture_begin(num_touches)
-        return True
+        gestures = self._gestures.update(sequence.id,
+                                         sequence.point, sequence.time)
+        self._dispatch_gestures(gestures)
 
     def _gesture_sequence_end(self, sequence):
-        if len(self._input_sequences) == 1: # last sequence of the gesture?
-            if self._gesture_detected:
-                gesture = self._gesture
-
-                if gesture == NO_GESTURE:
-                    # tap gesture?
-                    elapsed = sequence.time - self._gesture_begin_time
-                    if elapsed <= 300:
-                        self.on_tap_gesture(self._num_tap_sequences)
-
-                elif gesture == DRAG_GESTURE:
-                    self.on_drag_gesture_end(0)
-
-            self._num_tap_sequences = 0
+        gestures = self._gestures.end(sequence.id, sequence.time,
+                                      sequence.point)
+        self._dispatch_gestures(gestures)
+
+    def _dispatch_gestures(self, gestures):
+        for gesture in gestures:
+            gesture_type = gesture.type
+            if gesture_type == GestureType.TAP:
+                self.on_tap_gesture(gesture.num_touches)
+            elif gesture_type == GestureType.DRAG_BEGIN:
+                self.on_drag_gesture_begin(gesture.num_touches)
+            elif gesture_type == GestureType.DRAG_END:
+                self.on_drag_gesture_end(gesture.num_touches)
+            elif gesture_type == GestureType.SWIPE:
+                self.on_swipe_gesture(gesture.num_touches,
+                                      gesture.direction)
+            elif gesture_type == GestureType.PINCH_BEGIN:
+                self.on_pinch_gesture_begin(gesture.num_touches)
+            elif gesture_type == GestureType.PINCH_UPDATE:
+                self.on_pinch_gesture_update(gesture.num_touches,
+                                             gesture.scale)
+            elif gesture_type == GestureType.PINCH_END:
+                self.on_pinch_gesture_end(gesture.num_touches,
+                                          gesture.scale)
 
     def on_tap_gesture(self, num_touches):
         return False
@@ -825,6 +1015,18 @@ class TouchInput(InputEventSource):
     def on_drag_gesture_end(self, num_touches):
         return False
 
+    def on_swipe_gesture(self, num_touches, direction):
+        return False
+
+    def on_pinch_gesture_begin(self, num_touches):
+        return False
+
+    def on_pinch_gesture_update(self, num_touches, scale):
+        return False
+
+    def on_pinch_gesture_end(self, num_touches, scale):
+        return False
+
     def redirect_sequence_update(self, sequence, func):
         """ redirect input sequence update to self. """
         sequence = self._get_redir_sequence(sequence)
@@ -874,6 +1076,8 @@ class InputSequence:
     state       = None  # GDK state mask (Gdk.ModifierType)
     time        = None  # event time
     update_time = None  # redundant, only used by _discard_stuck_input_sequences
+                        # and for latency measurements
+    source_device = None  # Gdk.Device the events came from
 
     primary     = False # Only primary sequences may move/resize windows.
     delivered   = False # Sent to listeners (keyboard views)?
@@ -890,6 +1094,7 @@ class InputSequence:
         self.button      = event.button
         self.time        = event.get_time()
         self.update_time = time.time()
+        self.source_device = event.get_source_device()
 
     def init_from_motion_event(self, event):
         self.id          = POINTER_SEQUENCE
@@ -898,6 +1103,7 @@ class InputSequence:
         self.state       = event.state
         self.time        = event.get_time()
         self.update_time = time.time()
+        self.source_device = event.get_source_device()
 
     def init_from_touch_event(self, event, id):
         self.id          = id
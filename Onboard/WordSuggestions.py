@@ -32,8 +32,6 @@ from gi.repository import Gtk, Pango
 import logging
 _logger = logging.getLogger(__name__)
 
-import Onboard.pypredict as pypredict
-
 from Onboard                   import KeyCommon
 from Onboard.TextContext       import AtspiTextContext, InputLine
 from Onboard.TextChanges       import TextChanges, TextSpan
@@ -41,7 +39,6 @@ from Onboard.SpellChecker      import SpellChecker
 from Onboard.LanguageSupport   import LanguageDB
 from Onboard.Layout            import LayoutPanel
 from Onboard.AtspiStateTracker import AtspiStateTracker
-from Onboard.WPEngine          import WPLocalEngine, ModelCache
 from Onboard.utils             import Rect, unicode_str, escape_markup
 from Onboard.Timer             import CallOnce, Timer, TimerOnce
 from Onboard.KeyGtk            import FullSizeKey, WordKey
@@ -124,6 +121,9 @@ class WordSuggestions:
         if enable:
             # only enable if there is a wordlist in the layout
             if self._get_wordlist_bars():
+                # Import on demand, loading the prediction engine
+                # is slow and not needed without typing assistance.
+                from Onboard.WPEngine import WPLocalEngine
                 self._wpengine = WPLocalEngine()
                 self.apply_prediction_profile()
         else:
@@ -869,6 +869,7 @@ class WordSuggestions:
 
         Doctests:
         >>> from Onboard.TextDomain import DomainGenericText
+        >>> from Onboard.WPEngine import WPLocalEngine
         >>> wp = WordSuggestions()
         >>> wp._wpengine = WPLocalEngine()
         >>> d = DomainGenericText()
@@ -956,7 +957,8 @@ class WordSuggestions:
         Fall-back for text entries without support for direct text insertion.
         """
 
-        with self.suppress_modifiers():
+        with self.suppress_modifiers(), \
+             self.text_changer_key_stroke.batched():
             length = end - begin
             offset = caret - end  # offset of caret to word end
 
@@ -1225,6 +1227,7 @@ class WordSuggestions:
         """
         Doctests:
         >>> from Onboard.TextDomain import DomainGenericText
+        >>> from Onboard.WPEngine import WPLocalEngine
         >>> wp = WordSuggestions()
         >>> wp._wpengine = WPLocalEngine()
         >>> d = DomainGenericText()
@@ -1310,6 +1313,7 @@ class WordSuggestions:
         Get the word at or before the span.
 
         Doctests:
+        >>> from Onboard.WPEngine import WPLocalEngine
         >>> wp = WordSuggestions()
         >>> wp._wpengine = WPLocalEngine()
 
@@ -1377,7 +1381,12 @@ class LearnStrategy:
 
     def __init__(self, tokenize=None):
         self._tokenize = tokenize \
-            if tokenize else pypredict.tokenize_text  # no D-Bus for tests
+            if tokenize else self._tokenize_text  # no D-Bus for tests
+
+    @staticmethod
+    def _tokenize_text(text):
+        import Onboard.pypredict as pypredict
+        return pypredict.tokenize_text(text)
 
     def _learn_spans(self, spans, bot_marker="", bot_offset=None,
                      text_domain=None):
@@ -2775,9 +2784,11 @@ class ModelErrorRecovery:
         return response == Gtk.ResponseType.YES
 
     def get_backup_filename(self, filename):
+        from Onboard.WPEngine import ModelCache
         return ModelCache.get_backup_filename(filename)
 
     def get_broken_filename(self, filename):
+        from Onboard.WPEngine import ModelCache
         return ModelCache.get_broken_filename(filename)
 
 
@@ -33,6 +33,8 @@ typedef struct {
 static int uinput_open (UInput* uinput, const char* device_name);
 static void uinput_close (UInput* uinput);
 static void uinput_send_key_event_to(UInput* uinput, int keycode, bool press);
+static void uinput_send_key_events_to(UInput* uinput, const int* keycodes,
+                                      const bool* presses, int count);
 
 static UInput uinput_singleton = {0};
 
@@ -57,6 +59,12 @@ uinput_send_key_event(int keycode, bool press)
     uinput_send_key_event_to(&uinput_singleton, keycode, press);
 }
 
+void
+uinput_send_key_events(const int* keycodes, const bool* presses, int count)
+{
+    uinput_send_key_events_to(&uinput_singleton, keycodes, presses, count);
+}
+
 static int
 uinput_open (UInput* uinput, const char* device_name)
 {
@@ -165,6 +173,53 @@ uinput_send_key_event_to(UInput* uinput, int keycode, bool press)
     }
 }
 
+/*
+ * Send multiple key events with a single write.
+ * Each key event is still followed by its own EV_SYN report,
+ * so press and release of the same key aren't merged.
+ */
+static void
+uinput_send_key_events_to(UInput* uinput, const int* keycodes,
+                          const bool* presses, int count)
+{
+    int fd = uinput->fd;
+    int i;
+    size_t size = 2 * count * sizeof(struct input_event);
+    struct input_event* events;
+    struct input_event* ev;
+
+    if (count <= 0)
+        return;
+
+    events = (struct input_event*) PyMem_Malloc(size);
+    if (!events)
+    {
+        PyErr_NoMemory();
+        return;
+    }
+    memset(events, 0, size);
+
+    for (i = 0, ev = events; i < count; i++)
+    {
+        ev->type = EV_KEY;
+        ev->code = keycodes[i] - 8;
+        ev->value = presses[i];
+        ev++;
+
+        ev->type = EV_SYN;
+        ev->code = 0;
+        ev->value = 0;
+        ev++;
+    }
+
+    if(write(fd, events, size) < 0)
+    {
+        PyErr_SetString (OSK_EXCEPTION, "write key events");
+    }
+
+    PyMem_Free(events);
+}
+
 
 /*
  * Python type
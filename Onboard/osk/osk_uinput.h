@@ -23,5 +23,7 @@
 int uinput_init(const char* device_name);
 void uinput_destruct(void);
 void uinput_send_key_event(int keycode, bool press);
+void uinput_send_key_events(const int* keycodes, const bool* presses,
+                            int count);
 
 #endif
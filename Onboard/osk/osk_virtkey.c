@@ -1180,6 +1180,33 @@ send_key_event(OskVirtkey* self, int keycode, bool press)
     }
 }
 
+static void
+send_key_events(OskVirtkey* self,
+                const int* keycodes, const bool* presses, int count)
+{
+    int i;
+
+    switch (self->backend)
+    {
+        case VIRTKEY_BACKEND_XTEST:
+            if (self->xdisplay)
+            {
+                for (i = 0; i < count; i++)
+                    XTestFakeKeyEvent (self->xdisplay,
+                                       keycodes[i], presses[i], CurrentTime);
+                XSync (self->xdisplay, False);
+            }
+            break;
+
+        case VIRTKEY_BACKEND_UINPUT:
+            uinput_send_key_events(keycodes, presses, count);
+            break;
+
+        default:
+            break;
+    }
+}
+
 static PyObject *
 vk_send (PyObject *_self, PyObject *args, int mode)
 {
@@ -1260,6 +1287,70 @@ osk_virtkey_release_keycode (PyObject *self, PyObject *args)
     return vk_send (self, args, VK_SEND_KEYCODE_RELEASE);
 }
 
+/*
+ * Send a sequence of (keycode, press) tuples at once,
+ * with a single round trip to the X server or write to uinput.
+ */
+static PyObject *
+osk_virtkey_send_keycodes (PyObject *self, PyObject *args)
+{
+    PyObject *okeys = NULL;
+    PyObject *seq, **items;
+    Py_ssize_t n;
+    int i;
+    int* keycodes;
+    bool* presses;
+
+    if (!PyArg_ParseTuple (args, "O", &okeys))
+        return NULL;
+
+    if (!(seq = PySequence_Fast (okeys, "expected sequence type")))
+        return NULL;
+
+    items = PySequence_Fast_ITEMS (seq);
+    n = PySequence_Fast_GET_SIZE (seq);
+
+    keycodes = (int*) PyMem_Malloc(n * sizeof(*keycodes) + 1);
+    presses = (bool*) PyMem_Malloc(n * sizeof(*presses) + 1);
+    if (!keycodes || !presses)
+    {
+        PyMem_Free(keycodes);
+        PyMem_Free(presses);
+        Py_DECREF (seq);
+        return PyErr_NoMemory();
+    }
+
+    for (i = 0; i < n; i++, items++)
+    {
+        int keycode;
+        int press;
+        if (!PyArg_ParseTuple (*items, "ii", &keycode, &press))
+        {
+            PyMem_Free(keycodes);
+            PyMem_Free(presses);
+            Py_DECREF (seq);
+            return NULL;
+        }
+        keycodes[i] = keycode;
+        presses[i] = press ? true : false;
+    }
+
+    #ifdef DEBUG_OUTPUT
+    printf("send_keycodes count %d\n", (int) n);
+    #endif
+
+    send_key_events((OskVirtkey*) self, keycodes, presses, n);
+
+    PyMem_Free(keycodes);
+    PyMem_Free(presses);
+    Py_DECREF (seq);
+
+    if (PyErr_Occurred())
+        return NULL;
+
+    Py_RETURN_NONE;
+}
+
 static PyObject *
 osk_virtkey_lock_group (PyObject *self, PyObject *args)
 {
@@ -1454,6 +1545,30 @@ osk_virtkey_keycode_from_keysym (PyObject *self, PyObject *args)
     return ret;
 }
 
+/*
+ * Mark a keycode as recently used, for keycodes cached by the caller.
+ * Spare keycodes remapped for keysyms that aren't part of the layout
+ * are recycled least recently used first.
+ *
+ * return value: True if keycode is a spare keycode, i.e. it may be
+ *               remapped by later calls to keycode_from_keysym.
+ */
+static PyObject *
+osk_virtkey_touch_keycode (PyObject *self, PyObject *args)
+{
+    VirtkeyBase* this = ((OskVirtkey *) self)->vk;
+    int keycode;
+    bool spare = false;
+
+    if (!PyArg_ParseTuple (args, "i", &keycode))
+        return NULL;
+
+    if (this->touch_keycode)
+        spare = this->touch_keycode (this, keycode);
+
+    return PyBool_FromLong (spare);
+}
+
 /*
  * Translate unicode character to keysym.
  * return value: keysym
@@ -1644,6 +1759,7 @@ static PyMethodDef osk_virtkey_methods[] = {
 
     { "press_keycode",   osk_virtkey_press_keycode,   METH_VARARGS, NULL },
     { "release_keycode", osk_virtkey_release_keycode, METH_VARARGS, NULL },
+    { "send_keycodes",   osk_virtkey_send_keycodes,   METH_VARARGS, NULL },
     { "lock_group",      osk_virtkey_lock_group,      METH_VARARGS, NULL },
     { "latch_mod",       osk_virtkey_latch_mod,       METH_VARARGS, NULL },
     { "lock_mod",        osk_virtkey_lock_mod,        METH_VARARGS, NULL },
@@ -1656,6 +1772,7 @@ static PyMethodDef osk_virtkey_methods[] = {
     { "keysyms_from_keycode", osk_virtkey_keysyms_from_keycode, METH_VARARGS, NULL },
     { "keysym_from_unicode",  osk_virtkey_keysym_from_unicode, METH_VARARGS, NULL },
     { "keycode_from_keysym",  osk_virtkey_keycode_from_keysym, METH_VARARGS, NULL },
+    { "touch_keycode",        osk_virtkey_touch_keycode,       METH_VARARGS, NULL },
 
     { "get_current_group",      osk_virtkey_get_current_group,      METH_NOARGS, NULL },
     { "get_current_group_name", osk_virtkey_get_current_group_name, METH_NOARGS, NULL },
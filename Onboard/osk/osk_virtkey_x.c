@@ -32,6 +32,10 @@
 
 #define N_MOD_INDICES (Mod5MapIndex + 1)
 
+// Number of keycodes at the end of the keymap that may be remapped
+// for keysyms that aren't part of the current layout.
+#define N_SPARE_KEYCODES 10
+
 typedef struct VirtkeyX VirtkeyX;
 
 struct VirtkeyX {
@@ -41,6 +45,10 @@ struct VirtkeyX {
 
     int xkb_base_event;
     XkbDescPtr kbd;
+
+    // Last use of each spare keycode, for least recently used eviction.
+    unsigned long spare_keycode_stamps[N_SPARE_KEYCODES];
+    unsigned long spare_keycode_clock;
 };
 
 static int virtkey_x_reload (VirtkeyBase* base);
@@ -291,20 +299,52 @@ static void dump_xkb_state(VirtkeyX* this, int keycode, KeySym keysym, int group
 }
 #endif
 
+/*
+ * Mark keycode as recently used, if it is one of the spare keycodes.
+ * Returns true for spare keycodes.
+ */
+static bool
+touch_spare_keycode(VirtkeyX* this, KeyCode keycode)
+{
+    int i = this->kbd->max_key_code - 1 - keycode;
+    if (i >= 0 && i < N_SPARE_KEYCODES)
+    {
+        this->spare_keycode_stamps[i] = ++this->spare_keycode_clock;
+        return true;
+    }
+    return false;
+}
+
+/*
+ * Return the least recently used spare keycode.
+ * Frequently typed characters keep their keycodes this way
+ * and don't need to be remapped over and over.
+ */
+static KeyCode
+get_lru_spare_keycode(VirtkeyX* this)
+{
+    int i;
+    int lru = 0;
+
+    for (i = 1; i < N_SPARE_KEYCODES; i++)
+        if (this->spare_keycode_stamps[i] < this->spare_keycode_stamps[lru])
+            lru = i;
+
+    return this->kbd->max_key_code - 1 - lru;
+}
+
 static KeyCode
 map_keysym_xkb(VirtkeyBase* base, KeySym keysym, int group)
 {
     VirtkeyX* this = (VirtkeyX*) base;
-    static int modified_key = 0;
     KeyCode keycode;
     Status status;
     int key_group;
 
-    // Change one of the last 10 keysyms, remapping the keyboard map
-    // on the fly. This assumes the last 10 aren't already used.
-    const int n = 10;
-    keycode = this->kbd->max_key_code - modified_key - 1;
-    modified_key = (modified_key + 1) % n;
+    // Change one of the last N_SPARE_KEYCODES keysyms, remapping the
+    // keyboard map on the fly. This assumes these aren't already used.
+    keycode = get_lru_spare_keycode(this);
+    touch_spare_keycode(this, keycode);
 
     #ifdef DEBUG_OUTPUT
     dump_xkb_state(this, keycode, keysym, group);
@@ -366,12 +406,21 @@ virtkey_x_get_keycode_from_keysym (VirtkeyBase* base, int keysym,
     // Look keysym up in current group.
     keycode = keysym_to_keycode(this->kbd, keysym,
                                 group, mod_mask_out);
-    if (!keycode)
+    if (keycode)
+        touch_spare_keycode(this, keycode);
+    else
         keycode = map_keysym_xkb(base, keysym, group);
 
     return keycode;
 }
 
+static bool
+virtkey_x_touch_keycode (VirtkeyBase* base, int keycode)
+{
+    VirtkeyX* this = (VirtkeyX*) base;
+    return touch_spare_keycode(this, keycode);
+}
+
 static void
 virtkey_x_get_label_from_keycode(VirtkeyBase* base,
     int keycode, int modmask, int group,
@@ -581,6 +630,12 @@ virtkey_x_init (VirtkeyBase *base)
 
     this->kbd = NULL;
 
+    // Spare keycodes keep their use counts across reloads, keysyms
+    // remapped earlier are still found in the reloaded keymap.
+    memset(this->spare_keycode_stamps, 0,
+           sizeof(this->spare_keycode_stamps));
+    this->spare_keycode_clock = 0;
+
     display = gdk_display_get_default ();
     if (!GDK_IS_X11_DISPLAY (display)) // Wayland, MIR?
     {
@@ -650,6 +705,7 @@ virtkey_x_new(void)
    this->get_label_from_keycode = virtkey_x_get_label_from_keycode;
    this->get_keysym_from_keycode = virtkey_x_get_keysym_from_keycode;
    this->get_keycode_from_keysym = virtkey_x_get_keycode_from_keysym;
+   this->touch_keycode = virtkey_x_touch_keycode;
    this->get_rules_names = virtkey_x_get_rules_names;
    this->get_layout_as_string = virtkey_x_get_layout_as_string;
    this->set_group = virtkey_x_set_group;
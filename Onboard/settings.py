@@ -609,6 +609,9 @@ class Settings(DialogBuilder):
         _logger.info("Entering mainloop of Onboard-settings")
         Gtk.main()
 
+        # write pending changes before exiting
+        config.flush_writes()
+
     def on_pages_view_cursor_changed(self, widget):
         sel = widget.get_selection()
         if sel:
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from Onboard.ConfigUtils import ConfigObject, ConfigSnapshot, GSKey
+
+
+class TestConfigSnapshot(unittest.TestCase):
+
+    VALUES = {"org.onboard" : {"layout" : "Compact",
+                               "show_status_icon" : True},
+              "org.onboard.window" : {"docking_edge" : 3,
+                                      "landscape" : (10.0, 20.0)}}
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp(prefix="onboard-test-")
+        config_home = os.path.join(self._dir, "config")
+        data_home = os.path.join(self._dir, "data")
+
+        self._dconf_db = os.path.join(config_home, "dconf", "user")
+        self._write_file(self._dconf_db, "dconf")
+
+        self._schemas = os.path.join(data_home, "glib-2.0", "schemas",
+                                     "gschemas.compiled")
+        self._write_file(self._schemas, "schemas")
+
+        self._system_defaults = os.path.join(self._dir, "onboard-defaults.conf")
+        self._write_file(self._system_defaults, "[main]")
+
+        self._filename = os.path.join(self._dir, "cache", "config-snapshot")
+
+        env = {"XDG_CONFIG_HOME" : config_home,
+               "XDG_DATA_HOME" : data_home,
+               "XDG_DATA_DIRS" : os.path.join(self._dir, "nonexistent")}
+        self._env_patch = mock.patch.dict(os.environ, env)
+        self._env_patch.start()
+        os.environ.pop("GSETTINGS_SCHEMA_DIR", None)
+
+    def tearDown(self):
+        self._env_patch.stop()
+        shutil.rmtree(self._dir)
+
+    def _write_file(self, filename, text):
+        dirname = os.path.dirname(filename)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(filename, "w") as f:
+            f.write(text)
+
+    def _touch_later(self, filename):
+        mtime = os.path.getmtime(filename) + 10
+        os.utime(filename, (mtime, mtime))
+
+    def _new_snapshot(self):
+        return ConfigSnapshot(self._filename, [self._system_defaults])
+
+    def _save_snapshot(self):
+        snapshot = self._new_snapshot()
+        self.assertIsNone(snapshot.load())
+        snapshot.save(self.VALUES)
+
+    def test_round_trip(self):
+        self._save_snapshot()
+        self.assertEqual(self._new_snapshot().load(), self.VALUES)
+
+    def test_no_dconf_database(self):
+        os.remove(self._dconf_db)
+        self._save_snapshot()
+        self.assertFalse(os.path.exists(self._filename))
+        self.assertIsNone(self._new_snapshot().load())
+
+    def test_dconf_database_changed(self):
+        self._save_snapshot()
+        self._touch_later(self._dconf_db)
+        self.assertIsNone(self._new_snapshot().load())
+
+    def test_schemas_changed(self):
+        self._save_snapshot()
+        self._touch_later(self._schemas)
+        self.assertIsNone(self._new_snapshot().load())
+
+    def test_system_defaults_changed(self):
+        self._save_snapshot()
+        os.remove(self._system_defaults)
+        self.assertIsNone(self._new_snapshot().load())
+
+    def test_backend_changed(self):
+        self._save_snapshot()
+        with mock.patch.dict(os.environ, {"GSETTINGS_BACKEND" : "memory"}):
+            self.assertIsNone(self._new_snapshot().load())
+
+    def test_corrupt_file(self):
+        self._save_snapshot()
+        self._write_file(self._filename, "{'stamp' : (")
+        self.assertIsNone(self._new_snapshot().load())
+
+    def test_save_without_load(self):
+        self._new_snapshot().save(self.VALUES)
+        self.assertFalse(os.path.exists(self._filename))
+
+
+class TestInitFromSnapshot(unittest.TestCase):
+
+    class ConfigObject_mockup(ConfigObject):
+        def __init__(self):
+            self.schema = "org.onboard"
+            self.children = []
+            self.gskeys = {}
+            for key, default in (("layout", ""),
+                                 ("show-status-icon", False)):
+                gskey = GSKey(None, key, default, None, None,
+                              None, None, True)
+                self.gskeys[gskey.prop] = gskey
+            self.settings = mock.Mock()
+            self.get_unpacked = mock.Mock(return_value="unpacked")
+
+    def test_restored_keys_are_read(self):
+        """
+        Keys restored from the snapshot have to be read from gsettings
+        anyway, else external changes aren't signaled.
+        """
+        co = self.ConfigObject_mockup()
+        co.init_from_gsettings({"org.onboard" : {"layout" : "Compact"}})
+
+        self.assertEqual(co.gskeys["layout"].value, "Compact")
+        self.assertEqual(co.gskeys["show_status_icon"].value, "unpacked")
+        co.settings.get_value.assert_called_once_with("layout")
+        co.get_unpacked.assert_called_once_with(co.gskeys["show_status_icon"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+# Copyright © 2026 agent <agent@local>
+#
+# This file is part of Onboard.
+#
+# Onboard is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# Onboard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from unittest import mock
+
+import Onboard.Keyboard
+from Onboard.Keyboard import KeySynthVirtkey
+
+
+class TestKeySynthVirtkey(unittest.TestCase):
+
+    class Config_mockup:
+        class Keyboard:
+            inter_key_stroke_delay = 0.0
+        keyboard = Keyboard()
+
+    class Keyboard_mockup:
+        def lock_temporary_modifiers(self, mod_source, mod_mask):
+            pass
+
+        def unlock_temporary_modifiers(self, mod_source):
+            pass
+
+    class Virtkey_mockup:
+        """
+        Keymap with a few spare keycodes, remapped least recently
+        used first, like the X backend of osk.Virtkey.
+        Records the characters clients would see for the events sent,
+        translated with the keymap in force at the time.
+        """
+        N_SPARE_KEYCODES = 3
+        FIRST_SPARE_KEYCODE = 250
+
+        def __init__(self):
+            self.keymap = {38 + i : ord(c)
+                           for i, c in enumerate("abcdefghijklmnopqrstuvwxyz")}
+            self.spare_stamps = {self.FIRST_SPARE_KEYCODE + i : 0
+                                 for i in range(self.N_SPARE_KEYCODES)}
+            self.clock = 0
+            self.typed = []
+            self.num_remaps = 0
+
+        def keysym_from_unicode(self, char):
+            return ord(char)
+
+        def keycode_from_keysym(self, keysym):
+            for keycode, ks in self.keymap.items():
+                if ks == keysym:
+                    self.touch_keycode(keycode)
+                    return keycode, 0
+
+            keycode = min(self.spare_stamps, key=self.spare_stamps.get)
+            self.touch_keycode(keycode)
+            self.keymap[keycode] = keysym
+            self.num_remaps += 1
+            return keycode, 0
+
+        def touch_keycode(self, keycode):
+            if keycode in self.spare_stamps:
+                self.clock += 1
+                self.spare_stamps[keycode] = self.clock
+                return True
+            return False
+
+        def press_keycode(self, keycode):
+            self.typed.append(chr(self.keymap[keycode]))
+
+        def release_keycode(self, keycode):
+            pass
+
+        def send_keycodes(self, keycodes):
+            for keycode, press in keycodes:
+                if press:
+                    self.press_keycode(keycode)
+
+    def setUp(self):
+        patcher = mock.patch.object(Onboard.Keyboard, "config",
+                                    self.Config_mockup())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self._vk = self.Virtkey_mockup()
+        self._key_synth = KeySynthVirtkey(self.Keyboard_mockup(), self._vk)
+
+    def test_batch_more_unmapped_chars_than_spare_keycodes(self):
+        """
+        Remapping a spare keycode must not change the meaning of
+        key-strokes still queued in the batch.
+        """
+        text = "aäböcüdéeèfñgçh"
+        self.assertGreater(len(set(c for c in text if not c.isascii())),
+                           self._vk.N_SPARE_KEYCODES)
+
+        self._key_synth.press_key_string(text)
+        self.assertEqual(text, "".join(self._vk.typed))
+
+        # once more, with the keycode cache warmed up
+        self._vk.typed = []
+        self._key_synth.press_key_string(text)
+        self.assertEqual(text, "".join(self._vk.typed))
+
+    def test_frequent_chars_keep_spare_keycodes(self):
+        """
+        Cache hits must refresh spare keycodes, so characters typed over
+        and over aren't evicted by a series of rarely used ones.
+        """
+        self._key_synth.press_key_string("ä")
+        num_remaps = self._vk.num_remaps
+        for c in "öüéèñç":
+            self._key_synth.press_key_string("ä" + c)
+
+        # one remap per rare character, "ä" stayed mapped
+        self.assertEqual(num_remaps + 6, self._vk.num_remaps)
+        self.assertEqual("ä" + "".join("ä" + c for c in "öüéèñç"),
+                         "".join(self._vk.typed))
+
+
+if __name__ == '__main__':
+    unittest.main()
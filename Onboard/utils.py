@@ -794,6 +794,56 @@ class Rect:
         return rects, bounds
 
 
+def merge_rects(rects, max_waste = 0.25):
+    """
+    Combine rectangles into a small set of rectangles covering them all.
+    Two rectangles are merged when their union is at most max_waste
+    larger than their summed areas. Empty and fully covered rectangles
+    are dropped.
+
+    Doctests:
+    # duplicates and contained rects are dropped
+    >>> merge_rects([Rect(0, 0, 10, 10), Rect(0, 0, 10, 10), Rect(2, 2, 5, 5)])
+    [Rect(x=0.0 y=0.0 w=10.0 h=10.0)]
+
+    # adjacent rects are merged
+    >>> merge_rects([Rect(0, 0, 10, 10), Rect(10, 0, 10, 10)])
+    [Rect(x=0.0 y=0.0 w=20.0 h=10.0)]
+
+    # distant rects are kept apart
+    >>> merge_rects([Rect(0, 0, 10, 10), Rect(100, 100, 10, 10)])
+    [Rect(x=0.0 y=0.0 w=10.0 h=10.0), Rect(x=100.0 y=100.0 w=10.0 h=10.0)]
+
+    # merging may enable further merges
+    >>> merge_rects([Rect(0, 0, 10, 10), Rect(20, 0, 10, 10),
+    ...              Rect(10, 0, 10, 10)])
+    [Rect(x=0.0 y=0.0 w=30.0 h=10.0)]
+
+    >>> merge_rects([Rect(0, 0, 0, 10)])
+    []
+    """
+    result = []
+    for rect in rects:
+        if rect.is_empty():
+            continue
+
+        merged = True
+        while merged:
+            merged = False
+            area = rect.w * rect.h
+            for i, r in enumerate(result):
+                u = r.union(rect)
+                if u.w * u.h <= (r.w * r.h + area) * (1.0 + max_waste):
+                    del result[i]
+                    rect = u
+                    merged = True
+                    break
+
+        result.append(rect)
+
+    return result
+
+
 def brighten(amount, r, g, b, a=0.0):
     """ Make the given color brighter by amount a [-1.0...1.0] """
     h, l, s = colorsys.rgb_to_hls(r, g, b)
@@ -1512,6 +1562,16 @@ class XDGDirs:
     >>> XDGDirs.get_data_home("onboard/test.dat")
     '/home/test_user/.data_home/onboard/test.dat'
 
+    # XDG_CACHE_HOME unavailable
+    >>> os.environ["XDG_CACHE_HOME"] = ""
+    >>> XDGDirs.get_cache_home("onboard/test.dat")
+    '/home/test_user/.cache/onboard/test.dat'
+
+    # XDG_CACHE_HOME available
+    >>> os.environ["XDG_CACHE_HOME"] = "/home/test_user/.cache_home"
+    >>> XDGDirs.get_cache_home("onboard/test.dat")
+    '/home/test_user/.cache_home/onboard/test.dat'
+
     # XDG_CONFIG_DIRS unvailable
     >>> os.environ["XDG_CONFIG_HOME"] = ""
     >>> os.environ["XDG_CONFIG_DIRS"] = ""
@@ -1622,6 +1682,24 @@ class XDGDirs:
 
         return path
 
+    @staticmethod
+    def get_cache_home(file = None):
+        """
+        User specific cache directory.
+        """
+        path = os.environ.get("XDG_CACHE_HOME")
+        if path and not os.path.isabs(path):
+            _logger.warning("XDG_CACHE_HOME doesn't contain an absolute path,"
+                            "ignoring.")
+            path = None
+        if not path:
+            path = os.path.join(os.path.expanduser("~"), ".cache")
+
+        if file:
+            path = os.path.join(path, file)
+
+        return path
+
     @staticmethod
     def get_data_dirs():
         """